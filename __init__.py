@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
-from homeassistant.core import HomeAssistant
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_NAME  # Not used.  Remove.
+import logging
+import os
+import re
+from time import perf_counter
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import STORAGE_DIR
 import voluptuous as vol
 
 from .const import (
@@ -17,7 +23,18 @@ from .const import (
     DEFAULT_FARM_NAME,
     DEFAULT_FARM_SIZE,
     DEFAULT_CHICKEN_TYPE,
+    LEDGER_FILENAME,
+    STARTUP_BUDGET_MS,
 )
+from .farm import ChickenFarm
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket_api
+
+_LOGGER = logging.getLogger(__name__)
+
+# Unique ids of the numbers before they were derived from the config entry
+LEGACY_NUMBER_UNIQUE_ID = re.compile(r"^chicken_number_(?P<key>[a-z_]+)_(?P<created>\d+)$")
+LEGACY_SENSOR_UNIQUE_IDS = {"chicken_eggs_in_storage": "eggs_in_storage"}
 
 # Configuration schema for YAML (optional if using config flow)
 CONFIG_SCHEMA = vol.Schema(
@@ -38,8 +55,13 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Chicken Farm component from YAML."""
     conf = config.get(DOMAIN)
     hass.data.setdefault(DOMAIN, {})
-    if conf is not None:
-        # Trigger config flow for YAML configuration
+    await async_setup_services(hass)
+    async_setup_websocket_api(hass)
+    if conf is not None and not any(
+        entry.source == SOURCE_IMPORT
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    ):
+        # Trigger config flow for YAML configuration, once
         hass.async_create_task(
             hass.config_entries.flow.async_init(
                 DOMAIN, context={"source": "import"}, data=conf
@@ -50,24 +72,100 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Chicken Farm from a config entry."""
+    start = perf_counter()
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    farm = ChickenFarm(hass, entry)
+    await farm.instrumentation.wrap("farm_setup", farm.async_setup)()
+    hass.data[DOMAIN][entry.entry_id] = farm
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     # Forward the setup to the platforms (e.g., sensor, number)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await farm.async_start()
 
-    # The following line is not needed as there is no script platform
-    # from .script import async_setup_scripts
-    # await async_setup_scripts(hass)
+    elapsed = (perf_counter() - start) * 1000
+    if elapsed > STARTUP_BUDGET_MS:
+        _LOGGER.warning(
+            "Setting up %s took %.0f ms, the budget is %s ms",
+            entry.title,
+            elapsed,
+            STARTUP_BUDGET_MS,
+        )
+    else:
+        _LOGGER.debug("Set up %s in %.1f ms", entry.title, elapsed)
+    return True
 
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without reloading the farm."""
+    hass.data[DOMAIN][entry.entry_id].async_apply_options()
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an old config entry."""
+    if entry.version == 1 and entry.minor_version < 2:
+        _async_migrate_unique_ids(hass, entry)
+        hass.config_entries.async_update_entry(entry, minor_version=2)
     return True
 
 
+@callback
+def _async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Merge the registry entries left behind by random unique ids.
+
+    Every restart used to register each number under a new unique id. Per
+    key, the most recently created entry is kept, since it holds the latest
+    recorder history and restore state, and given the stable unique id. The
+    orphans are removed from the registry.
+    """
+    ent_reg = er.async_get(hass)
+    legacy: dict[str, list[tuple[int, er.RegistryEntry]]] = {}
+    for entity in er.async_entries_for_config_entry(ent_reg, entry.entry_id):
+        if match := LEGACY_NUMBER_UNIQUE_ID.match(entity.unique_id):
+            # The random suffix starts with the creation timestamp
+            legacy.setdefault(match["key"], []).append((int(match["created"]), entity))
+        elif key := LEGACY_SENSOR_UNIQUE_IDS.get(entity.unique_id):
+            legacy.setdefault(key, []).append((0, entity))
+
+    removed = 0
+    for key, entities in legacy.items():
+        entities.sort(key=lambda item: item[0])
+        *orphans, (_, keep) = entities
+        unique_id = f"{entry.entry_id}_{key}"
+        if ent_reg.async_get_entity_id(keep.domain, DOMAIN, unique_id) is None:
+            ent_reg.async_update_entity(keep.entity_id, new_unique_id=unique_id)
+        else:
+            orphans.append((0, keep))  # Already created under the stable id
+        for _, orphan in orphans:
+            ent_reg.async_remove(orphan.entity_id)
+            removed += 1
+    if removed:
+        _LOGGER.info("Removed %s orphaned Chicken Farm entities", removed)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # Unload platforms (e.g., sensor, number)
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         # Remove the entry data from hass.data
-        hass.data[DOMAIN].pop(entry.entry_id)
+        farm = hass.data[DOMAIN].pop(entry.entry_id)
+        await farm.async_unload()
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the ledger and saved values of a removed config entry."""
+    path = hass.config.path(
+        STORAGE_DIR, LEDGER_FILENAME.format(entry_id=entry.entry_id)
+    )
+
+    def _remove() -> None:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    await hass.async_add_executor_job(_remove)
+    from .store import FarmValuesStore
+
+    await FarmValuesStore(hass, entry.entry_id).async_remove()
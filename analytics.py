@@ -0,0 +1,133 @@
+"""Profit and cost analytics for the Chicken Farm integration.
+
+The first refresh starts from the ledger's totals, read together with
+the last event id and the first and last event day. Every refresh after
+that folds only the events appended since into per (kind, subtype) sums,
+reading them in pages. No event is kept in memory, so the memory and the
+cost of a refresh do not grow with the history.
+
+All methods block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from math import fsum
+import threading
+
+from .const import (
+    LEDGER_EGGS,
+    LEDGER_HATCHERY,
+    LEDGER_PURCHASE,
+    LEDGER_SALES,
+    LEDGER_STORAGE,
+)
+from .ledger import FarmLedger
+
+# Purchase types bought by weight -> result key of their cost per kg
+FEED_TYPES = {
+    "Pellets": "cost_per_kg_pellets",
+    "Scratch Grains": "cost_per_kg_scratch_grains",
+}
+
+REFRESH_PAGE = 5000  # Events read from the ledger at a time
+
+
+class FarmAnalytics:
+    """Running aggregates of a farm's ledger."""
+
+    def __init__(self) -> None:
+        """Initialize the analytics engine."""
+        self._lock = threading.Lock()
+        self._last_id: int | None = None  # None until started from the totals
+        # (kind, subtype) -> [quantity, amount]
+        self._totals: dict[tuple[str, str], list[float]] = {}
+        self._first_day: int | None = None
+        self._last_day: int | None = None
+
+    def refresh(self, ledger: FarmLedger) -> int:
+        """Fold the events appended since the last refresh into the sums.
+
+        Returns the number of events folded in.
+        """
+        with self._lock:
+            if self._last_id is None:
+                return self._start(ledger)
+            folded = 0
+            while rows := ledger.events_since(self._last_id, REFRESH_PAGE):
+                for _event_id, day, kind, subtype, quantity, amount in rows:
+                    total = self._totals.setdefault((kind, subtype), [0.0, 0.0])
+                    total[0] += quantity
+                    total[1] += amount
+                    self._add_day(date.fromisoformat(day).toordinal())
+                self._last_id = rows[-1][0]
+                folded += len(rows)
+                if len(rows) < REFRESH_PAGE:
+                    break
+            return folded
+
+    def _start(self, ledger: FarmLedger) -> int:
+        """Start from the ledger totals instead of replaying the events."""
+        last_id, totals, first_day, last_day = ledger.snapshot()
+        self._last_id = last_id
+        self._totals = {
+            (kind, subtype): [quantity, amount]
+            for kind, subtype, quantity, amount, _ in totals
+        }
+        self._first_day = self._last_day = None
+        for day in (first_day, last_day):
+            if day is not None:
+                self._add_day(date.fromisoformat(day).toordinal())
+        return sum(count for *_, count in totals)
+
+    def _add_day(self, day: int) -> None:
+        """Widen the span of event days to a day."""
+        if self._first_day is None or day < self._first_day:
+            self._first_day = day
+        if self._last_day is None or day > self._last_day:
+            self._last_day = day
+
+    def _sums(self, kind: str, subtype: str | None = None) -> tuple[float, float]:
+        """Return the (quantity, amount) sums of a kind or subtype."""
+        quantity = amount = 0.0
+        for (total_kind, total_subtype), total in self._totals.items():
+            if total_kind == kind and subtype in (None, total_subtype):
+                quantity += total[0]
+                amount += total[1]
+        return quantity, amount
+
+    def compute(self, hens: float) -> dict[str, float | None]:
+        """Return the derived figures from the running aggregates."""
+        with self._lock:
+            eggs, _ = self._sums(LEDGER_EGGS)
+            _, total_cost = self._sums(LEDGER_PURCHASE)
+            # Sales entered on the sliders and sales from the order book
+            revenue = (
+                self._sums(LEDGER_STORAGE, "sold")[1] + self._sums(LEDGER_SALES)[1]
+            )
+            hatched, _ = self._sums(LEDGER_HATCHERY, "hatched")
+            died, _ = self._sums(LEDGER_HATCHERY, "died")
+            feed_cost = fsum(self._sums(LEDGER_PURCHASE, feed)[1] for feed in FEED_TYPES)
+            days = (
+                self._last_day - self._first_day + 1
+                if self._first_day is not None
+                else 0
+            )
+            results: dict[str, float | None] = {
+                key: _ratio(*reversed(self._sums(LEDGER_PURCHASE, feed)))
+                for feed, key in FEED_TYPES.items()
+            }
+        results["total_cost"] = total_cost
+        results["revenue"] = revenue
+        results["profit"] = revenue - total_cost
+        results["feed_cost_per_egg"] = _ratio(feed_cost, eggs)
+        results["laying_rate"] = _ratio(eggs, days * hens)
+        results["hatch_rate"] = _ratio(100 * hatched, hatched + died)
+        return results
+
+
+def _ratio(numerator: float, denominator: float) -> float | None:
+    """Divide, returning None when there is nothing to divide by."""
+    if not denominator:
+        return None
+    return round(numerator / denominator, 4)
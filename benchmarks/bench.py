@@ -0,0 +1,371 @@
+"""Micro-benchmarks and load tests of the Chicken Farm integration.
+
+Sets up 1 to 500 farms on a stub HomeAssistant and measures entry setup,
+number writes, the save services, bursts of storage changes and nest box
+reports fanned out over 1 to 100 boxes, and satellite pushes merged at a
+central farm as the history grows. Reports
+latency percentiles, state writes and state_changed fan-out per operation
+and memory per farm. The import time of the package and its platforms and
+the setup latency are checked against the startup budgets on every run.
+
+    python benchmarks/bench.py                       # print the results
+    python benchmarks/bench.py --save baseline       # store a baseline
+    python benchmarks/bench.py --compare baseline    # fail on regressions
+
+Baselines are JSON files in benchmarks/baselines.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from stub_hass import (
+    EVENT_STATE_CHANGED,
+    StubHass,
+    integration_path,
+    load_integration,
+    make_entry,
+)
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+DEFAULT_FARMS = [1, 10, 100, 500]
+DEFAULT_BURSTS = [1, 10, 100]
+OPERATIONS = 200  # Timed operations per measurement
+LATENCY_FACTOR = 2.0  # Median slowdown reported as a regression
+COUNT_FACTOR = 1.25  # Increase of writes or memory reported as a regression
+LATENCY_FLOOR_MS = 0.05  # Latencies below this are too noisy to compare
+
+# Startup budgets, checked on every run
+IMPORT_BUDGET_MS = 30.0  # Importing the package, Home Assistant already loaded
+SETUP_BUDGET_MS = 50.0  # p95 of setting up one farm and its entities
+
+# Imports the package in a fresh interpreter where the core is already loaded,
+# as it is when Home Assistant sets up the integration
+IMPORT_SCRIPT = """
+import sys, time
+import homeassistant.core, homeassistant.helpers.config_validation
+import homeassistant.helpers.entity_platform
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+"""
+
+STORAGE_KEYS = ["broken_eggs", "eggs_used", "eggs_to_hatchery", "eggs_sold_amount"]
+NEST_BOXES = [1, 10, 100]  # Boxes the nest box reports are spread over
+REPORTS = 1000  # Nest box reports per measurement
+FEDERATION_DELTAS = [10, 100]  # Ledger events per satellite push
+PUSHES = 20  # Timed pushes per measurement, the history growing between them
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Return p50, p95, p99 and max of latencies in milliseconds."""
+    ordered = sorted(samples)
+
+    def _at(share: float) -> float:
+        return round(ordered[min(int(share * len(ordered)), len(ordered) - 1)] * 1000, 4)
+
+    return {"p50": _at(0.5), "p95": _at(0.95), "p99": _at(0.99), "max": _at(1.0)}
+
+
+def measure_imports(runs: int = 3) -> dict[str, float]:
+    """Return the best import time of the package and of each platform in ms."""
+    packages = integration_path()
+    results = {}
+    for module in ("chicken", "chicken.number", "chicken.sensor"):
+        results[module] = round(
+            min(
+                float(
+                    subprocess.run(
+                        [sys.executable, "-c", IMPORT_SCRIPT.format(module=module), packages],
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    ).stdout
+                )
+                for _ in range(runs)
+            ),
+            3,
+        )
+    return results
+
+
+def check_budgets(results: dict) -> list[str]:
+    """Return the startup measurements over their budget."""
+    exceeded = []
+    if (imported := results["import_ms"]["chicken"]) > IMPORT_BUDGET_MS:
+        exceeded.append(f"import_ms.chicken: {imported} > {IMPORT_BUDGET_MS} ms")
+    for farms, result in results.items():
+        if isinstance(result, dict) and "setup_entry_ms" in result:
+            if (setup := result["setup_entry_ms"]["p95"]) > SETUP_BUDGET_MS:
+                exceeded.append(
+                    f"farms={farms}.setup_entry_ms.p95: {setup} > {SETUP_BUDGET_MS} ms"
+                )
+    return exceeded
+
+
+class Probe:
+    """Counters of the stub taken around a measured block."""
+
+    def __init__(self, hass: StubHass) -> None:
+        """Take the counters before the block."""
+        self._hass = hass
+        self._writes = sum(hass.states.writes.values())
+        self._events = hass.bus.fired[EVENT_STATE_CHANGED]
+        self._deliveries = hass.bus.deliveries
+
+    def per_operation(self, operations: int) -> dict[str, float]:
+        """Return the counter increase per operation."""
+        hass = self._hass
+        return {
+            "state_writes": round(
+                (sum(hass.states.writes.values()) - self._writes) / operations, 3
+            ),
+            "state_changed": round(
+                (hass.bus.fired[EVENT_STATE_CHANGED] - self._events) / operations, 3
+            ),
+            "deliveries": round((hass.bus.deliveries - self._deliveries) / operations, 3),
+        }
+
+
+async def _setup_farms(
+    hass: StubHass, package: Any, farms: int, options: dict
+) -> tuple[list, list]:
+    """Set up farms and return their entries and setup latencies."""
+    await package.async_setup(hass, {})
+    entries, samples = [], []
+    for index in range(farms):
+        entry = make_entry(index, options)
+        start = time.perf_counter()
+        await package.async_setup_entry(hass, entry)
+        samples.append(time.perf_counter() - start)
+        entries.append(entry)
+    await hass.async_block_till_done()
+    return entries, samples
+
+
+async def bench_farms(
+    package: Any, farms: int, bursts: list[int], listeners: int, options: dict
+) -> dict:
+    """Run every measurement for a number of farms."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    hass = StubHass(package)
+    for _ in range(listeners):
+        hass.bus.async_listen(EVENT_STATE_CHANGED, lambda event: None)
+    entries, setup = await _setup_farms(hass, package, farms, options)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    domain = package.DOMAIN
+    result: dict[str, Any] = {
+        "farms": farms,
+        "memory_per_farm_kb": round(memory / farms / 1024, 1),
+        "setup_entry_ms": percentiles(setup),
+    }
+    target = entries[-1].entry_id
+    farm = hass.data[domain][target]
+
+    # Number writes through the entity
+    number = farm.numbers["number_of_hens"]
+    probe, samples = Probe(hass), []
+    for value in range(OPERATIONS):
+        start = time.perf_counter()
+        await number.async_set_native_value(float(value % 50 + 1))
+        samples.append(time.perf_counter() - start)
+    await hass.async_block_till_done()
+    result["set_native_value"] = {
+        "latency_ms": percentiles(samples),
+        **probe.per_operation(OPERATIONS),
+    }
+
+    # Save services, including the ledger append in the executor
+    for service, data in (
+        ("save_daily_eggs", {"white_eggs": 3, "brown_eggs": 5}),
+        ("save_storage_data", {"eggs_sold_amount": 2, "eggs_sold_value": 1.5}),
+        (
+            "save_purchase",
+            {
+                "purchase_type": "Pellets",
+                "purchase_weight": 20,
+                "purchase_cost": 12.5,
+                "purchase_date": "2024-01-01",
+            },
+        ),
+    ):
+        probe, samples = Probe(hass), []
+        for _ in range(OPERATIONS // 4):
+            start = time.perf_counter()
+            await hass.services.async_call(domain, service, {"entry_id": target, **data})
+            await hass.async_block_till_done()
+            samples.append(time.perf_counter() - start)
+        result[service] = {
+            "latency_ms": percentiles(samples),
+            **probe.per_operation(OPERATIONS // 4),
+        }
+
+    # Bursts of storage changes in one loop iteration
+    result["storage_burst"] = {}
+    for burst in bursts:
+        probe, samples = Probe(hass), []
+        for round_ in range(OPERATIONS // 10):
+            start = time.perf_counter()
+            for step in range(burst):
+                key = STORAGE_KEYS[step % len(STORAGE_KEYS)]
+                farm.numbers[key].async_apply_value(float(round_ * burst + step + 1))
+            await hass.async_block_till_done()
+            samples.append(time.perf_counter() - start)
+        result["storage_burst"][str(burst)] = {
+            "latency_ms": percentiles(samples),
+            **probe.per_operation(OPERATIONS // 10),
+        }
+
+    # Nest box reports, timed per batch of ten and applied in one flush
+    result["ingest"] = {}
+    colors = {"green": "olive", "blue": "mint"}
+    for boxes in NEST_BOXES:
+        farm.ingest.async_configure(
+            {
+                "nest_boxes": {
+                    f"box{box}": {"colors": colors, "default": "brown"}
+                    for box in range(boxes)
+                },
+                "ingest_debounce": 0,
+            }
+        )
+        farm.async_apply_batch({"olive_eggs_daily": 0})
+        probe, samples = Probe(hass), []
+        for batch in range(REPORTS // 10):
+            start = time.perf_counter()
+            for report in range(batch * 10, batch * 10 + 10):
+                farm.ingest.async_report(
+                    f"box{report % boxes}", "green", f"{boxes}-{report}"
+                )
+            samples.append(time.perf_counter() - start)
+        await farm.ingest.async_flush()
+        await hass.async_block_till_done()
+        result["ingest"][str(boxes)] = {
+            "latency_ms": percentiles(samples),
+            **probe.per_operation(REPORTS),
+        }
+
+    # Satellite pushes to a central farm in the same process
+    federation = sys.modules[f"{package.__name__}.federation"]
+    ledger = sys.modules[f"{package.__name__}.ledger"]
+    central = hass.data[domain][entries[0].entry_id]
+    central.federation.role = "central"
+    farm.federation.transport = federation.LocalTransport(central.federation)
+    result["federation"] = {}
+    for delta in FEDERATION_DELTAS:
+        events = [ledger.LedgerEvent("2024-01-01", "eggs", "white", 1)] * delta
+        samples = []
+        for _ in range(PUSHES):
+            await farm.async_append(events)
+            start = time.perf_counter()
+            await farm.federation.async_push()
+            samples.append(time.perf_counter() - start)
+        result["federation"][str(delta)] = {"latency_ms": percentiles(samples)}
+
+    # Number changes that did not cost a write of the values document
+    result["store"] = farm.store.stats()
+    if farm.instrumentation.enabled:
+        result["instrumentation"] = farm.instrumentation.snapshot()["hot_paths"]
+    for entry in entries:
+        await hass.data[domain].pop(entry.entry_id).async_unload()
+    return result
+
+
+def compare(baseline: dict, results: dict, tolerance: float = LATENCY_FACTOR) -> list[str]:
+    """Return the median latencies, write counts and memory that regressed.
+
+    Tail latencies of a single run are too noisy to gate on, so they are
+    only reported; the counts are deterministic.
+    """
+    regressions = []
+
+    def _walk(old: Any, new: Any, path: str) -> None:
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key, value in old.items():
+                if key in new:
+                    _walk(value, new[key], f"{path}.{key}" if path else key)
+            return
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            return
+        if path.endswith(".p50") and max(old, new) >= LATENCY_FLOOR_MS:
+            if new > old * tolerance:
+                regressions.append(f"{path}: {old} -> {new} ms")
+        elif path.endswith(("state_writes", "state_changed", "memory_per_farm_kb")):
+            if new > old * COUNT_FACTOR and new - old > 0.5:
+                regressions.append(f"{path}: {old} -> {new}")
+
+    for farms, result in results.items():
+        if farms in baseline:
+            _walk(baseline[farms], result, f"farms={farms}")
+    return regressions
+
+
+async def main() -> int:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--farms", type=int, nargs="+", default=DEFAULT_FARMS)
+    parser.add_argument("--bursts", type=int, nargs="+", default=DEFAULT_BURSTS)
+    parser.add_argument(
+        "--listeners", type=int, default=1, help="state_changed listeners on the bus"
+    )
+    parser.add_argument(
+        "--instrumentation",
+        action="store_true",
+        help="run with the hot path timing of the integration enabled",
+    )
+    parser.add_argument("--save", metavar="NAME", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=LATENCY_FACTOR,
+        help="median slowdown reported as a regression",
+    )
+    args = parser.parse_args()
+
+    package = load_integration()
+    options = {"instrumentation": True} if args.instrumentation else {}
+    # Untimed warm-up so imports and first calls do not skew the first sweep
+    await bench_farms(package, 1, args.bursts, args.listeners, options)
+    results: dict[str, Any] = {"import_ms": measure_imports()}
+    print(json.dumps(results["import_ms"], indent=2))
+    for farms in args.farms:
+        results[str(farms)] = await bench_farms(
+            package, farms, args.bursts, args.listeners, options
+        )
+        print(json.dumps(results[str(farms)], indent=2))
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.save}.json"), "w") as file:
+            json.dump(results, file, indent=2)
+    failed = False
+    for exceeded in check_budgets(results):
+        print(f"BUDGET {exceeded}")
+        failed = True
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as file:
+            regressions = compare(json.load(file), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,296 @@
+"""Lightweight stand-in for HomeAssistant used by the benchmarks.
+
+Only the parts of the core the integration touches are implemented: the
+state machine, the service registry, the event bus, config entries and
+the job helpers. Every state write, fired event and listener call is
+counted, so the benchmarks can report writes and fan-out per operation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+import importlib
+import os
+import sys
+import tempfile
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+from homeassistant.components.number import NumberEntity
+from homeassistant.core import (
+    Context,
+    CoreState,
+    HassJob,
+    HassJobType,
+    ServiceCall,
+    SupportsResponse,
+)
+from homeassistant.helpers.entity import EntityPlatformState
+from homeassistant.helpers.restore_state import DATA_RESTORE_STATE
+from homeassistant.util import slugify
+
+EVENT_STATE_CHANGED = "state_changed"
+
+
+def integration_path() -> str:
+    """Return a directory holding this checkout as the package "chicken"."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    packages = tempfile.mkdtemp(prefix="chicken-bench-")
+    os.symlink(root, os.path.join(packages, "chicken"))
+    return packages
+
+
+def load_integration() -> ModuleType:
+    """Import the integration in this checkout as the package "chicken"."""
+    sys.path.insert(0, integration_path())
+    return importlib.import_module("chicken")
+
+
+class StubStates:
+    """State machine keeping the last state of every entity."""
+
+    def __init__(self, hass: StubHass) -> None:
+        """Initialize the state machine."""
+        self._hass = hass
+        self._states: dict[str, tuple[str, dict[str, Any]]] = {}
+        self.writes: Counter[str] = Counter()
+
+    def get(self, entity_id: str) -> SimpleNamespace | None:
+        """Return the state of an entity."""
+        if (state := self._states.get(entity_id)) is None:
+            return None
+        return SimpleNamespace(entity_id=entity_id, state=state[0], attributes=state[1])
+
+    def async_set(
+        self,
+        entity_id: str,
+        new_state: str,
+        attributes: dict[str, Any] | None = None,
+        force_update: bool = False,
+        context: Context | None = None,
+        state_info: Any = None,
+    ) -> None:
+        """Store a state and fire state_changed when it changed."""
+        old = self._states.get(entity_id)
+        new = (new_state, attributes or {})
+        self.writes[entity_id] += 1
+        if old == new and not force_update:
+            return
+        self._states[entity_id] = new
+        self._hass.bus.async_fire(
+            EVENT_STATE_CHANGED, {"entity_id": entity_id, "new_state": new_state}
+        )
+
+
+class StubBus:
+    """Event bus counting fired events and listener calls."""
+
+    def __init__(self, hass: StubHass) -> None:
+        """Initialize the bus."""
+        self._hass = hass
+        self._listeners: dict[str, list[Callable]] = {}
+        self.fired: Counter[str] = Counter()
+        self.deliveries = 0
+
+    def async_listen(self, event_type: str, listener: Callable) -> Callable[[], None]:
+        """Listen for an event type."""
+        self._listeners.setdefault(event_type, []).append(listener)
+        return lambda: self._listeners[event_type].remove(listener)
+
+    def async_listen_once(self, event_type: str, listener: Callable) -> Callable[[], None]:
+        """Listen for the next event of a type."""
+        remove = None
+
+        def _once(event: Any) -> None:
+            remove()
+            result = listener(event)
+            if asyncio.iscoroutine(result):
+                self._hass.async_create_task(result)
+
+        remove = self.async_listen(event_type, _once)
+        return remove
+
+    def async_fire(self, event_type: str, event_data: dict | None = None, **_: Any) -> None:
+        """Fire an event and call its listeners."""
+        self.fired[event_type] += 1
+        for listener in self._listeners.get(event_type, ()):
+            self.deliveries += 1
+            listener(SimpleNamespace(event_type=event_type, data=event_data or {}))
+
+    def fire(self, event_type: str, event_data: dict | None = None, **_: Any) -> None:
+        """Fire an event from a thread."""
+        self._hass.loop.call_soon_threadsafe(self.async_fire, event_type, event_data)
+
+
+class StubServices:
+    """Service registry validating data against the registered schema."""
+
+    def __init__(self) -> None:
+        """Initialize the registry."""
+        self._services: dict[tuple[str, str], tuple[Callable, Any, SupportsResponse]] = {}
+        self.calls: Counter[str] = Counter()
+
+    def async_register(
+        self,
+        domain: str,
+        service: str,
+        service_func: Callable,
+        schema: Any = None,
+        supports_response: SupportsResponse = SupportsResponse.NONE,
+    ) -> None:
+        """Register a service."""
+        self._services[(domain, service)] = (service_func, schema, supports_response)
+
+    def has_service(self, domain: str, service: str) -> bool:
+        """Return if a service is registered."""
+        return (domain, service) in self._services
+
+    async def async_call(
+        self,
+        domain: str,
+        service: str,
+        service_data: dict | None = None,
+        blocking: bool = True,
+        context: Context | None = None,
+        return_response: bool = False,
+    ) -> Any:
+        """Validate the data and run a service handler."""
+        handler, schema, _ = self._services[(domain, service)]
+        data = dict(service_data or {})
+        if schema is not None:
+            data = schema(data)
+        self.calls[f"{domain}.{service}"] += 1
+        call = ServiceCall(domain, service, data, context or Context(), return_response)
+        result = handler(call)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+
+class StubConfigEntries:
+    """Config entries that set up the platforms of the integration directly."""
+
+    def __init__(self, hass: StubHass, package: ModuleType) -> None:
+        """Initialize the config entries."""
+        self._hass = hass
+        self._package = package
+        self.entities: dict[str, list] = {}  # Entry id -> entities added
+
+    def async_update_entry(self, entry: Any, **kwargs: Any) -> bool:
+        """Update a config entry in place."""
+        for key, value in kwargs.items():
+            setattr(entry, key, value)
+        return True
+
+    async def async_forward_entry_setups(self, entry: Any, platforms: list) -> None:
+        """Set up each entity platform module of the integration."""
+        for platform in platforms:
+            module = importlib.import_module(f"{self._package.__name__}.{platform}")
+            added: list = []
+            await module.async_setup_entry(self._hass, entry, added.extend)
+            for entity in added:
+                await self._hass.async_add_entity(entry, entity)
+
+    async def async_unload_platforms(self, entry: Any, platforms: list) -> bool:
+        """Remove the entities of an entry."""
+        for entity in self.entities.pop(entry.entry_id, []):
+            await entity.async_remove()
+        return True
+
+
+class StubHass:
+    """Stand-in for HomeAssistant with counting state machine, bus and services."""
+
+    def __init__(self, package: ModuleType, config_dir: str | None = None) -> None:
+        """Initialize the stub."""
+        self.loop = asyncio.get_running_loop()
+        self.state = CoreState.running
+        self.data: dict[str, Any] = {DATA_RESTORE_STATE: SimpleNamespace(last_states={})}
+        self.states = StubStates(self)
+        self.bus = StubBus(self)
+        self.services = StubServices()
+        self.config_entries = StubConfigEntries(self, package)
+        config_dir = config_dir or tempfile.mkdtemp(prefix="chicken-config-")
+        os.makedirs(os.path.join(config_dir, ".storage"), exist_ok=True)
+        self.config = SimpleNamespace(
+            config_dir=config_dir,
+            latitude=52.0,
+            time_zone="UTC",
+            components=set(),
+            path=lambda *parts: os.path.join(config_dir, *parts),
+            is_allowed_path=lambda path: True,
+        )
+        self._entity_ids: set[str] = set()
+        self._tasks: set[asyncio.Future] = set()
+
+    async def async_add_executor_job(self, target: Callable, *args: Any) -> Any:
+        """Run a blocking function in the default executor."""
+        return await self.loop.run_in_executor(None, target, *args)
+
+    def async_create_task(self, target: Any, name: str | None = None, **_: Any) -> asyncio.Task:
+        """Schedule a coroutine."""
+        task = self.loop.create_task(target, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def async_run_hass_job(self, hassjob: HassJob, *args: Any) -> asyncio.Future | None:
+        """Run a callback now, or schedule a coroutine."""
+        if hassjob.job_type is HassJobType.Callback:
+            hassjob.target(*args)
+            return None
+        if hassjob.job_type is HassJobType.Coroutinefunction:
+            return self.async_create_task(hassjob.target(*args))
+        return self.loop.run_in_executor(None, hassjob.target, *args)
+
+    async def async_block_till_done(self) -> None:
+        """Wait for the scheduled tasks and pending callbacks."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    async def async_add_entity(self, entry: Any, entity: Any) -> None:
+        """Add an entity the way an entity platform would."""
+        domain = "number" if isinstance(entity, NumberEntity) else "sensor"
+        object_id = slugify(f"{entry.title} {entity.name}")
+        entity_id = f"{domain}.{object_id}"
+        suffix = 2
+        while entity_id in self._entity_ids:
+            entity_id = f"{domain}.{object_id}_{suffix}"
+            suffix += 1
+        self._entity_ids.add(entity_id)
+        platform = SimpleNamespace(
+            platform_name=entry.domain,
+            domain=domain,
+            config_entry=entry,
+            platform_translations={},
+            component_translations={},
+            object_id_platform_translations={},
+            object_id_component_translations={},
+        )
+        # What add_to_platform_start does, without the entity registry
+        entity.entity_id = entity_id
+        entity.hass = self
+        entity.platform = platform
+        entity._platform_state = EntityPlatformState.ADDED
+        await entity.async_added_to_hass()
+        entity.async_write_ha_state()
+        self.config_entries.entities.setdefault(entry.entry_id, []).append(entity)
+
+
+def make_entry(index: int, options: dict | None = None) -> SimpleNamespace:
+    """Return a config entry of a benchmark farm."""
+    return SimpleNamespace(
+        entry_id=f"farm{index:04d}",
+        domain="chicken",
+        title=f"Farm {index}",
+        version=1,
+        minor_version=2,
+        data={},
+        options=options or {},
+        add_update_listener=lambda listener: lambda: None,
+        async_on_unload=lambda func: None,
+    )
@@ -3,25 +3,79 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import selector
+from homeassistant.util import dt as dt_util
 from .const import (
+    ATTR_ENTRY_ID,
     DOMAIN,
     CONF_FARM_NAME,
     CONF_FARM_SIZE,
     CONF_CHICKEN_TYPE,
+    CONF_DAY_CLOSE_TIME,
+    CONF_FEDERATION_ROLE,
+    CONF_FEDERATION_SITE,
+    CONF_FEDERATION_URL,
+    CONF_FEDERATION_WEBHOOK_ID,
+    CONF_INGEST_DEBOUNCE,
+    CONF_INGEST_WINDOW,
+    CONF_INSTRUMENTATION,
+    CONF_LOOP_BUDGET_MS,
+    CONF_NEST_BOXES,
+    CONF_PRICE_TIERS,
+    CONF_TIME_ZONE,
+    CONF_WEBHOOK_ID,
     DEFAULT_FARM_NAME,
     DEFAULT_FARM_SIZE,
     DEFAULT_CHICKEN_TYPE,
+    DEFAULT_INGEST_DEBOUNCE,
+    DEFAULT_INGEST_WINDOW,
+    DEFAULT_LOOP_BUDGET_MS,
+    EGG_TYPES,
+    FEDERATION_CENTRAL,
+    FEDERATION_OFF,
+    FEDERATION_ROLES,
+    FEDERATION_SATELLITE,
+    FORMAT_CSV,
+    IMPORT_FORMATS,
+    PRICE_TIER_DEFAULT,
+    PRICE_TIER_UNITS,
 )
 
 # Validation constants
 VALID_FARM_SIZES = ["Small", "Medium", "Large"]
 VALID_CHICKEN_TYPES = ["Rhode Island Red", "Plymouth Rock", "Sussex"]
 
+# Box (source entity or webhook box name) -> egg type, or a color map
+NEST_BOXES_SCHEMA = vol.Schema(
+    {
+        cv.string: vol.Any(
+            vol.In(EGG_TYPES),
+            {
+                vol.Optional("colors", default={}): {cv.string: vol.In(EGG_TYPES)},
+                vol.Optional("default"): vol.In(EGG_TYPES),
+            },
+        )
+    }
+)
+
+# Egg type or "default" -> price per egg, per dozen and per tray
+PRICE_TIERS_SCHEMA = vol.Schema(
+    {
+        vol.In([PRICE_TIER_DEFAULT, *EGG_TYPES]): {
+            vol.Optional(unit): vol.All(vol.Coerce(float), vol.Range(min=0))
+            for unit in PRICE_TIER_UNITS
+        }
+    }
+)
+
 
 class ChickenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Chicken Farm."""
 
     VERSION = 1
+    MINOR_VERSION = 2  # 2: stable entity unique ids
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
@@ -59,6 +113,9 @@ class ChickenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_import(self, import_config):
         """Handle import from YAML."""
+        for entry in self._async_current_entries():
+            if entry.source == config_entries.SOURCE_IMPORT:
+                return self.async_abort(reason="already_configured")
         return self.async_create_entry(
             title=import_config.get(CONF_FARM_NAME, DEFAULT_FARM_NAME),
             data=import_config,
@@ -79,12 +136,62 @@ class ChickenOptionsFlow(config_entries.OptionsFlow):
         self.config_entry = config_entry
 
     async def async_step_init(self, user_input=None):
+        """Choose which options to change, or import history."""
+        return self.async_show_menu(
+            step_id="init",
+            menu_options=[
+                "settings",
+                "nest_boxes",
+                "day_close",
+                "price_tiers",
+                "federation",
+                "import_history",
+            ],
+        )
+
+    async def async_step_import_history(self, user_input=None):
+        """Import egg and purchase history from a file."""
+        errors = {}
+        if user_input is not None:
+            try:
+                report = await self.hass.services.async_call(
+                    DOMAIN,
+                    "import_history",
+                    {ATTR_ENTRY_ID: self.config_entry.entry_id, **user_input},
+                    blocking=True,
+                    return_response=True,
+                )
+            except ServiceValidationError:
+                errors["path"] = "invalid_path"
+            else:
+                return self.async_abort(
+                    reason="import_complete",
+                    description_placeholders={
+                        "imported": str(report["imported"]),
+                        "rejected": str(report["rejected"]),
+                    },
+                )
+
+        return self.async_show_form(
+            step_id="import_history",
+            data_schema=vol.Schema(
+                {
+                    vol.Required("path"): str,
+                    vol.Required("format", default=FORMAT_CSV): vol.In(IMPORT_FORMATS),
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_settings(self, user_input=None):
         """Manage options."""
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            return self.async_create_entry(
+                title="", data={**self.config_entry.options, **user_input}
+            )
 
         return self.async_show_form(
-            step_id="init",
+            step_id="settings",
             data_schema=vol.Schema(
                 {
                     vol.Required(
@@ -105,6 +212,181 @@ class ChickenOptionsFlow(config_entries.OptionsFlow):
                             CONF_CHICKEN_TYPE, DEFAULT_CHICKEN_TYPE
                         ),
                     ): vol.In(VALID_CHICKEN_TYPES),
+                    vol.Required(
+                        CONF_INSTRUMENTATION,
+                        default=self.config_entry.options.get(
+                            CONF_INSTRUMENTATION, False
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_LOOP_BUDGET_MS,
+                        default=self.config_entry.options.get(
+                            CONF_LOOP_BUDGET_MS, DEFAULT_LOOP_BUDGET_MS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
                 }
             ),
         )
+
+    async def async_step_nest_boxes(self, user_input=None):
+        """Configure the nest boxes that report lays."""
+        errors = {}
+        options = self.config_entry.options
+        if user_input is not None:
+            try:
+                user_input[CONF_NEST_BOXES] = NEST_BOXES_SCHEMA(
+                    user_input.get(CONF_NEST_BOXES, {})
+                )
+            except vol.Invalid:
+                errors[CONF_NEST_BOXES] = "invalid_nest_boxes"
+            else:
+                data = {**options, **user_input}
+                if CONF_WEBHOOK_ID not in user_input:
+                    data.pop(CONF_WEBHOOK_ID, None)  # Cleared
+                return self.async_create_entry(title="", data=data)
+
+        return self.async_show_form(
+            step_id="nest_boxes",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_NEST_BOXES, default=options.get(CONF_NEST_BOXES, {})
+                    ): selector.ObjectSelector(),
+                    vol.Required(
+                        CONF_INGEST_WINDOW,
+                        default=options.get(CONF_INGEST_WINDOW, DEFAULT_INGEST_WINDOW),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+                    vol.Required(
+                        CONF_INGEST_DEBOUNCE,
+                        default=options.get(
+                            CONF_INGEST_DEBOUNCE, DEFAULT_INGEST_DEBOUNCE
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_WEBHOOK_ID,
+                        description={"suggested_value": options.get(CONF_WEBHOOK_ID)},
+                    ): str,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_day_close(self, user_input=None):
+        """Configure the time the farm's day is closed at."""
+        errors = {}
+        options = self.config_entry.options
+        if user_input is not None:
+            zone = user_input.get(CONF_TIME_ZONE)
+            if zone and dt_util.get_time_zone(zone) is None:
+                errors[CONF_TIME_ZONE] = "invalid_time_zone"
+            else:
+                data = {**options, **user_input}
+                for key in (CONF_DAY_CLOSE_TIME, CONF_TIME_ZONE):
+                    if key not in user_input:
+                        data.pop(key, None)  # Cleared
+                return self.async_create_entry(title="", data=data)
+
+        return self.async_show_form(
+            step_id="day_close",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_DAY_CLOSE_TIME,
+                        description={
+                            "suggested_value": options.get(CONF_DAY_CLOSE_TIME)
+                        },
+                    ): selector.TimeSelector(),
+                    vol.Optional(
+                        CONF_TIME_ZONE,
+                        description={
+                            "suggested_value": options.get(
+                                CONF_TIME_ZONE, self.hass.config.time_zone
+                            )
+                        },
+                    ): str,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_price_tiers(self, user_input=None):
+        """Configure the prices orders are priced from."""
+        errors = {}
+        options = self.config_entry.options
+        if user_input is not None:
+            try:
+                user_input[CONF_PRICE_TIERS] = PRICE_TIERS_SCHEMA(
+                    user_input.get(CONF_PRICE_TIERS, {})
+                )
+            except vol.Invalid:
+                errors[CONF_PRICE_TIERS] = "invalid_price_tiers"
+            else:
+                return self.async_create_entry(
+                    title="", data={**options, **user_input}
+                )
+
+        return self.async_show_form(
+            step_id="price_tiers",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_PRICE_TIERS, default=options.get(CONF_PRICE_TIERS, {})
+                    ): selector.ObjectSelector(),
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_federation(self, user_input=None):
+        """Configure syncing with farms on other Home Assistant instances."""
+        errors = {}
+        options = self.config_entry.options
+        if user_input is not None:
+            role = user_input[CONF_FEDERATION_ROLE]
+            if role == FEDERATION_SATELLITE and not user_input.get(CONF_FEDERATION_URL):
+                errors[CONF_FEDERATION_URL] = "federation_url_required"
+            elif role == FEDERATION_CENTRAL and not user_input.get(
+                CONF_FEDERATION_WEBHOOK_ID
+            ):
+                errors[CONF_FEDERATION_WEBHOOK_ID] = "federation_webhook_required"
+            else:
+                data = {**options, **user_input}
+                for key in (
+                    CONF_FEDERATION_URL,
+                    CONF_FEDERATION_SITE,
+                    CONF_FEDERATION_WEBHOOK_ID,
+                ):
+                    if key not in user_input:
+                        data.pop(key, None)  # Cleared
+                return self.async_create_entry(title="", data=data)
+
+        return self.async_show_form(
+            step_id="federation",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_FEDERATION_ROLE,
+                        default=options.get(CONF_FEDERATION_ROLE, FEDERATION_OFF),
+                    ): vol.In(FEDERATION_ROLES),
+                    vol.Optional(
+                        CONF_FEDERATION_URL,
+                        description={
+                            "suggested_value": options.get(CONF_FEDERATION_URL)
+                        },
+                    ): str,
+                    vol.Optional(
+                        CONF_FEDERATION_SITE,
+                        description={
+                            "suggested_value": options.get(CONF_FEDERATION_SITE)
+                        },
+                    ): str,
+                    vol.Optional(
+                        CONF_FEDERATION_WEBHOOK_ID,
+                        description={
+                            "suggested_value": options.get(CONF_FEDERATION_WEBHOOK_ID)
+                        },
+                    ): str,
+                }
+            ),
+            errors=errors,
+        )
@@ -1,5 +1,10 @@
 """Constants for the Chicken Farm integration."""
 
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cache
+
 from homeassistant.const import Platform
 
 # Domain and platforms
@@ -10,11 +15,39 @@ PLATFORMS = [Platform.SENSOR, Platform.NUMBER]  #  Keep both. You'll have sensor
 CONF_FARM_NAME = "farm_name"
 CONF_FARM_SIZE = "farm_size"
 CONF_CHICKEN_TYPE = "chicken_type"
+CONF_INSTRUMENTATION = "instrumentation"  # Time the hot paths
+CONF_LOOP_BUDGET_MS = "loop_budget_ms"  # Event loop hold that is logged
+CONF_NEST_BOXES = "nest_boxes"  # Box -> egg type or color map
+CONF_INGEST_WINDOW = "ingest_window"  # Seconds lays are batched for
+CONF_INGEST_DEBOUNCE = "ingest_debounce"  # Seconds a box is quiet after a lay
+CONF_WEBHOOK_ID = "webhook_id"  # Webhook receiving nest box reports
+CONF_DAY_CLOSE_TIME = "day_close_time"  # Local time the day is closed at
+CONF_TIME_ZONE = "time_zone"  # Time zone of the farm
+CONF_PRICE_TIERS = "price_tiers"  # Egg type or "default" -> unit prices
+CONF_FEDERATION_ROLE = "federation_role"  # One of FEDERATION_ROLES
+CONF_FEDERATION_URL = "federation_url"  # Webhook URL of the central instance
+CONF_FEDERATION_SITE = "federation_site"  # Id of a satellite at the central
+CONF_FEDERATION_WEBHOOK_ID = "federation_webhook_id"  # Webhook of the central
 
 # Default values
 DEFAULT_FARM_NAME = "My Chicken Farm"
 DEFAULT_FARM_SIZE = "Small"
 DEFAULT_CHICKEN_TYPE = "Rhode Island Red"
+DEFAULT_LOOP_BUDGET_MS = 50
+DEFAULT_INGEST_WINDOW = 5
+DEFAULT_INGEST_DEBOUNCE = 20
+STARTUP_BUDGET_MS = 500  # Farm setup time logged as a warning
+INSTRUMENTATION_KEY = "instrumentation"  # Unique id suffix of the timing sensor
+
+# Federation of farms on separate Home Assistant instances
+FEDERATION_OFF = "off"
+FEDERATION_SATELLITE = "satellite"  # Pushes its deltas to a central instance
+FEDERATION_CENTRAL = "central"  # Merges the deltas of satellites
+FEDERATION_ROLES = [FEDERATION_OFF, FEDERATION_SATELLITE, FEDERATION_CENTRAL]
+
+# Service fields
+ATTR_ENTRY_ID = "entry_id"  # Config entry of the farm a service call targets
+ATTR_IDEMPOTENCY_KEY = "idempotency_key"  # Retries with the same key are no-ops
 
 # Units
 UNIT_KG = "kg"
@@ -33,9 +66,153 @@ PURCHASE_TYPES = ["Pellets", "Scratch Grains", "Bedding", "Misc"]
 
 # Egg Types
 EGG_TYPES = ["white", "beige", "mint", "olive", "brown", "chocolate"]
+PRICE_TIER_DEFAULT = "default"  # Prices of egg types without tiers of their own
+PRICE_TIER_UNITS = ["egg", "dozen", "tray"]
+FORECAST_HORIZONS = (7, 30)  # Forecast horizons in days
 
 # Chicken Types
 CHICKEN_TYPES = ["Rhode Island Red", "Plymouth Rock", "Sussex"]
 
 # Farm Sizes
 FARM_SIZES = ["Small", "Medium", "Large"]
+
+# Ledger event kinds
+LEDGER_EGGS = "eggs"  # Subtype is one of EGG_TYPES
+LEDGER_PURCHASE = "purchase"  # Subtype is one of PURCHASE_TYPES
+LEDGER_STORAGE = "storage"  # Eggs leaving storage
+LEDGER_FLOCK = "flock"  # Birds leaving the flock
+LEDGER_HATCHERY = "hatchery"  # Incubation results
+LEDGER_SALES = "sales"  # Orders, subtype is one of EGG_TYPES
+LEDGER_KINDS = [
+    LEDGER_EGGS,
+    LEDGER_PURCHASE,
+    LEDGER_STORAGE,
+    LEDGER_FLOCK,
+    LEDGER_HATCHERY,
+    LEDGER_SALES,
+]
+
+# History file formats
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMAT_COLUMNAR = "columnar"
+IMPORT_FORMATS = [FORMAT_CSV, FORMAT_JSONL]
+EXPORT_FORMATS = [FORMAT_CSV, FORMAT_JSONL, FORMAT_COLUMNAR]
+EXPORT_EXTENSIONS = {
+    FORMAT_CSV: "csv",
+    FORMAT_JSONL: "jsonl",
+    FORMAT_COLUMNAR: "columns.jsonl",
+}
+DATASET_EVENTS = "events"  # Exported instead of the rollups of a period
+
+# Ledger file, relative to the Home Assistant storage directory
+LEDGER_FILENAME = "chicken.{entry_id}.db"
+
+# Events
+EVENT_IMPORT_PROGRESS = "chicken_import_progress"
+
+# Dispatcher signals
+SIGNAL_ANALYTICS_UPDATED = "chicken_analytics_updated_{entry_id}"
+
+# Field groups, one per save service plus the transient purchase inputs
+GROUP_EGGS = "eggs"
+GROUP_STORAGE = "storage"
+GROUP_PURCHASE = "purchase"
+GROUP_FLOCK = "flock"
+GROUP_HATCHERY = "hatchery"
+GROUP_INPUT = "input"
+
+
+@dataclass(frozen=True, slots=True)
+class ChickenField:
+    """Description of one farm quantity, shared by every farm."""
+
+    key: str
+    name: str
+    icon: str
+    max_value: float
+    step: float = 1
+    unit: str | None = None
+    group: str = GROUP_INPUT
+    ledger: str | None = None  # Ledger kind recorded when the field is saved
+    subtype: str | None = None  # Ledger subtype
+    storage_sign: int = 0  # +1 adds to, -1 takes from the eggs in storage
+    service_key: str | None = None  # Service field, if not the key
+    gauge: bool = False  # A level that is set, rather than a count
+    amount_key: str | None = None  # Field holding the money of the count
+
+    @property
+    def data_key(self) -> str:
+        """Return the service field carrying this quantity."""
+        return self.service_key or self.key
+
+    @property
+    def transient(self) -> bool:
+        """Return whether the field is a scratchpad whose history is useless."""
+        return self.group == GROUP_INPUT
+
+    def clamp(self, value: float) -> float:
+        """Return a value limited to the range of the number."""
+        return min(max(value, 0.0), self.max_value)
+
+
+# Single source of truth for the number entities, service schemas and the
+# numbers tracked by the storage sensor.
+NUMBER_FIELDS: tuple[ChickenField, ...] = (
+    *(
+        ChickenField(
+            f"{egg_type}_eggs_daily",
+            f"{egg_type.title()} Eggs Today",
+            "mdi:egg",
+            100,
+            group=GROUP_EGGS,
+            ledger=LEDGER_EGGS,
+            subtype=egg_type,
+            storage_sign=1,
+            service_key=f"{egg_type}_eggs",
+        )
+        for egg_type in EGG_TYPES
+    ),
+    ChickenField("broken_eggs", "Broken Eggs", "mdi:egg-off", 100, group=GROUP_STORAGE, ledger=LEDGER_STORAGE, subtype="broken", storage_sign=-1),
+    ChickenField("eggs_used", "Eggs Used", "mdi:egg-off", 1000, group=GROUP_STORAGE, ledger=LEDGER_STORAGE, subtype="used", storage_sign=-1),
+    ChickenField("eggs_to_hatchery", "Eggs to Hatchery", "mdi:egg-easter", 1000, group=GROUP_STORAGE, ledger=LEDGER_STORAGE, subtype="hatchery", storage_sign=-1),
+    ChickenField("eggs_sold_amount", "Eggs Sold (Amount)", "mdi:egg", 10000, group=GROUP_STORAGE, ledger=LEDGER_STORAGE, subtype="sold", storage_sign=-1, amount_key="eggs_sold_value"),
+    ChickenField("eggs_sold_value", "Eggs Sold (Value)", "mdi:cash", 10000, 0.01, UNIT_EURO, group=GROUP_STORAGE),
+    ChickenField("pellets_kg", "Pellets Weight (KG)", "mdi:weight-kilogram", 1000, 0.1, group=GROUP_PURCHASE, subtype="Pellets"),
+    ChickenField("pellets_cost", "Pellets Cost", "mdi:cash", 1000, 0.01, UNIT_EURO, group=GROUP_PURCHASE, ledger=LEDGER_PURCHASE, subtype="Pellets"),
+    ChickenField("scratch_grains_kg", "Scratch Grains Weight (KG)", "mdi:weight-kilogram", 1000, 0.1, group=GROUP_PURCHASE, subtype="Scratch Grains"),
+    ChickenField("scratch_grains_cost", "Scratch Grains Cost", "mdi:cash", 1000, 0.01, UNIT_EURO, group=GROUP_PURCHASE, ledger=LEDGER_PURCHASE, subtype="Scratch Grains"),
+    ChickenField("bedding_cost", "Bedding Cost", "mdi:cash", 1000, 0.01, UNIT_EURO, group=GROUP_PURCHASE, ledger=LEDGER_PURCHASE, subtype="Bedding"),
+    ChickenField("misc_cost", "Miscellaneous Cost", "mdi:cash", 1000, 0.01, UNIT_EURO, group=GROUP_PURCHASE, ledger=LEDGER_PURCHASE, subtype="Misc"),
+    ChickenField("number_of_hens", "Number of Hens", "mdi:gender-female", 1000, group=GROUP_FLOCK, gauge=True),
+    ChickenField("number_of_roosters", "Number of Roosters", "mdi:gender-male", 100, group=GROUP_FLOCK, gauge=True),
+    ChickenField("chicken_died", "Chickens Died", "mdi:cross", 1000, group=GROUP_FLOCK, ledger=LEDGER_FLOCK, subtype="died"),
+    ChickenField("chicken_butchered", "Chickens Butchered", "mdi:knife", 1000, group=GROUP_FLOCK, ledger=LEDGER_FLOCK, subtype="butchered"),
+    ChickenField("eggs_in_hatchery", "Eggs in Hatchery", "mdi:egg-easter", 1000, group=GROUP_HATCHERY, ledger=LEDGER_HATCHERY, subtype="incubated"),
+    ChickenField("hatched_eggs", "Hatched Eggs", "mdi:egg-easter", 1000, group=GROUP_HATCHERY, ledger=LEDGER_HATCHERY, subtype="hatched"),
+    ChickenField("died_eggs", "Died Eggs", "mdi:egg-off", 1000, group=GROUP_HATCHERY, ledger=LEDGER_HATCHERY, subtype="died"),
+    ChickenField("purchase_weight", "Purchase Weight", "mdi:weight-kilogram", 1000, 0.1),
+    ChickenField("purchase_cost", "Purchase Cost", "mdi:cash", 1000, 0.01, UNIT_EURO),
+)
+
+
+FIELDS_BY_KEY = {field.key: field for field in NUMBER_FIELDS}
+
+
+@cache
+def fields_in_group(group: str) -> tuple[ChickenField, ...]:
+    """Return the fields of a group."""
+    return tuple(field for field in NUMBER_FIELDS if field.group == group)
+
+
+@cache
+def purchase_fields(purchase_type: str) -> tuple[str | None, str]:
+    """Return the (weight, cost) number keys written by a purchase type."""
+    weight_key = cost_key = None
+    for field in fields_in_group(GROUP_PURCHASE):
+        if field.subtype == purchase_type:
+            if field.ledger is None:
+                weight_key = field.key
+            else:
+                cost_key = field.key
+    return weight_key, cost_key
@@ -0,0 +1,165 @@
+"""In-memory state of a Chicken Farm config entry.
+
+Numbers write their values here as floats, so derived sensors never look
+entities up by id or parse state strings. Every field and derived value
+owns one bit. Listeners subscribe with a mask of the bits they read. Changes
+made in the same event loop iteration are collected into one dirty mask.
+Derived values whose inputs changed are computed once, and only the
+listeners whose mask overlaps the changes are called.
+
+The eggs in storage are the eggs in the storage lots, moved by the counts
+on the numbers that are not booked into the ledger (and the lots) yet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from array import array
+from collections.abc import Callable, Iterable, Mapping
+from math import fsum
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import NUMBER_FIELDS, ChickenField
+from .instrumentation import async_get_instrumentation
+
+# Field key -> position in the value array and bit in the change masks
+FIELD_INDEX = {field.key: index for index, field in enumerate(NUMBER_FIELDS)}
+FIELD_BITS = {key: 1 << index for key, index in FIELD_INDEX.items()}
+
+
+def fields_mask(fields: Iterable[ChickenField]) -> int:
+    """Return the change mask of some fields."""
+    mask = 0
+    for field in fields:
+        mask |= FIELD_BITS[field.key]
+    return mask
+
+
+# Storage field positions and their +1/-1 signs
+_STORAGE_TERMS = tuple(
+    (FIELD_INDEX[field.key], field.storage_sign)
+    for field in NUMBER_FIELDS
+    if field.storage_sign
+)
+
+
+def _eggs_in_storage(coordinator: FarmCoordinator) -> float:
+    """Return the eggs in the lots plus those collected minus those taken since."""
+    values, booked = coordinator.values, coordinator.booked
+    return coordinator.lot_eggs + fsum(
+        sign * (values[index] - booked[index]) for index, sign in _STORAGE_TERMS
+    )
+
+
+# Bit after the fields, changing with the lots and the booked values
+LOTS_BIT = 1 << len(NUMBER_FIELDS)
+
+# Derived value -> (input mask, function of the coordinator)
+DERIVED_VALUES: dict[str, tuple[int, Callable[[FarmCoordinator], float]]] = {
+    "eggs_in_storage": (
+        fields_mask(field for field in NUMBER_FIELDS if field.storage_sign)
+        | LOTS_BIT,
+        _eggs_in_storage,
+    ),
+}
+# Derived values take the bits after that
+DERIVED_BITS = {
+    key: 1 << (len(NUMBER_FIELDS) + 1 + index)
+    for index, key in enumerate(DERIVED_VALUES)
+}
+
+
+class FarmCoordinator:
+    """Typed values of a farm's numbers and the values derived from them."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the farm state."""
+        self.hass = hass
+        self.values = array("d", bytes(8 * len(NUMBER_FIELDS)))
+        # Field values already booked into the ledger, and eggs in the lots
+        self.booked = array("d", bytes(8 * len(NUMBER_FIELDS)))
+        self.lot_eggs = 0.0
+        self.derived = {
+            key: compute(self) for key, (_, compute) in DERIVED_VALUES.items()
+        }
+        self._listeners: list[tuple[int, Callable[[int], None]]] = []
+        self._dirty = 0
+        self._flush_handle: asyncio.Handle | None = None
+        # Recomputes the derived values and the sensors reading them
+        self.async_flush = async_get_instrumentation(hass).wrap(
+            "coordinator_flush", self.async_flush
+        )
+
+    def get(self, key: str) -> float:
+        """Return the value of a field or derived value."""
+        if (index := FIELD_INDEX.get(key)) is not None:
+            return self.values[index]
+        return self.derived[key]
+
+    @callback
+    def async_add_listener(
+        self, update_callback: Callable[[int], None], mask: int
+    ) -> Callable[[], None]:
+        """Call update_callback with the changed bits when bits in mask change."""
+        listener = (mask, update_callback)
+        self._listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            if listener in self._listeners:  # Cleared if the farm was unloaded
+                self._listeners.remove(listener)
+
+        return remove_listener
+
+    @callback
+    def async_set(self, key: str, value: float) -> None:
+        """Store a field value and schedule the listeners if it changed."""
+        index = FIELD_INDEX[key]
+        if self.values[index] == value:
+            return
+        self.values[index] = value
+        self._async_mark_dirty(FIELD_BITS[key])
+
+    @callback
+    def async_set_lots(self, lot_eggs: float, booked: Mapping[str, float]) -> None:
+        """Store the eggs in the lots and the field values booked into them."""
+        self.lot_eggs = lot_eggs
+        for key, value in booked.items():
+            self.booked[FIELD_INDEX[key]] = value
+        self._async_mark_dirty(LOTS_BIT)
+
+    @callback
+    def _async_mark_dirty(self, bits: int) -> None:
+        """Schedule the listeners of changed bits."""
+        self._dirty |= bits
+        # Changes made in the same loop iteration are pushed together
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_soon(self.async_flush)
+
+    @callback
+    def async_flush(self) -> None:
+        """Recompute the affected derived values and notify the listeners."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        changed, self._dirty = self._dirty, 0
+        if not changed:
+            return
+        for key, (inputs, compute) in DERIVED_VALUES.items():
+            if inputs & changed:
+                value = compute(self)
+                if value != self.derived[key]:
+                    self.derived[key] = value
+                    changed |= DERIVED_BITS[key]
+        for mask, update_callback in list(self._listeners):
+            if mask & changed:
+                update_callback(changed)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Drop a pending notification."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._listeners.clear()
@@ -0,0 +1,185 @@
+"""Scheduled day close of a farm.
+
+At the configured local time, in the farm's time zone, the daily egg and
+storage counters are booked into the ledger and zeroed as one mutation of
+the farm. Only what they added since they were last saved is appended.
+The events, the booked values and the close time are committed in one
+transaction, and the counters are zeroed in one batch, so the listeners
+see a single change.
+Days missed while Home Assistant was down are closed in one step after a
+restart. The counters kept since the last close go to the first missed
+day, and the days after it had nothing to close.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta, tzinfo
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_DAY_CLOSE_TIME,
+    CONF_TIME_ZONE,
+    GROUP_EGGS,
+    GROUP_STORAGE,
+    fields_in_group,
+)
+
+if TYPE_CHECKING:
+    from .farm import ChickenFarm
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_NAME = "day_close"  # Key of the last close time in the ledger
+
+
+def credited_day(closed_at: datetime) -> date:
+    """Return the day most of the period ending at a close fell on."""
+    return (closed_at - timedelta(hours=12)).date()
+
+
+class DayClose:
+    """Closes a farm's day at a local time and catches up after restarts."""
+
+    def __init__(self, hass: HomeAssistant, farm: ChickenFarm) -> None:
+        """Initialize a disabled day close."""
+        self.hass = hass
+        self._farm = farm
+        self._time: time | None = None
+        self._zone: tzinfo = dt_util.DEFAULT_TIME_ZONE
+        self._last_close: datetime | None = None
+        self._cancel: CALLBACK_TYPE | None = None
+        self._started = False
+        self.closes = 0
+        self.days_caught_up = 0
+
+    @callback
+    def async_configure(self, options: Mapping[str, Any]) -> None:
+        """Apply the close time and time zone options."""
+        close_time = options.get(CONF_DAY_CLOSE_TIME)
+        self._time = dt_util.parse_time(close_time) if close_time else None
+        zone = options.get(CONF_TIME_ZONE)
+        self._zone = (zone and dt_util.get_time_zone(zone)) or (
+            dt_util.DEFAULT_TIME_ZONE
+        )
+        if self._started:
+            self._async_schedule()
+
+    async def async_start(self) -> None:
+        """Load the last close, close missed days and schedule the next close."""
+        self._started = True
+        state = await self.hass.async_add_executor_job(
+            self._farm.ledger.load_state, STATE_NAME
+        )
+        self._last_close = dt_util.parse_datetime(state) if state else None
+        if self._time is not None:
+            boundary = self._last_boundary(dt_util.utcnow())
+            if self._last_close is None:
+                # First start: the counters so far belong to the coming close
+                self._last_close = boundary
+                await self.hass.async_add_executor_job(
+                    self._farm.ledger.save_state, STATE_NAME, boundary.isoformat()
+                )
+            elif self._last_close < boundary:
+                first = self._next_boundary(self._last_close)
+                self.days_caught_up += (boundary.date() - first.date()).days + 1
+                await self.async_close(boundary, credited_day(first))
+        self._async_schedule()
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the scheduled close."""
+        self._started = False
+        if self._cancel is not None:
+            self._cancel()
+            self._cancel = None
+
+    def _at(self, day: date) -> datetime:
+        """Return the close time of a local day."""
+        assert self._time is not None
+        return datetime.combine(day, self._time, tzinfo=self._zone)
+
+    def _last_boundary(self, now: datetime) -> datetime:
+        """Return the latest scheduled close at or before a moment."""
+        local = now.astimezone(self._zone)
+        if (boundary := self._at(local.date())) <= local:
+            return boundary
+        return self._at(local.date() - timedelta(days=1))
+
+    def _next_boundary(self, after: datetime) -> datetime:
+        """Return the first scheduled close after a moment."""
+        local = after.astimezone(self._zone)
+        if (boundary := self._at(local.date())) > local:
+            return boundary
+        return self._at(local.date() + timedelta(days=1))
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Schedule the next close, if a close time is set."""
+        if self._cancel is not None:
+            self._cancel()
+            self._cancel = None
+        if self._time is None:
+            return
+        self._cancel = async_track_point_in_utc_time(
+            self.hass,
+            self._async_scheduled_close,
+            self._next_boundary(dt_util.utcnow()),
+        )
+
+    async def _async_scheduled_close(self, now: datetime) -> None:
+        """Close the day that just ended and schedule the next close."""
+        self._cancel = None
+        boundary = self._last_boundary(now)
+        await self.async_close(boundary, credited_day(boundary))
+        if self._started:
+            self._async_schedule()
+
+    async def async_close(
+        self,
+        closed_at: datetime,
+        day: date | None = None,
+        idempotency_key: str | None = None,
+    ) -> None:
+        """Book the daily counters into the ledger and zero them atomically."""
+        farm = self._farm
+        # Lays reported before the close belong to the day being closed
+        await farm.ingest.async_flush()
+        day = day or credited_day(closed_at.astimezone(self._zone))
+
+        async def _close() -> None:
+            coordinator = farm.coordinator
+            fields = fields_in_group(GROUP_EGGS) + fields_in_group(GROUP_STORAGE)
+            events, _ = farm.unbooked(
+                {field.key: coordinator.get(field.key) for field in fields},
+                day.isoformat(),
+            )
+            zeros = {field.key: 0 for field in fields}
+            # The counters start the next day at zero, with nothing booked
+            await farm.async_append(
+                events, [(STATE_NAME, closed_at.isoformat())], booked=zeros
+            )
+            self._last_close = closed_at
+            farm.async_apply_batch(zeros)
+            # One notification for all counters, and on disk right away
+            coordinator.async_flush()
+            await farm.store.async_flush()
+            self.closes += 1
+            _LOGGER.debug("Closed %s of %s", day, farm.entry.title)
+
+        await farm.async_mutate(idempotency_key, _close)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the close time and counters."""
+        return {
+            "close_time": self._time.isoformat() if self._time else None,
+            "time_zone": str(self._zone),
+            "last_close": self._last_close.isoformat() if self._last_close else None,
+            "closes": self.closes,
+            "days_caught_up": self.days_caught_up,
+        }
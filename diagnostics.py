@@ -0,0 +1,46 @@
+"""Diagnostics support for Chicken Farm."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONF_FEDERATION_URL,
+    CONF_FEDERATION_WEBHOOK_ID,
+    CONF_WEBHOOK_ID,
+    DOMAIN,
+)
+from .coordinator import FIELD_INDEX
+from .farm import ChickenFarm
+
+# Anyone knowing these can post lays or batches to the farm
+TO_REDACT = {CONF_WEBHOOK_ID, CONF_FEDERATION_URL, CONF_FEDERATION_WEBHOOK_ID}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the farm's values and the hot path timings."""
+    farm: ChickenFarm = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": {
+            "title": entry.title,
+            "version": entry.version,
+            "minor_version": entry.minor_version,
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "instrumentation": farm.instrumentation.snapshot(),
+        "store": farm.store.stats(),
+        "duplicate_mutations": farm.duplicates,
+        "ingest": farm.ingest.stats(),
+        "day_close": farm.day_close.stats(),
+        "sales": await hass.async_add_executor_job(farm.sales.summary),
+        "federation": farm.federation.stats(),
+        "numbers": {key: farm.coordinator.get(key) for key in FIELD_INDEX},
+        "derived": dict(farm.coordinator.derived),
+        "analytics": farm.analytics_results,
+    }
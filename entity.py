@@ -0,0 +1,20 @@
+"""Base entity of the Chicken Farm integration."""
+
+from __future__ import annotations
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .instrumentation import Instrumentation
+
+
+class CountedWritesEntity(Entity):
+    """Entity counting its state writes for the instrumentation."""
+
+    _instrumentation: Instrumentation
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Count the write, then write the state."""
+        self._instrumentation.state_writes += 1
+        super().async_write_ha_state()
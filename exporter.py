@@ -0,0 +1,126 @@
+"""Streaming export of farm history for the Chicken Farm integration.
+
+Ledger events or rollup buckets are read page by page and written through
+a generator pipeline, so memory use is bounded by the page size and not by
+the length of the history. Incremental exports remember the last exported
+event id next to the export file and only append what is newer.
+
+All functions block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+import csv
+import json
+import os
+from typing import Any
+
+from .const import DATASET_EVENTS, FORMAT_CSV, FORMAT_JSONL
+from .ledger import FarmLedger
+
+EVENT_COLUMNS = ["id", "day", "kind", "subtype", "quantity", "amount"]
+ROLLUP_COLUMNS = ["start", "kind", "subtype", "quantity", "amount", "count"]
+
+PAGE_SIZE = 1000  # Rows read per query and per columnar row group
+
+
+def _event_rows(
+    ledger: FarmLedger, start: str | None, end: str | None, after_id: int
+) -> Iterator[tuple]:
+    """Yield ledger events page by page."""
+    while page := ledger.events_page(after_id, PAGE_SIZE, start, end):
+        yield from page
+        after_id = page[-1][0]
+
+
+def _rollup_rows(
+    ledger: FarmLedger, period: str, start: str | None, end: str | None
+) -> Iterator[tuple]:
+    """Yield the rollup buckets of a period."""
+    for bucket in ledger.statistics(period, start or "0000-01-01", end or "9999-12-31"):
+        yield tuple(bucket[column] for column in ROLLUP_COLUMNS)
+
+
+def _pages(rows: Iterable[tuple]) -> Iterator[list[tuple]]:
+    """Group rows into lists of at most PAGE_SIZE."""
+    page: list[tuple] = []
+    for row in rows:
+        page.append(row)
+        if len(page) == PAGE_SIZE:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _write(
+    path: str, file_format: str, columns: list[str], rows: Iterable[tuple], append: bool
+) -> tuple[int, tuple | None]:
+    """Write rows to a file and return (row count, last row)."""
+    count = 0
+    last = None
+    write_header = not (append and os.path.exists(path))
+    with open(path, "a" if append else "w", encoding="utf-8", newline="") as file:
+        if file_format == FORMAT_CSV:
+            writer = csv.writer(file)
+            if write_header:
+                writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+                last = row
+        elif file_format == FORMAT_JSONL:
+            for row in rows:
+                file.write(json.dumps(dict(zip(columns, row))) + "\n")
+                count += 1
+                last = row
+        else:
+            # One row group per line, each holding a list per column
+            for page in _pages(rows):
+                group = {column: list(values) for column, values in zip(columns, zip(*page))}
+                file.write(json.dumps({"rows": len(page), "columns": group}) + "\n")
+                count += len(page)
+                last = page[-1]
+    return count, last
+
+
+def export_history(
+    ledger: FarmLedger,
+    path: str,
+    file_format: str,
+    dataset: str = DATASET_EVENTS,
+    start: str | None = None,
+    end: str | None = None,
+    incremental: bool = False,
+) -> dict[str, Any]:
+    """Export events or rollups to a file and return a report."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if dataset != DATASET_EVENTS:
+        # Rollup buckets change with every append, so they are always rewritten
+        rows, _ = _write(
+            path,
+            file_format,
+            ROLLUP_COLUMNS,
+            _rollup_rows(ledger, dataset, start, end),
+            append=False,
+        )
+        return {"path": path, "rows": rows}
+
+    state_path = f"{path}.state.json"
+    after_id = 0
+    if incremental and os.path.exists(state_path) and os.path.exists(path):
+        with open(state_path, encoding="utf-8") as file:
+            after_id = json.load(file)["last_id"]
+
+    rows, last = _write(
+        path,
+        file_format,
+        EVENT_COLUMNS,
+        _event_rows(ledger, start, end, after_id),
+        append=incremental,
+    )
+    last_id = last[0] if last is not None else after_id
+    with open(state_path, "w", encoding="utf-8") as file:
+        json.dump({"last_id": last_id}, file)
+    return {"path": path, "rows": rows, "last_id": last_id}
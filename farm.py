@@ -0,0 +1,627 @@
+"""Runtime state for a Chicken Farm config entry."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from datetime import date, datetime, time
+import json
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.const import CURRENCY_EURO
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    ATTR_ENTRY_ID,
+    CONF_INSTRUMENTATION,
+    CONF_LOOP_BUDGET_MS,
+    CONF_PRICE_TIERS,
+    DEFAULT_LOOP_BUDGET_MS,
+    DOMAIN,
+    EVENT_IMPORT_PROGRESS,
+    FIELDS_BY_KEY,
+    GROUP_PURCHASE,
+    LEDGER_EGGS,
+    LEDGER_FILENAME,
+    LEDGER_FLOCK,
+    LEDGER_HATCHERY,
+    LEDGER_PURCHASE,
+    LEDGER_SALES,
+    LEDGER_STORAGE,
+    NUMBER_FIELDS,
+    PRICE_TIER_DEFAULT,
+    SIGNAL_ANALYTICS_UPDATED,
+)
+from .coordinator import FIELD_BITS, FarmCoordinator, fields_mask
+from .flock import HENS, ROOSTERS, FlockModel
+from .instrumentation import async_get_instrumentation
+from .ledger import FarmLedger, LedgerEvent
+
+# Ledger kinds fed to long-term statistics: kind -> (use amount, unit)
+STATISTIC_KINDS = {
+    LEDGER_EGGS: (False, "eggs"),
+    LEDGER_PURCHASE: (True, CURRENCY_EURO),
+}
+
+IDEMPOTENCY_KEYS = 256  # Results of keyed mutations remembered per farm
+
+BOOKED_STATE = "booked"  # Model state with the counter values in the ledger
+# Counters booked as the difference to their booked value; purchases are
+# booked one by one
+BOOKED_FIELDS = tuple(
+    field
+    for field in NUMBER_FIELDS
+    if field.ledger is not None and field.group != GROUP_PURCHASE
+)
+
+if TYPE_CHECKING:
+    import voluptuous as vol
+
+    from .analytics import FarmAnalytics
+    from .forecast import FarmForecast
+    from .number import ChickenNumber
+    from .sales import PriceTiers
+
+
+class ChickenFarm:
+    """Entities owned by one Chicken Farm config entry.
+
+    Every farm is its own namespace: entities are grouped under the farm's
+    device, numbers write into the farm's coordinator and derived sensors
+    subscribe to that coordinator only.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the farm."""
+        # Imported with the first farm rather than with the package
+        from .dayclose import DayClose
+        from .federation import Federation
+        from .ingest import NestBoxIngest
+        from .inventory import EggInventory
+        from .sales import SalesBook
+        from .store import FarmValuesStore
+
+        self.hass = hass
+        self.entry = entry
+        self.device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+        )
+        self.numbers: dict[str, ChickenNumber] = {}
+        self.instrumentation = async_get_instrumentation(hass)
+        self.coordinator = FarmCoordinator(hass)
+        self.store = FarmValuesStore(hass, entry.entry_id)
+        self.stored_values: dict[str, float] = {}  # Restored by the numbers
+        self.booked: dict[str, float] = {}  # Counter values already in the ledger
+        self.ledger = FarmLedger(
+            hass.config.path(
+                STORAGE_DIR, LEDGER_FILENAME.format(entry_id=entry.entry_id)
+            )
+        )
+        # Heavy models are imported and built in the executor during setup
+        self.analytics: FarmAnalytics
+        self.analytics_results: dict[str, float | None] = {}
+        self.flock = FlockModel()
+        self.inventory = EggInventory()
+        self.sales = SalesBook()
+        self.price_tiers: dict[str, PriceTiers] = {}
+        self.forecast: FarmForecast
+        self.forecast_results: dict[str, tuple[Any, dict[str, Any]]] = {}
+        self._remove_daily_refresh: Callable[[], None] | None = None
+        # Mutations of this farm run one at a time; other farms are not held up
+        self.lock = asyncio.Lock()
+        self._applied: OrderedDict[str, Any] = OrderedDict()  # Key -> result
+        self.duplicates = 0  # Keyed mutations answered from the cache
+        self.ingest = NestBoxIngest(hass, self)
+        self.day_close = DayClose(hass, self)
+        self.federation = Federation(hass, self)
+        self.async_refresh_analytics = self.instrumentation.wrap(
+            "analytics_refresh", self.async_refresh_analytics
+        )
+        self.async_apply_options()
+
+    @callback
+    def async_apply_options(self) -> None:
+        """Apply the timing, nest box, day close, price and federation options."""
+        self.instrumentation.async_configure(
+            self.entry.entry_id,
+            self.entry.options.get(CONF_INSTRUMENTATION, False),
+            self.entry.options.get(CONF_LOOP_BUDGET_MS, DEFAULT_LOOP_BUDGET_MS),
+        )
+        self.ingest.async_configure(self.entry.options)
+        self.day_close.async_configure(self.entry.options)
+        self.federation.async_configure(self.entry.options)
+        from .sales import parse_price_tiers
+
+        self.price_tiers = parse_price_tiers(
+            self.entry.options.get(CONF_PRICE_TIERS, {})
+        )
+
+    async def async_setup(self) -> None:
+        """Open the farm's ledger and load its flock and analytics."""
+
+        today = dt_util.now().date()
+
+        def _open() -> str | None:
+            # Imported on first use and off the event loop
+            from .analytics import FarmAnalytics
+            from .forecast import FarmForecast
+
+            self.analytics = FarmAnalytics()
+            self.forecast = FarmForecast()
+            self.ledger.open()
+            self.flock.load(self.ledger)
+            self.inventory.load(self.ledger, today)
+            self.sales.load(self.ledger)
+            self.federation.aggregates.load(self.ledger)
+            self.forecast.load(self.ledger)
+            return self.ledger.load_state(BOOKED_STATE)
+
+        booked = await self.hass.async_add_executor_job(_open)
+        self.stored_values = await self.store.async_load()
+        if booked is not None:
+            self.booked = json.loads(booked)
+        else:
+            # Counters saved before saves were booked are all in the ledger
+            _, self.booked = self.unbooked(self.stored_values, today.isoformat())
+        self.coordinator.async_set_lots(self.inventory.total, self.booked)
+        await self.async_refresh_analytics()
+
+        # Number changes reach the disk in delayed batches
+        self.store.async_bind(self.coordinator.get)
+
+        @callback
+        def _values_changed(changed: int) -> None:
+            self.store.async_mark_dirty(
+                key for key, bit in FIELD_BITS.items() if changed & bit
+            )
+
+        self.coordinator.async_add_listener(
+            _values_changed, fields_mask(NUMBER_FIELDS)
+        )
+
+        # Cohorts move through their stages and eggs age as the days pass
+        async def _daily_refresh(now: datetime) -> None:
+            await self.async_refresh_analytics()
+
+        self._remove_daily_refresh = async_track_time_change(
+            self.hass, _daily_refresh, hour=0, minute=0, second=0
+        )
+
+        # The laying rate is per hen
+        @callback
+        def _hens_changed(changed: int) -> None:
+            self.hass.async_create_task(self.async_refresh_analytics())
+
+        self.coordinator.async_add_listener(
+            _hens_changed, FIELD_BITS["number_of_hens"]
+        )
+
+    async def async_start(self) -> None:
+        """Start what needs the restored numbers: nest boxes, day close, sync."""
+        self.ingest.async_start()
+        await self.day_close.async_start()
+        await self.federation.async_start()
+
+    async def async_unload(self) -> None:
+        """Write pending values, drop the listeners and close the ledger."""
+        self.federation.async_stop()
+        self.day_close.async_stop()
+        await self.ingest.async_stop()
+        async with self.lock:  # Let a running mutation finish first
+            self.coordinator.async_flush()
+            await self.store.async_flush()
+            self.coordinator.async_shutdown()
+            self.instrumentation.async_remove(self.entry.entry_id)
+            if self._remove_daily_refresh is not None:
+                self._remove_daily_refresh()
+                self._remove_daily_refresh = None
+            await self.hass.async_add_executor_job(self.ledger.close)
+
+    async def async_mutate(
+        self, idempotency_key: str | None, mutation: Callable[[], Any]
+    ) -> Any:
+        """Run a mutation alone on this farm, once per idempotency key.
+
+        A retry waits for the call it repeats and gets that call's result.
+        Failed mutations are not remembered, so they can be retried.
+        """
+        async with self.lock:
+            if idempotency_key is not None and idempotency_key in self._applied:
+                self._applied.move_to_end(idempotency_key)
+                self.duplicates += 1
+                return self._applied[idempotency_key]
+            result = mutation()
+            if isinstance(result, Awaitable):
+                result = await result
+            if idempotency_key is not None:
+                self._applied[idempotency_key] = result
+                if len(self._applied) > IDEMPOTENCY_KEYS:
+                    self._applied.popitem(last=False)
+            return result
+
+    def unbooked(
+        self, values: Mapping[str, float], day: str
+    ) -> tuple[list[LedgerEvent], dict[str, float]]:
+        """Return what counters at these values add to the ledger on a day.
+
+        Returns the events of the differences to the booked values, and the
+        values to book with them. Counters left out keep their value, and
+        every value is limited to the range its number stores. Lowered egg
+        and storage counters append negative events; birds and hatchery eggs
+        cannot be told apart once booked, so their counters cannot be
+        lowered.
+        """
+        get = self.coordinator.get
+        events = []
+        booked = {}
+        for field in BOOKED_FIELDS:
+            if field.key not in values and field.amount_key not in values:
+                continue
+            value = booked[field.key] = field.clamp(
+                values.get(field.key, get(field.key))
+            )
+            quantity = value - self.booked.get(field.key, 0.0)
+            if quantity < 0 and field.ledger in (LEDGER_FLOCK, LEDGER_HATCHERY):
+                raise ServiceValidationError(
+                    f"{field.name} cannot be lowered below the "
+                    f"{self.booked[field.key]:g} already booked"
+                )
+            amount = 0.0
+            if field.amount_key is not None:
+                value = booked[field.amount_key] = FIELDS_BY_KEY[
+                    field.amount_key
+                ].clamp(values.get(field.amount_key, get(field.amount_key)))
+                amount = value - self.booked.get(field.amount_key, 0.0)
+            if quantity or amount:
+                events.append(
+                    LedgerEvent(day, field.ledger, field.subtype, quantity, amount)
+                )
+        return events, booked
+
+    async def async_save(
+        self,
+        values: Mapping[str, float],
+        events: Iterable[LedgerEvent] = (),
+        day: str | None = None,
+    ) -> None:
+        """Append events, then apply values and flock changes to the numbers.
+
+        Given a day, the counters among the values are booked for it as
+        well, so saving the same counts twice appends them once. Hen and
+        rooster counts follow the cohorts unless they are given.
+        """
+        events = list(events)
+        booked = None
+        if day is not None:
+            unbooked, booked = self.unbooked(values, day)
+            events += unbooked
+        hens, roosters = await self.async_append(events, booked=booked)
+        values = dict(values)
+        for key, delta in (("number_of_hens", hens), ("number_of_roosters", roosters)):
+            if delta and key not in values:
+                values[key] = max(self.coordinator.get(key) + delta, 0)
+        self.async_apply_batch(values)
+
+    async def async_append(
+        self,
+        events: Iterable[LedgerEvent],
+        states: Iterable[tuple[str, str]] = (),
+        booked: Mapping[str, float] | None = None,
+    ) -> list[int]:
+        """Append events to the ledger without blocking the event loop.
+
+        The (name, state) pairs and the counter values booked by the events
+        are committed with them. Returns the change of [hens, roosters] in
+        the flock cohorts.
+        """
+        events = list(events)
+        states = list(states)
+        if booked:
+            booked = {**self.booked, **booked}
+            states.append((BOOKED_STATE, json.dumps(booked)))
+        flock_events = [
+            event for event in events if event.kind in (LEDGER_FLOCK, LEDGER_HATCHERY)
+        ]
+        egg_events = [
+            event
+            for event in events
+            if event.kind in (LEDGER_EGGS, LEDGER_STORAGE, LEDGER_SALES)
+        ]
+        forecast_events = [
+            event for event in events if event.kind in (LEDGER_EGGS, LEDGER_PURCHASE)
+        ]
+        today = dt_util.now().date()
+        hens = self.coordinator.get("number_of_hens")
+        latitude = self.hass.config.latitude
+
+        def _append() -> tuple[int, list[int]]:
+            model_states = list(states)
+            if forecast_events:
+                # The model state is committed with the events it learned from
+                previous = self.forecast.state()[1]
+                self.forecast.apply(forecast_events, hens, latitude)
+                model_states.append(self.forecast.state())
+            try:
+                written = self.ledger.append(events, states=model_states)
+            except Exception:
+                if forecast_events:
+                    self.forecast.restore(previous)
+                raise
+            delta = [0, 0]
+            if flock_events:
+                delta = self.flock.apply(flock_events)
+                self.flock.save(self.ledger)
+            if egg_events:
+                self.inventory.apply(egg_events, today)
+                self.inventory.save(self.ledger)
+            return written, delta
+
+        written, delta = await self.hass.async_add_executor_job(_append)
+        if booked:
+            self.booked = booked
+        self.coordinator.async_set_lots(self.inventory.total, self.booked)
+        if not written:
+            return delta
+        self.federation.async_schedule_push()
+        # Earliest touched day per statistic
+        since: dict[tuple[str, str], str] = {}
+        for event in events:
+            if event.kind in STATISTIC_KINDS:
+                key = (event.kind, event.subtype)
+                since[key] = min(since.get(key, event.day), event.day)
+        await self.async_update_statistics(since)
+        await self.async_refresh_analytics()
+        return delta
+
+    async def async_add_cohort(self, hatch_day: str, hens: int, roosters: int) -> None:
+        """Add birds of a known hatch day to the flock and to the numbers."""
+
+        def _add() -> None:
+            self.flock.add_cohort(hatch_day, hens, roosters)
+            self.flock.save(self.ledger)
+
+        await self.hass.async_add_executor_job(_add)
+        self.async_apply_batch(
+            {
+                "number_of_hens": self.coordinator.get("number_of_hens") + hens,
+                "number_of_roosters": self.coordinator.get("number_of_roosters")
+                + roosters,
+            }
+        )
+        await self.async_append(
+            [
+                LedgerEvent(
+                    dt_util.now().date().isoformat(), LEDGER_FLOCK, "added", hens + roosters
+                )
+            ]
+        )
+
+    async def async_flock_report(self, older_than_days: int) -> dict[str, Any]:
+        """Return the flock summary and age queries answered from the index."""
+        today = dt_util.now().date()
+
+        def _report() -> dict[str, Any]:
+            return {
+                **self.flock.summary(today),
+                "hens_older_than": self.flock.older_than(HENS, older_than_days, today),
+                "roosters_older_than": self.flock.older_than(
+                    ROOSTERS, older_than_days, today
+                ),
+                "hens_per_year_of_age": self.flock.age_distribution(HENS, today),
+            }
+
+        return await self.hass.async_add_executor_job(_report)
+
+    def price(self, egg_type: str, eggs: int) -> tuple[float, int, int, int] | None:
+        """Return the cheapest (amount, trays, dozens, singles) of an order."""
+        from .sales import resolve_price
+
+        tiers = self.price_tiers.get(egg_type, self.price_tiers.get(PRICE_TIER_DEFAULT))
+        return resolve_price(tiers, eggs) if tiers else None
+
+    async def async_sell(
+        self, customer: str, egg_type: str, eggs: int, amount: float, day: str
+    ) -> int | None:
+        """Record an order taking eggs from storage, or return None if short."""
+        event = LedgerEvent(day, LEDGER_SALES, egg_type, eggs, amount)
+        order_id = await self.hass.async_add_executor_job(
+            self.sales.sell,
+            self.ledger,
+            self.inventory,
+            customer,
+            event,
+            dt_util.now().date(),
+        )
+        if order_id is not None:
+            # Eggs in Storage drops within the same mutation as the lots
+            self.coordinator.async_set_lots(self.inventory.total, self.booked)
+            await self.async_refresh_analytics()
+        return order_id
+
+    async def async_pay(
+        self, customer: str, amount: float, order_id: int | None
+    ) -> dict[str, Any] | None:
+        """Apply a payment to a customer's open orders."""
+        return await self.hass.async_add_executor_job(
+            self.sales.pay, self.ledger, customer, amount, order_id
+        )
+
+    async def async_sales_report(self, customer: str | None) -> dict[str, Any]:
+        """Return the open orders and the revenue per customer and egg type."""
+
+        def _report() -> dict[str, Any]:
+            return {
+                **self.sales.summary(),
+                "open": self.sales.open_orders(customer),
+                "customers": self.sales.revenue_per_customer(),
+                "egg_types": self.sales.revenue_per_type(),
+            }
+
+        return await self.hass.async_add_executor_job(_report)
+
+    async def async_refresh_analytics(self) -> None:
+        """Fold new ledger events into the analytics and notify the sensors."""
+        hens_value = self.coordinator.get("number_of_hens")
+        today = dt_util.now().date()
+        latitude = self.hass.config.latitude
+
+        def _refresh() -> tuple[dict, dict]:
+            self.analytics.refresh(self.ledger)
+            results = {
+                **self.analytics.compute(hens_value),
+                **self.flock.summary(today),
+                **self.inventory.summary(today),
+            }
+            return results, self.forecast.predict(today, hens_value, latitude)
+
+        (
+            self.analytics_results,
+            self.forecast_results,
+        ) = await self.hass.async_add_executor_job(_refresh)
+        async_dispatcher_send(
+            self.hass, SIGNAL_ANALYTICS_UPDATED.format(entry_id=self.entry.entry_id)
+        )
+
+    async def async_update_statistics(
+        self, since: Mapping[tuple[str, str], str]
+    ) -> None:
+        """Feed the day rollups from a date on to long-term statistics."""
+        if not since or "recorder" not in self.hass.config.components:
+            return
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        series = await self.hass.async_add_executor_job(
+            lambda: {
+                key: self.ledger.daily_series(*key, day) for key, day in since.items()
+            }
+        )
+        for (kind, subtype), rows in series.items():
+            use_amount, unit = STATISTIC_KINDS[kind]
+            metadata = {
+                "has_mean": False,
+                "has_sum": True,
+                "name": f"{self.entry.title} {subtype} {kind}",
+                "source": DOMAIN,
+                "statistic_id": (
+                    f"{DOMAIN}:{slugify(f'{self.entry.entry_id}_{kind}_{subtype}')}"
+                ),
+                "unit_of_measurement": unit,
+            }
+            statistics = [
+                {
+                    "start": datetime.combine(
+                        date.fromisoformat(day), time(), dt_util.DEFAULT_TIME_ZONE
+                    ),
+                    "state": amount if use_amount else quantity,
+                    "sum": amount_sum if use_amount else quantity_sum,
+                }
+                for day, quantity, amount, quantity_sum, amount_sum in rows
+            ]
+            async_add_external_statistics(self.hass, metadata, statistics)
+
+    async def async_import_history(
+        self,
+        path: str,
+        file_format: str,
+        egg_schema: vol.Schema,
+        purchase_schema: vol.Schema,
+    ) -> dict[str, Any]:
+        """Stream a history file into the ledger and return the import report."""
+        entry_id = self.entry.entry_id
+
+        def _progress(imported: int, rejected: int) -> None:
+            # Called from the executor; bus.fire is thread safe
+            self.hass.bus.fire(
+                EVENT_IMPORT_PROGRESS,
+                {ATTR_ENTRY_ID: entry_id, "imported": imported, "rejected": rejected},
+            )
+
+        def _import(*args: Any) -> dict[str, Any]:
+            from .importer import import_history
+
+            return import_history(*args)
+
+        report = await self.hass.async_add_executor_job(
+            _import,
+            self.ledger,
+            path,
+            file_format,
+            egg_schema,
+            purchase_schema,
+            _progress,
+        )
+        if report["events"]:
+            self.federation.async_schedule_push()
+            # Statistics and analytics are updated once for the whole file
+            await self.async_update_statistics(
+                {
+                    (kind, subtype): report["first_day"]
+                    for kind in STATISTIC_KINDS
+                    for subtype in self.ledger.subtypes(kind)
+                }
+            )
+            await self.async_refresh_analytics()
+        return report
+
+    async def async_export_history(
+        self,
+        path: str,
+        file_format: str,
+        dataset: str,
+        start: str | None,
+        end: str | None,
+        incremental: bool,
+    ) -> dict[str, Any]:
+        """Stream the ledger to a file and return the export report."""
+
+        def _export(*args: Any) -> dict[str, Any]:
+            from .exporter import export_history
+
+            return export_history(*args)
+
+        return await self.hass.async_add_executor_job(
+            _export,
+            self.ledger,
+            path,
+            file_format,
+            dataset,
+            start,
+            end,
+            incremental,
+        )
+
+    async def async_statistics(
+        self, period: str, start: str, end: str, kind: str | None = None
+    ) -> list[dict]:
+        """Return rollup buckets without blocking the event loop."""
+        return await self.hass.async_add_executor_job(
+            self.ledger.statistics, period, start, end, kind
+        )
+
+    @callback
+    def async_apply_batch(self, values: Mapping[str, float]) -> list[str]:
+        """Apply validated values straight to the owned number entities.
+
+        Every entity writes its state at most once and the whole batch is
+        applied in a single event loop pass, without going through the
+        service registry. Returns the keys that changed.
+        """
+        changed = []
+        for key, value in values.items():
+            number = self.numbers.get(key)
+            if number is None or number.hass is None:
+                continue  # Not added to Home Assistant (yet)
+            if number.async_apply_value(value):
+                changed.append(key)
+        return changed
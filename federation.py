@@ -0,0 +1,536 @@
+"""Federation of farms on separate Home Assistant instances.
+
+A satellite pushes the egg and purchase events of its ledger to a central
+instance, together with its daily egg counters. The ledger is the outbox.
+An event's id is its sequence number, and the satellite only remembers the
+last sequence number the central acknowledged. While the central cannot
+be reached the events simply stay in the ledger. Once it can, the backlog
+goes out oldest first, in zlib compressed batches of at most BATCH_EVENTS
+events.
+
+The central keeps the last sequence number merged per satellite. A batch
+is only merged past that number, so a batch sent twice, or overlapping an
+earlier one, adds nothing twice. A batch starting beyond it is refused
+with the number to resend from. Merging folds the batch into running
+totals per satellite, so it costs the size of the batch and not the length
+of the satellite's history.
+
+Both ends talk through a transport with a single async_send, so they can
+be run against each other in one process with LocalTransport.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Mapping
+from datetime import datetime
+from http import HTTPStatus
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Protocol
+import zlib
+
+from aiohttp import ClientError, ClientResponseError, ClientTimeout, web
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_FEDERATION_ROLE,
+    CONF_FEDERATION_SITE,
+    CONF_FEDERATION_URL,
+    CONF_FEDERATION_WEBHOOK_ID,
+    DOMAIN,
+    FEDERATION_CENTRAL,
+    FEDERATION_OFF,
+    FEDERATION_SATELLITE,
+    GROUP_EGGS,
+    LEDGER_EGGS,
+    LEDGER_PURCHASE,
+    fields_in_group,
+)
+from .coordinator import fields_mask
+from .ledger import FarmLedger
+
+if TYPE_CHECKING:
+    from .farm import ChickenFarm
+
+_LOGGER = logging.getLogger(__name__)
+
+BATCH_VERSION = 1
+FEDERATED_KINDS = (LEDGER_EGGS, LEDGER_PURCHASE)
+BATCH_EVENTS = 500  # Ledger events scanned per batch
+MAX_BATCHES = 20  # Batches per push, the rest of a backlog follows right after
+MAX_BATCH_BYTES = 1 << 20  # Decompressed size of a batch, far above BATCH_EVENTS
+PUSH_DELAY = 10  # Seconds changes are collected for before a push
+RETRY_DELAY = 30  # Seconds after a failed push, doubled up to MAX_RETRY_DELAY
+MAX_RETRY_DELAY = 3600
+SEND_TIMEOUT = 30  # Seconds a batch may take to deliver
+STATE_NAME = "federation"  # Key of the acknowledged sequence number
+
+
+class FederationError(Exception):
+    """A batch could not be delivered."""
+
+
+class Transport(Protocol):
+    """Delivers batches from a satellite to a central instance."""
+
+    async def async_send(self, payload: bytes) -> int:
+        """Deliver a batch and return the sequence number merged up to."""
+
+
+def encode_batch(batch: Mapping[str, Any]) -> bytes:
+    """Return a batch as compressed JSON."""
+    return zlib.compress(json.dumps(batch, separators=(",", ":")).encode())
+
+
+def decode_batch(payload: bytes) -> dict[str, Any]:
+    """Return the batch of a payload, or raise ValueError if it is none."""
+    # Bounded, so a small payload cannot inflate into a huge one
+    decompressor = zlib.decompressobj()
+    try:
+        data = decompressor.decompress(payload, MAX_BATCH_BYTES)
+    except zlib.error as err:
+        raise ValueError("Not a compressed batch") from err
+    if decompressor.unconsumed_tail:
+        raise ValueError(f"Batch larger than {MAX_BATCH_BYTES} bytes")
+    if not decompressor.eof:
+        raise ValueError("Truncated batch")
+    try:
+        batch = json.loads(data)
+    except ValueError as err:
+        raise ValueError("Not a JSON batch") from err
+    if not isinstance(batch, dict) or batch.get("v") != BATCH_VERSION:
+        raise ValueError("Unsupported batch version")
+    return batch
+
+
+class HttpTransport:
+    """Posts batches to the webhook of the central instance."""
+
+    def __init__(self, hass: HomeAssistant, url: str) -> None:
+        """Initialize the transport."""
+        self.hass = hass
+        self._url = url
+
+    async def async_send(self, payload: bytes) -> int:
+        """Post a batch and return the central's acknowledgement."""
+        session = async_get_clientsession(self.hass)
+        try:
+            async with session.post(
+                self._url,
+                data=payload,
+                headers={"Content-Type": "application/octet-stream"},
+                timeout=ClientTimeout(total=SEND_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
+                return int((await response.json())["ack"])
+        except ClientResponseError as err:
+            # Not str(err), which names the URL and so the webhook id
+            raise FederationError(
+                f"The central answered {err.status}: {err.message}"
+            ) from err
+        except ClientError as err:
+            # Connection errors may name the URL as well
+            raise FederationError(
+                f"Cannot deliver to the central: {type(err).__name__}"
+            ) from err
+        except (TimeoutError, KeyError, TypeError, ValueError) as err:
+            raise FederationError(f"Cannot deliver to the central: {err}") from err
+
+
+class LocalTransport:
+    """Hands batches to a central farm in the same process."""
+
+    def __init__(self, central: Federation) -> None:
+        """Initialize the transport."""
+        self._central = central
+
+    async def async_send(self, payload: bytes) -> int:
+        """Merge a batch at the central and return its acknowledgement."""
+        try:
+            return await self._central.async_receive(payload)
+        except ValueError as err:
+            raise FederationError(str(err)) from err
+
+
+class SiteAggregates:
+    """Totals merged from the satellites of a central farm.
+
+    All methods block and must run in the executor.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without satellites."""
+        self._lock = threading.Lock()
+        # Site -> [name, sequence number, counters, time of the counters]
+        self._sites: dict[str, list] = {}
+        # Site -> (kind, subtype) -> [quantity, amount, count]
+        self._totals: dict[str, dict[tuple[str, str], list]] = {}
+        self.batches = 0
+        self.merged = 0  # Events added to the totals
+        self.duplicates = 0  # Events merged before
+        self.refused = 0  # Batches starting past the merged events
+
+    def load(self, ledger: FarmLedger) -> None:
+        """Load the satellites and their totals from the ledger."""
+        sites, totals = ledger.load_sites()
+        with self._lock:
+            self._sites = {
+                site: [name, seq, json.loads(counters), updated]
+                for site, name, seq, counters, updated in sites
+            }
+            self._totals = {}
+            for site, kind, subtype, quantity, amount, count in totals:
+                self._totals.setdefault(site, {})[(kind, subtype)] = [
+                    quantity,
+                    amount,
+                    count,
+                ]
+
+    def merge(self, ledger: FarmLedger, payload: bytes) -> int:
+        """Merge a batch and return the sequence number merged up to."""
+        batch = decode_batch(payload)
+        try:
+            site_id = str(batch["site"])
+            name = str(batch["name"])
+            after = int(batch["after"])
+            last = int(batch["last"])
+            sent = float(batch["sent"])
+            counters = dict(batch["counters"])
+            events = [
+                (int(event_id), str(kind), str(subtype), float(quantity), float(amount))
+                for event_id, _day, kind, subtype, quantity, amount in batch["events"]
+            ]
+        except (KeyError, TypeError, ValueError) as err:
+            raise ValueError(f"Malformed batch: {err}") from err
+        with self._lock:
+            self.batches += 1
+            site = self._sites.get(site_id) or [name, 0, {}, 0.0]
+            seq = site[1]
+            if after > seq:
+                self.refused += 1
+                return seq  # Events in between are missing, resend them first
+            delta: dict[tuple[str, str], list] = {}
+            for event_id, kind, subtype, quantity, amount in events:
+                if event_id <= seq:
+                    self.duplicates += 1
+                    continue
+                total = delta.setdefault((kind, subtype), [0.0, 0.0, 0])
+                total[0] += quantity
+                total[1] += amount
+                total[2] += 1
+            if sent >= site[3]:
+                site = [name, max(seq, last), counters, sent]
+            else:
+                site = [site[0], max(seq, last), site[2], site[3]]  # Counters are older
+            ledger.merge_site(
+                (site_id, site[0], site[1], json.dumps(site[2]), site[3]),
+                [(site_id, *key, *total) for key, total in delta.items()],
+            )
+            # Only update the totals in memory once the merge is committed
+            self._sites[site_id] = site
+            totals = self._totals.setdefault(site_id, {})
+            for key, (quantity, amount, count) in delta.items():
+                total = totals.setdefault(key, [0.0, 0.0, 0])
+                total[0] += quantity
+                total[1] += amount
+                total[2] += count
+                self.merged += count
+            return site[1]
+
+    def report(self) -> dict[str, Any]:
+        """Return the totals of every satellite and of all of them together."""
+        with self._lock:
+            sites = {}
+            eggs = cost = 0.0
+            for site_id, (name, seq, counters, updated) in self._sites.items():
+                totals: dict[str, dict[str, Any]] = {}
+                for (kind, subtype), (quantity, amount, count) in self._totals.get(
+                    site_id, {}
+                ).items():
+                    totals.setdefault(kind, {})[subtype] = {
+                        "quantity": quantity,
+                        "amount": round(amount, 2),
+                        "count": count,
+                    }
+                site_eggs = sum(
+                    total["quantity"] for total in totals.get(LEDGER_EGGS, {}).values()
+                )
+                site_cost = sum(
+                    total["amount"]
+                    for total in totals.get(LEDGER_PURCHASE, {}).values()
+                )
+                eggs += site_eggs
+                cost += site_cost
+                sites[site_id] = {
+                    "name": name,
+                    "seq": seq,
+                    "updated": _isoformat(updated),
+                    "counters": counters,
+                    "eggs": site_eggs,
+                    "cost": round(site_cost, 2),
+                    "totals": totals,
+                }
+            return {"eggs": eggs, "cost": round(cost, 2), "sites": sites}
+
+
+def _isoformat(timestamp: float) -> str | None:
+    """Return a POSIX time as an ISO string, None for never."""
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp, dt_util.UTC).isoformat()
+
+
+class Federation:
+    """The satellite or central end of one farm, or neither."""
+
+    def __init__(self, hass: HomeAssistant, farm: ChickenFarm) -> None:
+        """Initialize a farm that is not federated."""
+        self.hass = hass
+        self._farm = farm
+        self.role = FEDERATION_OFF
+        self.site = farm.entry.entry_id
+        self._url: str | None = None
+        self._webhook_id: str | None = None
+        self.transport: Transport | None = None
+        self.aggregates = SiteAggregates()
+        self._acked = 0  # Last sequence number the central merged
+        self._counters_changed = True  # Send the counters with the first push
+        self._push_lock = asyncio.Lock()
+        self._push_task: asyncio.Task | None = None
+        self._cancel_push: CALLBACK_TYPE | None = None
+        self._retry_delay = RETRY_DELAY
+        self._unsubscribe: list[Callable[[], None]] = []
+        self._started = False
+        self.async_push = farm.instrumentation.wrap("federation_push", self.async_push)
+        # Link counters
+        self.batches_sent = 0
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+    @callback
+    def async_configure(self, options: Mapping[str, Any]) -> None:
+        """Apply the federation options, resubscribing if they changed."""
+        self.site = options.get(CONF_FEDERATION_SITE) or self._farm.entry.entry_id
+        config = (
+            options.get(CONF_FEDERATION_ROLE, FEDERATION_OFF),
+            options.get(CONF_FEDERATION_URL) or None,
+            options.get(CONF_FEDERATION_WEBHOOK_ID) or None,
+        )
+        if config == (self.role, self._url, self._webhook_id):
+            return
+        self.role, self._url, self._webhook_id = config
+        self.transport = (
+            HttpTransport(self.hass, self._url)
+            if self.role == FEDERATION_SATELLITE and self._url
+            else None
+        )
+        if self._started:
+            self._async_unsubscribe()
+            self._async_subscribe()
+
+    async def async_start(self) -> None:
+        """Load the acknowledged sequence number and start the configured end."""
+        self._started = True
+        state = await self.hass.async_add_executor_job(
+            self._farm.ledger.load_state, STATE_NAME
+        )
+        self._acked = int(state) if state else 0
+        self._async_subscribe()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop pushing and receiving; unsent events stay in the ledger."""
+        self._started = False
+        self._async_unsubscribe()
+        if self._push_task is not None:
+            self._push_task.cancel()
+            self._push_task = None
+
+    @callback
+    def _async_subscribe(self) -> None:
+        """Follow the daily counters, or register the central's webhook."""
+        if self.role == FEDERATION_SATELLITE:
+            self._unsubscribe.append(
+                self._farm.coordinator.async_add_listener(
+                    self._async_counters_changed,
+                    fields_mask(fields_in_group(GROUP_EGGS)),
+                )
+            )
+            self.async_schedule_push()  # The backlog of the time we were down
+            return
+        if self.role != FEDERATION_CENTRAL or self._webhook_id is None:
+            return
+        if "webhook" not in self.hass.config.components:
+            _LOGGER.warning("The central farm needs the webhook integration")
+            return
+        from homeassistant.components import webhook
+
+        webhook_id = self._webhook_id
+        webhook.async_register(
+            self.hass,
+            DOMAIN,
+            f"{self._farm.entry.title} federation",
+            webhook_id,
+            self._async_handle_webhook,
+            allowed_methods=["POST"],
+        )
+        self._unsubscribe.append(
+            lambda: webhook.async_unregister(self.hass, webhook_id)
+        )
+
+    @callback
+    def _async_unsubscribe(self) -> None:
+        """Drop the listeners, the webhook and a scheduled push."""
+        while self._unsubscribe:
+            self._unsubscribe.pop()()
+        if self._cancel_push is not None:
+            self._cancel_push()
+            self._cancel_push = None
+
+    @callback
+    def _async_counters_changed(self, changed: int) -> None:
+        """Send the daily counters with the next push."""
+        self._counters_changed = True
+        self.async_schedule_push()
+
+    @callback
+    def async_schedule_push(self, delay: float = PUSH_DELAY) -> None:
+        """Push after a delay, so changes until then go in the same batch."""
+        if (
+            self.role != FEDERATION_SATELLITE
+            or not self._started
+            or self._cancel_push is not None
+        ):
+            return
+        self._cancel_push = async_call_later(self.hass, delay, self._async_push_later)
+
+    @callback
+    def _async_push_later(self, _now: Any) -> None:
+        """Push once the delay has passed."""
+        self._cancel_push = None
+        self._push_task = self.hass.async_create_task(self.async_push())
+
+    async def async_push(self) -> int:
+        """Send the backlog in batches and return the events sent.
+
+        A failed push is retried later, with a growing delay.
+        """
+        if self.transport is None:
+            return 0
+        async with self._push_lock:
+            sent = 0
+            try:
+                for _ in range(MAX_BATCHES):
+                    events, more = await self._async_send_batch()
+                    sent += events
+                    if not more:
+                        break
+                else:
+                    self.async_schedule_push(0)  # More backlog than one push takes
+            except FederationError as err:
+                self.failures += 1
+                self.last_error = str(err)
+                _LOGGER.debug("Push of %s failed: %s", self._farm.entry.title, err)
+                self.async_schedule_push(self._retry_delay)
+                self._retry_delay = min(self._retry_delay * 2, MAX_RETRY_DELAY)
+                return sent
+            self._retry_delay = RETRY_DELAY
+            return sent
+
+    async def _async_send_batch(self) -> tuple[int, bool]:
+        """Send the events after the acknowledged ones.
+
+        Returns the events sent and whether more are waiting.
+        """
+        assert self.transport is not None
+        after = self._acked
+        rows = await self.hass.async_add_executor_job(
+            self._farm.ledger.events_page, after, BATCH_EVENTS
+        )
+        if not rows and not self._counters_changed:
+            return 0, False
+        coordinator = self._farm.coordinator
+        self._counters_changed = False
+        batch = {
+            "v": BATCH_VERSION,
+            "site": self.site,
+            "name": self._farm.entry.title,
+            "after": after,
+            "last": rows[-1][0] if rows else after,
+            "sent": time.time(),
+            "counters": {
+                field.key: coordinator.get(field.key)
+                for field in fields_in_group(GROUP_EGGS)
+            },
+            "events": [row for row in rows if row[2] in FEDERATED_KINDS],
+        }
+        payload = await self.hass.async_add_executor_job(encode_batch, batch)
+        try:
+            acked = await self.transport.async_send(payload)
+        except FederationError:
+            self._counters_changed = True
+            raise
+        self.batches_sent += 1
+        self.events_sent += len(batch["events"])
+        self.bytes_sent += len(payload)
+        if acked != self._acked:
+            await self.hass.async_add_executor_job(
+                self._farm.ledger.save_state, STATE_NAME, str(acked)
+            )
+            self._acked = acked
+        # A refused batch moves the acknowledgement back, resend from there
+        more = acked < batch["last"] or len(rows) == BATCH_EVENTS
+        return len(batch["events"]), more
+
+    async def async_receive(self, payload: bytes) -> int:
+        """Merge a satellite's batch and return the sequence number merged up to.
+
+        Raises ValueError if this farm is not a central or the batch is bad.
+        """
+        if self.role != FEDERATION_CENTRAL:
+            raise ValueError(f"{self._farm.entry.title} is not a central farm")
+        return await self.hass.async_add_executor_job(
+            self.aggregates.merge, self._farm.ledger, payload
+        )
+
+    async def _async_handle_webhook(
+        self, hass: HomeAssistant, webhook_id: str, request: web.Request
+    ) -> web.Response:
+        """Merge a batch posted by a satellite and acknowledge it."""
+        try:
+            acked = await self.async_receive(await request.read())
+        except ValueError as err:
+            return web.Response(status=HTTPStatus.BAD_REQUEST, text=str(err))
+        return web.json_response({"ack": acked})
+
+    def stats(self) -> dict[str, Any]:
+        """Return the role and the link or merge counters."""
+        stats: dict[str, Any] = {"role": self.role, "site": self.site}
+        if self.role == FEDERATION_SATELLITE:
+            stats.update(
+                acknowledged=self._acked,
+                batches_sent=self.batches_sent,
+                events_sent=self.events_sent,
+                bytes_sent=self.bytes_sent,
+                failures=self.failures,
+                last_error=self.last_error,
+                retry_delay=self._retry_delay,
+            )
+        elif self.role == FEDERATION_CENTRAL:
+            aggregates = self.aggregates
+            stats.update(
+                batches=aggregates.batches,
+                merged=aggregates.merged,
+                duplicates=aggregates.duplicates,
+                refused=aggregates.refused,
+            )
+        return stats
@@ -0,0 +1,232 @@
+"""Flock and hatchery lifecycle model for the Chicken Farm integration.
+
+Birds are grouped in cohorts by hatch day. A cohort's stage follows from
+its age: chicks and pullets until the point of lay, then layers, then
+retired. Hatch days are kept sorted, with one Fenwick tree per sex over
+them, so "hens older than three years" or the size of a stage is a
+bisect plus a prefix sum and never a scan over birds or events.
+
+Eggs set in the incubator are tracked as batches; hatched and dead eggs
+resolve the oldest open batches first, and hatched chicks open a cohort.
+
+All methods block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import date
+import threading
+
+from .const import LEDGER_FLOCK, LEDGER_HATCHERY
+from .ledger import FarmLedger, LedgerEvent
+
+POINT_OF_LAY_DAYS = 140  # Age at which pullets start laying
+RETIREMENT_DAYS = 3 * 365  # Age at which layers are considered retired
+PEAK_LAYING_RATE = 0.8  # Eggs per layer per day used for the lay capacity
+
+HENS = 0
+ROOSTERS = 1
+
+REMOVALS = ("died", "butchered")  # Flock event subtypes taking birds out
+
+
+class _Fenwick:
+    """Binary indexed tree of counts over cohort positions."""
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, values: list[int]) -> None:
+        """Build the tree in linear time."""
+        tree = [0, *values]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def add(self, position: int, delta: int) -> None:
+        """Add delta to the count at a position."""
+        position += 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def prefix(self, count: int) -> int:
+        """Return the sum of the first count positions."""
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+
+class FlockModel:
+    """Cohorts and incubation batches of one farm."""
+
+    def __init__(self) -> None:
+        """Initialize an empty flock."""
+        self._lock = threading.Lock()
+        self._days: list[int] = []  # Sorted hatch day ordinals
+        self._counts: list[list[int]] = [[], []]  # Sex -> count per position
+        self._trees = [_Fenwick([]), _Fenwick([])]
+        self._incubations: deque[list] = deque()  # [day, eggs], oldest first
+        self._dirty: set[int] = set()  # Hatch days to persist
+
+    def load(self, ledger: FarmLedger) -> None:
+        """Load the cohorts and open incubation batches from the ledger."""
+        cohorts, incubations = ledger.load_flock()
+        with self._lock:
+            self._days = [date.fromisoformat(day).toordinal() for day, _, _ in cohorts]
+            self._counts = [
+                [hens for _, hens, _ in cohorts],
+                [roosters for _, _, roosters in cohorts],
+            ]
+            self._rebuild()
+            self._incubations = deque([day, eggs] for day, eggs in incubations)
+
+    def _rebuild(self) -> None:
+        """Rebuild the trees after a hatch day was inserted."""
+        self._trees = [_Fenwick(counts) for counts in self._counts]
+
+    def _position(self, day: int) -> int:
+        """Return the position of a hatch day, inserting an empty cohort."""
+        position = bisect_left(self._days, day)
+        if position == len(self._days) or self._days[position] != day:
+            self._days.insert(position, day)
+            for counts in self._counts:
+                counts.insert(position, 0)
+            self._rebuild()
+        return position
+
+    def _add(self, position: int, sex: int, delta: int) -> None:
+        """Change the count of one sex in a cohort."""
+        self._counts[sex][position] += delta
+        self._trees[sex].add(position, delta)
+        self._dirty.add(self._days[position])
+
+    def _remove_oldest(self, count: int, sexes: tuple[int, ...]) -> list[int]:
+        """Remove birds from the oldest cohorts, one sex after the other."""
+        removed = [0, 0]
+        for sex in sexes:
+            counts = self._counts[sex]
+            position = 0
+            while count and position < len(counts):
+                if taken := min(count, counts[position]):
+                    self._add(position, sex, -taken)
+                    removed[sex] += taken
+                    count -= taken
+                position += 1
+        return removed
+
+    def add_cohort(self, hatch_day: str, hens: int, roosters: int) -> None:
+        """Add birds hatched on a day, e.g. bought or already on the farm."""
+        with self._lock:
+            position = self._position(date.fromisoformat(hatch_day).toordinal())
+            self._add(position, HENS, hens)
+            self._add(position, ROOSTERS, roosters)
+
+    def apply(self, events: list[LedgerEvent]) -> list[int]:
+        """Apply flock and hatchery events; return the [hens, roosters] change.
+
+        Deaths take the oldest hens first, then roosters, and butchering
+        takes the oldest roosters first. Hatched chicks are counted as half
+        pullets and half cockerels until the cohort is corrected. Lowered
+        counters are refused before they are booked, so events that do not
+        add anything are skipped.
+        """
+        delta = [0, 0]
+        with self._lock:
+            for event in events:
+                count = int(event.quantity)
+                if count <= 0:
+                    continue
+                if event.kind == LEDGER_HATCHERY:
+                    if event.subtype == "incubated":
+                        self._incubations.append([event.day, count])
+                        continue
+                    self._resolve_incubations(count)
+                    if event.subtype == "hatched":
+                        day = date.fromisoformat(event.day).toordinal()
+                        position = self._position(day)
+                        roosters = count // 2
+                        self._add(position, HENS, count - roosters)
+                        self._add(position, ROOSTERS, roosters)
+                        delta[HENS] += count - roosters
+                        delta[ROOSTERS] += roosters
+                elif event.kind == LEDGER_FLOCK and event.subtype in REMOVALS:
+                    sexes = (
+                        (ROOSTERS, HENS)
+                        if event.subtype == "butchered"
+                        else (HENS, ROOSTERS)
+                    )
+                    removed = self._remove_oldest(count, sexes)
+                    delta[HENS] -= removed[HENS]
+                    delta[ROOSTERS] -= removed[ROOSTERS]
+        return delta
+
+    def _resolve_incubations(self, count: int) -> None:
+        """Take hatched or dead eggs out of the oldest open batches."""
+        while count and self._incubations:
+            batch = self._incubations[0]
+            taken = min(count, batch[1])
+            batch[1] -= taken
+            count -= taken
+            if not batch[1]:
+                self._incubations.popleft()
+
+    def save(self, ledger: FarmLedger) -> None:
+        """Persist the changed cohorts and the open incubation batches."""
+        with self._lock:
+            cohorts = []
+            for day in self._dirty:
+                position = bisect_left(self._days, day)
+                cohorts.append(
+                    (
+                        date.fromordinal(day).isoformat(),
+                        self._counts[HENS][position],
+                        self._counts[ROOSTERS][position],
+                    )
+                )
+            self._dirty.clear()
+            incubations = [tuple(batch) for batch in self._incubations]
+        ledger.save_flock(cohorts, incubations)
+
+    def hatched_before(self, sex: int, day: int) -> int:
+        """Return the birds of a sex hatched on or before a day ordinal."""
+        return self._trees[sex].prefix(bisect_right(self._days, day))
+
+    def older_than(self, sex: int, days: int, today: date) -> int:
+        """Return the birds of a sex at least a number of days old."""
+        with self._lock:
+            return self.hatched_before(sex, today.toordinal() - days)
+
+    def age_distribution(self, sex: int, today: date, years: int = 5) -> list[int]:
+        """Return the birds of a sex per year of age, the last bucket open."""
+        ordinal = today.toordinal()
+        with self._lock:
+            cumulative = [
+                self.hatched_before(sex, ordinal - 365 * age) for age in range(years)
+            ]
+        cumulative.append(0)
+        return [cumulative[age] - cumulative[age + 1] for age in range(years)]
+
+    def summary(self, today: date) -> dict[str, float]:
+        """Return the stage sizes, incubated eggs and lay capacity."""
+        ordinal = today.toordinal()
+        with self._lock:
+            hens = self.hatched_before(HENS, ordinal)
+            adult = self.hatched_before(HENS, ordinal - POINT_OF_LAY_DAYS)
+            retired = self.hatched_before(HENS, ordinal - RETIREMENT_DAYS)
+            roosters = self.hatched_before(ROOSTERS, ordinal)
+            incubating = sum(eggs for _, eggs in self._incubations)
+        return {
+            "flock_hens": hens,
+            "flock_roosters": roosters,
+            "flock_pullets": hens - adult,
+            "flock_layers": adult - retired,
+            "flock_retired": retired,
+            "eggs_incubating": incubating,
+            "lay_capacity": round((adult - retired) * PEAK_LAYING_RATE, 1),
+        }
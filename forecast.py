@@ -0,0 +1,183 @@
+"""Production and feed forecasts for the Chicken Farm integration.
+
+Egg output is modelled per egg type as eggs per hen per day at full day
+length, kept as an exponentially weighted moving average. Every finished
+collection day folds into it in constant time, and the forecast scales it
+by the number of hens and the day length of each coming day. Feed use is
+an exponentially weighted average of the kilograms per day between two
+purchases of the same feed.
+
+The model state is a few numbers that are stored in the ledger, so nothing
+is ever refitted from the history. All methods block and must run in the
+executor.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+import json
+from math import acos, asin, atan, cos, pi, radians, sin, tan
+import threading
+from typing import Any
+
+from .const import EGG_TYPES, FORECAST_HORIZONS, LEDGER_EGGS, LEDGER_PURCHASE
+from .ledger import FarmLedger, LedgerEvent
+
+STATE_NAME = "forecast"  # Key of the model state in the ledger
+
+EGG_ALPHA = 0.1  # Weight of a new collection day
+FEED_ALPHA = 0.3  # Weight of a new purchase interval
+FULL_LAY_HOURS = 14.0  # Day length at which hens lay at their full rate
+MIN_LIGHT_FACTOR = 0.1  # Floor of the day length factor in polar winters
+
+# Purchase types bought as feed -> result key prefix
+FEEDS = {"Pellets": "pellets", "Scratch Grains": "scratch_grains"}
+
+
+def day_length(day: date, latitude: float) -> float:
+    """Return the hours of daylight of a day (CBM model)."""
+    revolution = 0.2163108 + 2 * atan(
+        0.9671396 * tan(0.00860 * (day.timetuple().tm_yday - 186))
+    )
+    declination = asin(0.39795 * cos(revolution))
+    lat = radians(latitude)
+    value = (sin(radians(0.8333)) + sin(lat) * sin(declination)) / (
+        cos(lat) * cos(declination)
+    )
+    return 24 - 24 / pi * acos(max(-1.0, min(1.0, value)))
+
+
+def light_factor(day: date, latitude: float) -> float:
+    """Return the share of the full laying rate the day length allows."""
+    return max(MIN_LIGHT_FACTOR, min(day_length(day, latitude) / FULL_LAY_HOURS, 1.0))
+
+
+class FarmForecast:
+    """Online egg and feed model of one farm."""
+
+    def __init__(self) -> None:
+        """Initialize an untrained model."""
+        self._lock = threading.Lock()
+        self._rates: dict[str, float] = {}  # Egg type -> eggs/hen/day at full light
+        self._day: str | None = None  # Collection day being accumulated
+        self._counts: dict[str, float] = {}  # Eggs per type of that day
+        self._hens = 0.0  # Hens on that day
+        # Feed -> [last purchase day, kg bought, kg/day average or None]
+        self._feeds: dict[str, list] = {}
+
+    def load(self, ledger: FarmLedger) -> None:
+        """Load the model state from the ledger."""
+        if (state := ledger.load_state(STATE_NAME)) is not None:
+            self.restore(state)
+
+    def restore(self, state: str) -> None:
+        """Restore the model from a stored state."""
+        data = json.loads(state)
+        with self._lock:
+            self._rates = data["rates"]
+            self._day = data["day"]
+            self._counts = data["counts"]
+            self._hens = data["hens"]
+            self._feeds = data["feeds"]
+
+    def state(self) -> tuple[str, str]:
+        """Return the (name, state) pair the ledger stores the model as."""
+        with self._lock:
+            return STATE_NAME, json.dumps(
+                {
+                    "rates": self._rates,
+                    "day": self._day,
+                    "counts": self._counts,
+                    "hens": self._hens,
+                    "feeds": self._feeds,
+                }
+            )
+
+    def apply(self, events: list[LedgerEvent], hens: float, latitude: float) -> None:
+        """Fold egg collections and feed purchases into the model."""
+        with self._lock:
+            for event in events:
+                if event.kind == LEDGER_EGGS:
+                    if event.day != self._day:
+                        if self._day is not None and event.day < self._day:
+                            continue  # Late data of a day already folded in
+                        self._close_day(latitude)
+                        self._day = event.day
+                        self._counts = {}
+                    self._counts[event.subtype] = (
+                        self._counts.get(event.subtype, 0.0) + event.quantity
+                    )
+                    self._hens = hens
+                elif event.kind == LEDGER_PURCHASE and event.subtype in FEEDS:
+                    self._add_purchase(event)
+
+    def _close_day(self, latitude: float) -> None:
+        """Fold the accumulated collection day into the egg rates."""
+        if self._day is None or self._hens <= 0:
+            return
+        scale = self._hens * light_factor(date.fromisoformat(self._day), latitude)
+        for egg_type in EGG_TYPES:
+            sample = self._counts.get(egg_type, 0.0) / scale
+            if (rate := self._rates.get(egg_type)) is None:
+                if not sample:
+                    continue  # Types never laid stay out of the model
+                self._rates[egg_type] = sample
+            else:
+                self._rates[egg_type] = rate + EGG_ALPHA * (sample - rate)
+
+    def _add_purchase(self, event: LedgerEvent) -> None:
+        """Fold the interval since the previous purchase into the feed rate."""
+        if event.quantity <= 0:
+            return
+        if (feed := self._feeds.get(event.subtype)) is None:
+            self._feeds[event.subtype] = [event.day, event.quantity, None]
+            return
+        last_day, last_kg, rate = feed
+        days = (date.fromisoformat(event.day) - date.fromisoformat(last_day)).days
+        if days > 0:
+            sample = last_kg / days
+            feed[2] = sample if rate is None else rate + FEED_ALPHA * (sample - rate)
+            feed[0] = event.day
+            feed[1] = event.quantity
+        else:
+            feed[1] += event.quantity  # Same day, one purchase
+
+    def predict(
+        self, today: date, hens: float, latitude: float
+    ) -> dict[str, tuple[Any, dict[str, Any]]]:
+        """Return the forecasts as key -> (value, attributes)."""
+        factors = [
+            light_factor(today + timedelta(days=offset), latitude)
+            for offset in range(1, max(FORECAST_HORIZONS) + 1)
+        ]
+        with self._lock:
+            rates = dict(self._rates)
+            feeds = {feed: list(values) for feed, values in self._feeds.items()}
+
+        results: dict[str, tuple[Any, dict[str, Any]]] = {}
+        for horizon in FORECAST_HORIZONS:
+            light = sum(factors[:horizon])
+            by_type = {
+                egg_type: round(hens * rate * light, 1)
+                for egg_type, rate in rates.items()
+            }
+            results[f"eggs_{horizon}d"] = (
+                round(sum(by_type.values()), 1) if rates else None,
+                by_type,
+            )
+        for feed, key in FEEDS.items():
+            last_day, last_kg, rate = feeds.get(feed, (None, 0.0, None))
+            if rate is None or rate <= 0:
+                results[f"{key}_next_purchase"] = (None, {})
+                continue
+            results[f"{key}_next_purchase"] = (
+                date.fromisoformat(last_day) + timedelta(days=round(last_kg / rate)),
+                {
+                    "kg_per_day": round(rate, 3),
+                    **{
+                        f"kg_next_{horizon}_days": round(rate * horizon, 1)
+                        for horizon in FORECAST_HORIZONS
+                    },
+                },
+            )
+        return results
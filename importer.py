@@ -0,0 +1,134 @@
+"""Bulk import of farm history for the Chicken Farm integration.
+
+Rows are streamed from a CSV or JSON Lines file and appended to the ledger
+in chunks, so memory use does not depend on the file size. Every row has a
+``date`` column and is either an egg collection (the ``*_eggs`` fields of
+``save_daily_eggs``) or, when it has a ``purchase_type``, a purchase (the
+fields of ``save_purchase``). Rollups are rebuilt once at the end.
+
+All functions block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+import csv
+from datetime import date
+import json
+from typing import Any
+
+import voluptuous as vol
+
+from .const import (
+    FORMAT_CSV,
+    FORMAT_JSONL,
+    GROUP_EGGS,
+    LEDGER_PURCHASE,
+    fields_in_group,
+)
+from .ledger import FarmLedger, LedgerEvent
+
+CHUNK_SIZE = 1000  # Events per transaction
+MAX_REJECTED_LINES = 20  # Line numbers of rejected rows kept for the report
+
+
+def iter_rows(path: str, file_format: str) -> Iterator[tuple[int, Any]]:
+    """Yield (line number, row) pairs; unparsable rows are yielded as None."""
+    with open(path, encoding="utf-8", newline="") as file:
+        if file_format == FORMAT_CSV:
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, {
+                    key.strip(): value.strip()
+                    for key, value in row.items()
+                    if key and value not in (None, "")
+                }
+            return
+        for line_num, line in enumerate(file, 1):
+            if not (line := line.strip()):
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                yield line_num, None
+
+
+def _row_events(
+    row: Any, egg_schema: vol.Schema, purchase_schema: vol.Schema
+) -> list[LedgerEvent]:
+    """Validate a row against the service schemas and return its events."""
+    if not isinstance(row, dict):
+        raise vol.Invalid("Row is not an object")
+    day = date.fromisoformat(str(row["date"])).isoformat()
+    if row.get("purchase_type"):
+        data = purchase_schema(
+            {
+                "purchase_type": row["purchase_type"],
+                "purchase_weight": row.get("purchase_weight", 0),
+                "purchase_cost": row.get("purchase_cost"),
+                "purchase_date": day,
+            }
+        )
+        return [
+            LedgerEvent(
+                day,
+                LEDGER_PURCHASE,
+                data["purchase_type"],
+                data["purchase_weight"],
+                data["purchase_cost"],
+            )
+        ]
+    fields = fields_in_group(GROUP_EGGS)
+    data = egg_schema({field.data_key: row.get(field.data_key, 0) for field in fields})
+    return [
+        LedgerEvent(day, field.ledger, field.subtype, data[field.data_key])
+        for field in fields
+        if data[field.data_key]
+    ]
+
+
+def import_history(
+    ledger: FarmLedger,
+    path: str,
+    file_format: str,
+    egg_schema: vol.Schema,
+    purchase_schema: vol.Schema,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, Any]:
+    """Import a history file into the ledger and return a report."""
+    imported = rejected = events_written = 0
+    rejected_lines: list[int] = []
+    chunk: list[LedgerEvent] = []
+    first_day: str | None = None
+
+    for line_num, row in iter_rows(path, file_format):
+        try:
+            events = _row_events(row, egg_schema, purchase_schema)
+        except (vol.Invalid, KeyError, TypeError, ValueError):
+            rejected += 1
+            if len(rejected_lines) < MAX_REJECTED_LINES:
+                rejected_lines.append(line_num)
+            continue
+        imported += 1
+        for event in events:
+            if first_day is None or event.day < first_day:
+                first_day = event.day
+        chunk.extend(events)
+        if len(chunk) >= CHUNK_SIZE:
+            events_written += ledger.append(chunk, update_rollups=False)
+            chunk = []
+            if progress is not None:
+                progress(imported, rejected)
+
+    events_written += ledger.append(chunk, update_rollups=False)
+    if events_written:
+        ledger.rebuild_rollups()
+    if progress is not None:
+        progress(imported, rejected)
+    return {
+        "imported": imported,
+        "rejected": rejected,
+        "rejected_lines": rejected_lines,
+        "events": events_written,
+        "first_day": first_day,
+    }
@@ -0,0 +1,328 @@
+"""Nest box sensor ingestion for the Chicken Farm integration.
+
+Nest boxes report lays through source entities or a webhook, often many
+times per egg. Each report costs a few dictionary lookups. Repeats of a
+report id are dropped, and so are reports from a box within the debounce
+time of its last counted lay, which is sensor chatter. The rest is
+classified into an egg type by the box's color map and added to a pending
+count per egg type. The first pending lay schedules a flush after the
+micro-window, and the flush adds the counts to the daily egg numbers in
+one batch. Memory and the cost of a report do not grow with the number of
+boxes or the report rate. A flush held up by another mutation of the farm
+shows in the backpressure counters instead, and so do webhook reports that
+are not valid and lays past what a daily egg number holds.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+import logging
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import STATE_ON
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    HomeAssistant,
+    State,
+    callback,
+    valid_entity_id,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_state_change_event,
+)
+import voluptuous as vol
+
+from .const import (
+    CONF_INGEST_DEBOUNCE,
+    CONF_INGEST_WINDOW,
+    CONF_NEST_BOXES,
+    CONF_WEBHOOK_ID,
+    DEFAULT_INGEST_DEBOUNCE,
+    DEFAULT_INGEST_WINDOW,
+    DOMAIN,
+    FIELDS_BY_KEY,
+)
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+    from .farm import ChickenFarm
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_COLOR = "color"  # Source entity attribute with the color of the egg
+SEEN_IDS = 1024  # Report ids remembered for de-duplication
+HIGH_WATER = 200  # Pending lays that are flushed without waiting
+
+# One lay posted to the webhook
+REPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required("box"): cv.string,
+        vol.Optional(ATTR_COLOR): vol.Any(None, cv.string),
+        vol.Optional("id"): vol.Any(None, cv.string),
+        vol.Optional("eggs", default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+def _daily_key(egg_type: str) -> str:
+    """Return the number counting the eggs of a type collected today."""
+    return f"{egg_type}_eggs_daily"
+
+
+def _lays(old_state: State | None, new_state: State) -> int:
+    """Return the eggs a state change of a source entity stands for.
+
+    A binary sensor turning on is one egg, a counter going up is as many
+    eggs as it went up by.
+    """
+    if new_state.domain == "binary_sensor":
+        turned_on = old_state is None or old_state.state != STATE_ON
+        return int(new_state.state == STATE_ON and turned_on)
+    if old_state is None:
+        return 0  # First value after a restart
+    try:
+        return max(int(float(new_state.state) - float(old_state.state)), 0)
+    except ValueError:
+        return 0  # Unknown or unavailable
+
+
+class NestBoxIngest:
+    """De-duplicated, debounced and batched lays of one farm's nest boxes."""
+
+    def __init__(self, hass: HomeAssistant, farm: ChickenFarm) -> None:
+        """Initialize the pipeline without any boxes."""
+        self.hass = hass
+        self._farm = farm
+        # Box -> (color -> egg type, egg type of unknown colors)
+        self._boxes: dict[str, tuple[dict[str, str], str | None]] = {}
+        self._window: float = DEFAULT_INGEST_WINDOW
+        self._debounce: float = DEFAULT_INGEST_DEBOUNCE
+        self._webhook_id: str | None = None
+        self._last_lay: dict[str, float] = {}  # Box -> time of its last counted lay
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._pending: dict[str, int] = {}  # Egg type -> eggs not applied yet
+        self._pending_eggs = 0
+        self._pending_since: float | None = None
+        self._cancel_flush: CALLBACK_TYPE | None = None
+        self._unsubscribe: list[Callable[[], None]] = []
+        self._started = False
+        self.async_flush = farm.instrumentation.wrap("ingest_flush", self.async_flush)
+        # Backpressure and quality counters
+        self.received = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.debounced = 0
+        self.unknown_box = 0
+        self.unclassified = 0
+        self.counted = 0
+        self.capped = 0
+        self.batches = 0
+        self.max_pending = 0
+        self.last_lag = 0.0  # Seconds from the first pending lay to its flush
+        self.max_lag = 0.0
+
+    @callback
+    def async_configure(self, options: Mapping[str, Any]) -> None:
+        """Apply the nest box options, resubscribing if they changed."""
+        boxes = {}
+        for box, mapping in options.get(CONF_NEST_BOXES, {}).items():
+            if isinstance(mapping, str):
+                boxes[box] = ({}, mapping)  # Every egg of the box is one type
+            else:
+                boxes[box] = (dict(mapping.get("colors", {})), mapping.get("default"))
+        self._window = options.get(CONF_INGEST_WINDOW, DEFAULT_INGEST_WINDOW)
+        self._debounce = options.get(CONF_INGEST_DEBOUNCE, DEFAULT_INGEST_DEBOUNCE)
+        sources = (boxes.keys(), options.get(CONF_WEBHOOK_ID) or None)
+        if sources == (self._boxes.keys(), self._webhook_id):
+            self._boxes = boxes
+            return
+        self._boxes = boxes
+        self._webhook_id = sources[1]
+        if self._started:
+            self._async_unsubscribe()
+            self._async_subscribe()
+
+    @callback
+    def async_start(self) -> None:
+        """Start listening to the source entities and the webhook."""
+        self._started = True
+        self._async_subscribe()
+
+    async def async_stop(self) -> None:
+        """Stop listening and apply the lays still pending."""
+        self._started = False
+        self._async_unsubscribe()
+        await self.async_flush()
+
+    @callback
+    def _async_subscribe(self) -> None:
+        """Subscribe to the configured sources."""
+        if entity_ids := [box for box in self._boxes if valid_entity_id(box)]:
+            self._unsubscribe.append(
+                async_track_state_change_event(
+                    self.hass, entity_ids, self._async_state_changed
+                )
+            )
+        if self._webhook_id is None:
+            return
+        if "webhook" not in self.hass.config.components:
+            _LOGGER.warning("Nest box webhook needs the webhook integration")
+            return
+        from homeassistant.components import webhook
+
+        webhook_id = self._webhook_id
+        webhook.async_register(
+            self.hass,
+            DOMAIN,
+            f"{self._farm.entry.title} nest boxes",
+            webhook_id,
+            self._async_handle_webhook,
+            local_only=True,
+        )
+        self._unsubscribe.append(
+            lambda: webhook.async_unregister(self.hass, webhook_id)
+        )
+
+    @callback
+    def _async_unsubscribe(self) -> None:
+        """Drop the subscriptions to the sources."""
+        while self._unsubscribe:
+            self._unsubscribe.pop()()
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Report the lays of a source entity's state change."""
+        if (new_state := event.data["new_state"]) is None:
+            return
+        if eggs := _lays(event.data["old_state"], new_state):
+            self.async_report(
+                new_state.entity_id,
+                new_state.attributes.get(ATTR_COLOR),
+                new_state.context.id,
+                eggs,
+            )
+
+    async def _async_handle_webhook(
+        self, hass: HomeAssistant, webhook_id: str, request: web.Request
+    ) -> None:
+        """Report the lays posted to the webhook, one or a list of them."""
+        try:
+            data = await request.json()
+        except ValueError:
+            _LOGGER.debug("Ignoring a nest box report that is not JSON")
+            return
+        for report in data if isinstance(data, list) else [data]:
+            try:
+                report = REPORT_SCHEMA(report)
+            except vol.Invalid:
+                self.invalid += 1
+                continue
+            self.async_report(
+                report["box"], report.get(ATTR_COLOR), report.get("id"), report["eggs"]
+            )
+
+    @callback
+    def async_report(
+        self, box: str, color: str | None, report_id: str | None, eggs: int = 1
+    ) -> None:
+        """Count a lay reported by a box, unless it repeats an earlier one."""
+        self.received += 1
+        if report_id is not None:
+            if report_id in self._seen:
+                self.duplicates += 1
+                return
+            self._seen[report_id] = None
+            if len(self._seen) > SEEN_IDS:
+                self._seen.popitem(last=False)
+        if (mapping := self._boxes.get(box)) is None:
+            self.unknown_box += 1
+            return
+        now = monotonic()
+        if now - self._last_lay.get(box, -self._debounce) < self._debounce:
+            self.debounced += 1
+            return
+        colors, default = mapping
+        if (egg_type := colors.get(color, default) if color else default) is None:
+            self.unclassified += 1
+            return
+        self._last_lay[box] = now
+        self.counted += eggs
+        self._pending[egg_type] = self._pending.get(egg_type, 0) + eggs
+        self._pending_eggs += eggs
+        self.max_pending = max(self.max_pending, self._pending_eggs)
+        if self._pending_since is None:
+            self._pending_since = now
+            self._cancel_flush = async_call_later(
+                self.hass, self._window, self._async_flush_later
+            )
+        elif self._pending_eggs >= HIGH_WATER and self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+            self.hass.async_create_task(self.async_flush())
+
+    @callback
+    def _async_flush_later(self, _now: Any) -> None:
+        """Flush the pending lays at the end of the micro-window."""
+        self._cancel_flush = None
+        self.hass.async_create_task(self.async_flush())
+
+    async def async_flush(self) -> None:
+        """Add the pending lays to the daily egg numbers in one batch."""
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        if not self._pending:
+            return
+        farm = self._farm
+        if not farm.numbers and self._started:
+            # The number platform is not set up yet, try again later
+            self._cancel_flush = async_call_later(
+                self.hass, self._window, self._async_flush_later
+            )
+            return
+        pending, self._pending = self._pending, {}
+        since, self._pending_since = self._pending_since, None
+        self._pending_eggs = 0
+
+        def _apply() -> None:
+            # Read under the farm's lock, so a save cannot slip in between
+            coordinator = farm.coordinator
+            values = {}
+            for egg_type, eggs in pending.items():
+                field = FIELDS_BY_KEY[_daily_key(egg_type)]
+                value = values[field.key] = coordinator.get(field.key) + eggs
+                # The number holds no more, count what it drops
+                self.capped += int(max(value - field.max_value, 0))
+            farm.async_apply_batch(values)
+
+        await farm.async_mutate(None, _apply)
+        self.batches += 1
+        if since is not None:
+            self.last_lag = monotonic() - since
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the ingestion and backpressure counters."""
+        return {
+            "boxes": len(self._boxes),
+            "received": self.received,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "debounced": self.debounced,
+            "unknown_box": self.unknown_box,
+            "unclassified": self.unclassified,
+            "counted": self.counted,
+            "capped": self.capped,
+            "batches": self.batches,
+            "pending": self._pending_eggs,
+            "max_pending": self.max_pending,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
@@ -0,0 +1,218 @@
+"""Hot path timing for the Chicken Farm integration.
+
+Service handlers, sensor recomputes and entity setup are wrapped once, when
+they are registered. While instrumentation is off a wrapper costs one
+attribute check. While it is on, every call records its latency, the
+state writes it issued and the time it held the event loop. For coroutines
+that is the sum of the steps between their awaits, so time spent waiting
+on the executor does not count. A step longer than the loop budget is
+logged as a warning.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable, Coroutine, Generator
+from functools import wraps
+import logging
+from time import perf_counter
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEFAULT_LOOP_BUDGET_MS, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_INSTRUMENTATION = f"{DOMAIN}_instrumentation"
+
+SAMPLES = 512  # Latencies kept per hot path for the percentiles
+
+
+class _HotPath:
+    """Counters of one instrumented function."""
+
+    __slots__ = (
+        "calls",
+        "samples",
+        "state_writes",
+        "blocked",
+        "max_blocked",
+        "over_budget",
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self.calls = 0
+        self.samples: deque[float] = deque(maxlen=SAMPLES)
+        self.state_writes = 0
+        self.blocked = 0.0  # Seconds the event loop was held
+        self.max_blocked = 0.0  # Longest single hold
+        self.over_budget = 0  # Holds longer than the budget
+
+
+class Instrumentation:
+    """Timing and counters of the integration's hot paths."""
+
+    def __init__(self) -> None:
+        """Initialize disabled instrumentation."""
+        self.enabled = False
+        self.budget = DEFAULT_LOOP_BUDGET_MS / 1000
+        self.state_writes = 0  # Counted by the entities while enabled
+        self._paths: dict[str, _HotPath] = {}
+        self._settings: dict[str, tuple[bool, float]] = {}  # Entry id -> options
+
+    @callback
+    def async_configure(self, entry_id: str, enabled: bool, budget_ms: float) -> None:
+        """Apply the options of a farm; any farm can switch timing on."""
+        self._settings[entry_id] = (enabled, budget_ms)
+        self._async_apply_settings()
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        """Forget the options of an unloaded farm."""
+        self._settings.pop(entry_id, None)
+        self._async_apply_settings()
+
+    @callback
+    def _async_apply_settings(self) -> None:
+        """Enable timing if a farm asks for it, with the tightest budget."""
+        budgets = [budget for enabled, budget in self._settings.values() if enabled]
+        self.enabled = bool(budgets)
+        self.budget = min(budgets, default=DEFAULT_LOOP_BUDGET_MS) / 1000
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Return func timed under a name while instrumentation is enabled."""
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                return await _TimedCoroutine(self, name, func(*args, **kwargs))
+
+            return _async_wrapper
+
+        @wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return func(*args, **kwargs)
+            writes = self.state_writes
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self.record(name, elapsed, elapsed, elapsed, self.state_writes - writes)
+
+        return _wrapper
+
+    def record(
+        self, name: str, latency: float, blocked: float, longest: float, writes: int
+    ) -> None:
+        """Add one call to the counters of a hot path."""
+        if (path := self._paths.get(name)) is None:
+            path = self._paths[name] = _HotPath()
+        path.calls += 1
+        path.samples.append(latency)
+        path.state_writes += writes
+        path.blocked += blocked
+        path.max_blocked = max(path.max_blocked, longest)
+        if longest > self.budget:
+            path.over_budget += 1
+            _LOGGER.warning(
+                "%s held the event loop for %.1f ms, the budget is %.1f ms",
+                name,
+                longest * 1000,
+                self.budget * 1000,
+            )
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the counters of every hot path, latencies in milliseconds."""
+        paths = {}
+        for name, path in sorted(self._paths.items()):
+            samples = sorted(path.samples)
+            paths[name] = {
+                "calls": path.calls,
+                "p50_ms": _percentile(samples, 0.5),
+                "p99_ms": _percentile(samples, 0.99),
+                "state_writes": path.state_writes,
+                "loop_blocked_ms": round(path.blocked * 1000, 3),
+                "max_loop_blocked_ms": round(path.max_blocked * 1000, 3),
+                "over_budget": path.over_budget,
+            }
+        return {
+            "enabled": self.enabled,
+            "loop_budget_ms": round(self.budget * 1000, 3),
+            "hot_paths": paths,
+        }
+
+
+class _TimedCoroutine:
+    """Awaitable driving a coroutine and timing each step it runs in the loop."""
+
+    __slots__ = ("_instrumentation", "_name", "_coro")
+
+    def __init__(
+        self, instrumentation: Instrumentation, name: str, coro: Coroutine
+    ) -> None:
+        """Initialize the wrapper."""
+        self._instrumentation = instrumentation
+        self._name = name
+        self._coro = coro
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        """Run the coroutine, summing the time of the steps between awaits."""
+        instrumentation = self._instrumentation
+        coro = self._coro
+        start = perf_counter()
+        blocked = longest = 0.0
+        writes = 0
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            step_writes = instrumentation.state_writes
+            step_start = perf_counter()
+            try:
+                if error is None:
+                    future = coro.send(value)
+                else:
+                    future = coro.throw(error)
+            except BaseException as err:
+                step = perf_counter() - step_start
+                writes += instrumentation.state_writes - step_writes
+                instrumentation.record(
+                    self._name,
+                    perf_counter() - start,
+                    blocked + step,
+                    max(longest, step),
+                    writes,
+                )
+                if isinstance(err, StopIteration):
+                    return err.value
+                raise
+            step = perf_counter() - step_start
+            blocked += step
+            longest = max(longest, step)
+            # Writes of other tasks while this one waits are not counted
+            writes += instrumentation.state_writes - step_writes
+            try:
+                value, error = (yield future), None
+            except BaseException as err:  # Cancellation is passed on
+                value, error = None, err
+
+
+def _percentile(samples: list[float], share: float) -> float | None:
+    """Return a percentile of sorted latencies in milliseconds."""
+    if not samples:
+        return None
+    return round(samples[min(int(share * len(samples)), len(samples) - 1)] * 1000, 3)
+
+
+@callback
+def async_get_instrumentation(hass: HomeAssistant) -> Instrumentation:
+    """Return the instrumentation shared by every farm."""
+    if (instrumentation := hass.data.get(DATA_INSTRUMENTATION)) is None:
+        instrumentation = hass.data[DATA_INSTRUMENTATION] = Instrumentation()
+    return instrumentation
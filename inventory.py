@@ -0,0 +1,287 @@
+"""Egg inventory for the Chicken Farm integration.
+
+Eggs in storage are kept as lots by lay day and color, oldest first. A
+single list in lay-day order serves the first-in, first-out outflows and
+the expiry thresholds, and one deque per color serves outflows of a color.
+Emptied lots are skipped lazily and compacted away in bulk. Lots that
+were added, changed or emptied since the last save are tracked, and only
+those are written back.
+
+Two cursors mark the first lot that is not yet expired and the first lot
+that is not yet expiring as of the last sweep. A sweep only moves them
+over the lots that crossed a threshold since, and the egg counts behind
+them are kept up to date as eggs come and go, so a day rollover touches
+a handful of lots and never the whole inventory.
+
+All methods block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import deque
+from datetime import date
+import threading
+
+from .const import EGG_TYPES, LEDGER_EGGS, LEDGER_SALES, LEDGER_STORAGE
+from .ledger import FarmLedger, LedgerEvent
+
+EXPIRY_DAYS = 21  # Eggs older than this are past their best
+EXPIRING_WITHIN_DAYS = 7  # Window of the eggs expiring soon
+
+COMPACT_THRESHOLD = 1024  # Emptied lots kept before the list is compacted
+
+DAY = 0
+COLOR = 1
+EGGS = 2
+LOT_ID = 3  # Row id in the ledger, None until saved
+
+
+class EggInventory:
+    """First-in, first-out egg lots of one farm."""
+
+    def __init__(self) -> None:
+        """Initialize an empty inventory."""
+        self._lock = threading.Lock()
+        self._lots: list[list] = []  # [day ordinal, color, eggs, id] by lay day
+        self._head = 0  # First lot that may still hold eggs
+        self._colors: dict[str, deque[list]] = {}  # Color -> its lots, oldest first
+        self._color_eggs: dict[str, int] = {}  # Color -> eggs in its lots
+        self._expired_at = 0  # First lot that is not expired
+        self._expiring_at = 0  # First lot that is not expiring
+        self._expired_day = 0  # Lots laid on or before this day are expired
+        self._expiring_day = 0  # Lots laid on or before this day are expiring
+        self._expired = 0  # Eggs in the expired lots
+        self._expiring = 0  # Eggs in the expiring lots, expired included
+        self._changed: dict[int, list] = {}  # id() -> lot changed since the save
+        self._last_color = EGG_TYPES[0]  # Color of the last eggs taken
+        self.total = 0
+
+    def load(self, ledger: FarmLedger, today: date) -> None:
+        """Load the lots from the ledger."""
+        rows = ledger.load_lots()
+        with self._lock:
+            self._lots = [
+                [date.fromisoformat(day).toordinal(), color, eggs, lot_id]
+                for lot_id, day, color, eggs in rows
+            ]
+            self._changed = {}
+            self._head = self._expired_at = self._expiring_at = 0
+            self._expired_day = self._expiring_day = 0
+            self._expired = self._expiring = 0
+            self._colors = {}
+            self._color_eggs = {}
+            for lot in self._lots:
+                self._colors.setdefault(lot[COLOR], deque()).append(lot)
+                self._color_eggs[lot[COLOR]] = (
+                    self._color_eggs.get(lot[COLOR], 0) + lot[EGGS]
+                )
+            self.total = sum(lot[EGGS] for lot in self._lots)
+            self._sweep(today.toordinal())
+
+    def save(self, ledger: FarmLedger) -> None:
+        """Persist the lots added, changed or emptied since the last save."""
+        with self._lock:
+            if not self._changed:
+                return
+            added = []
+            updates = []
+            deletes = []
+            for lot in self._changed.values():
+                if lot[LOT_ID] is None:
+                    if lot[EGGS]:
+                        added.append(lot)
+                elif lot[EGGS]:
+                    updates.append((lot[EGGS], lot[LOT_ID]))
+                else:
+                    deletes.append((lot[LOT_ID],))
+            inserts = [
+                (date.fromordinal(lot[DAY]).isoformat(), lot[COLOR], lot[EGGS])
+                for lot in added
+            ]
+            lot_ids = ledger.save_lots(inserts, updates, deletes)
+            # Only once committed, so a failed save is retried in full
+            for lot, lot_id in zip(added, lot_ids):
+                lot[LOT_ID] = lot_id
+            self._changed = {}
+
+    def apply(self, events: list[LedgerEvent], today: date) -> None:
+        """Add collected eggs as lots and take storage outflows from the oldest.
+
+        Sales take eggs of their color, other outflows take any color. A
+        lowered egg count takes the eggs it no longer counts from the oldest
+        lots of its color, and a lowered outflow returns the eggs it no
+        longer counts to storage.
+        """
+        with self._lock:
+            for event in events:
+                count = int(event.quantity)
+                if event.kind == LEDGER_EGGS and count < 0:
+                    self._take(-count, event.subtype)
+                elif event.kind == LEDGER_EGGS:
+                    day = date.fromisoformat(event.day).toordinal()
+                    self._add(day, event.subtype, count)
+                elif event.kind == LEDGER_SALES:
+                    self._take(count, event.subtype)
+                elif event.kind == LEDGER_STORAGE and count < 0:
+                    day = date.fromisoformat(event.day).toordinal()
+                    self._return(-count, day)
+                elif event.kind == LEDGER_STORAGE:
+                    self._take(count)
+            self._sweep(today.toordinal())
+
+    def _add(self, day: int, color: str, eggs: int) -> None:
+        """Add eggs laid on a day, merging them into a lot of that day."""
+        if eggs <= 0:
+            return
+        self.total += eggs
+        self._color_eggs[color] = self._color_eggs.get(color, 0) + eggs
+        if day <= self._expired_day:
+            self._expired += eggs
+        if day <= self._expiring_day:
+            self._expiring += eggs
+        lots = self._colors.setdefault(color, deque())
+        # Back-dated collections are rare enough for a search of the deque
+        position = (
+            len(lots)
+            if not lots or lots[-1][DAY] <= day
+            else bisect_right(lots, day, key=_day)
+        )
+        if position and (lot := lots[position - 1])[DAY] == day:
+            lot[EGGS] += eggs
+            self._changed[id(lot)] = lot
+            return
+        lot = [day, color, eggs, None]
+        self._changed[id(lot)] = lot
+        lots.insert(position, lot)
+        self._lots.insert(bisect_right(self._lots, day, lo=self._head, key=_day), lot)
+        # A lot behind a cursor moves the cursor along
+        if day <= self._expired_day:
+            self._expired_at += 1
+        if day <= self._expiring_day:
+            self._expiring_at += 1
+
+    def _return(self, eggs: int, day: int) -> None:
+        """Return eggs an outflow no longer counts to storage.
+
+        Outflows take from the oldest lots, so the eggs go back to the
+        oldest lot still holding eggs. With storage empty they go back as
+        eggs of that day, of the color last taken.
+        """
+        if eggs <= 0:
+            return
+        if self._head == len(self._lots):
+            self._add(day, self._last_color, eggs)
+            return
+        lot = self._lots[self._head]
+        lot[EGGS] += eggs
+        self._changed[id(lot)] = lot
+        self.total += eggs
+        self._color_eggs[lot[COLOR]] += eggs
+        if lot[DAY] <= self._expired_day:
+            self._expired += eggs
+        if lot[DAY] <= self._expiring_day:
+            self._expiring += eggs
+
+    def available(self, color: str) -> int:
+        """Return the eggs of a color in storage."""
+        return self._color_eggs.get(color, 0)
+
+    def take(self, eggs: int, color: str | None = None) -> int:
+        """Take eggs from the oldest lots, of one color if given.
+
+        Returns the number of eggs taken, which is less than asked when the
+        inventory runs out.
+        """
+        with self._lock:
+            return self._take(eggs, color)
+
+    def _take(self, eggs: int, color: str | None = None) -> int:
+        """Take eggs from the oldest lots with the lock held."""
+        taken = 0
+        if color is None:
+            position = self._head
+            while taken < eggs and position < len(self._lots):
+                taken += self._take_from(self._lots[position], eggs - taken)
+                position += 1
+        else:
+            lots = self._colors.get(color, deque())
+            while taken < eggs and lots:
+                taken += self._take_from(lots[0], eggs - taken)
+        self._compact()
+        return taken
+
+    def _take_from(self, lot: list, eggs: int) -> int:
+        """Take up to a number of eggs from a lot."""
+        taken = min(eggs, lot[EGGS])
+        if not taken:
+            return 0
+        lot[EGGS] -= taken
+        self._last_color = lot[COLOR]
+        self._changed[id(lot)] = lot
+        self.total -= taken
+        self._color_eggs[lot[COLOR]] -= taken
+        if lot[DAY] <= self._expired_day:
+            self._expired -= taken
+        if lot[DAY] <= self._expiring_day:
+            self._expiring -= taken
+        if not lot[EGGS]:
+            lots = self._colors[lot[COLOR]]
+            if lots[0] is lot:
+                lots.popleft()
+            else:
+                lots.remove(lot)
+        return taken
+
+    def _compact(self) -> None:
+        """Skip emptied lots at the front and drop them in bulk."""
+        while self._head < len(self._lots) and not self._lots[self._head][EGGS]:
+            self._head += 1
+        # Emptied lots count for nothing, so the cursors may skip them too
+        self._expired_at = max(self._expired_at, self._head)
+        self._expiring_at = max(self._expiring_at, self._head)
+        if self._head >= COMPACT_THRESHOLD:
+            del self._lots[: self._head]
+            self._expired_at -= self._head
+            self._expiring_at -= self._head
+            self._head = 0
+
+    def _sweep(self, today: int) -> None:
+        """Move the cursors over the lots that crossed a threshold."""
+        expired_day = self._expired_day = today - EXPIRY_DAYS
+        expiring_day = self._expiring_day = expired_day + EXPIRING_WITHIN_DAYS
+        lots = self._lots
+        while (
+            self._expired_at < len(lots) and lots[self._expired_at][DAY] <= expired_day
+        ):
+            self._expired += lots[self._expired_at][EGGS]
+            self._expired_at += 1
+        while (
+            self._expiring_at < len(lots)
+            and lots[self._expiring_at][DAY] <= expiring_day
+        ):
+            self._expiring += lots[self._expiring_at][EGGS]
+            self._expiring_at += 1
+
+    def summary(self, today: date) -> dict[str, float | None]:
+        """Sweep to today and return the inventory figures."""
+        ordinal = today.toordinal()
+        with self._lock:
+            self._sweep(ordinal)
+            self._compact()
+            oldest = (
+                ordinal - self._lots[self._head][DAY]
+                if self._head < len(self._lots)
+                else None
+            )
+            return {
+                "lot_eggs": self.total,
+                "oldest_egg_age": oldest,
+                "eggs_expired": self._expired,
+                "eggs_expiring": self._expiring - self._expired,
+            }
+
+
+def _day(lot: list) -> int:
+    """Return the lay day of a lot."""
+    return lot[DAY]
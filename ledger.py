@@ -0,0 +1,520 @@
+"""Append-only event ledger for the Chicken Farm integration.
+
+Every egg collection, purchase and flock or hatchery change is appended to
+a per-farm SQLite file. A small totals table is updated in the same
+transaction, so cumulative figures are read from it (and from the copy
+kept in memory) instead of replaying the events. Day, ISO week, month and
+year rollups are maintained the same way and answer range queries without
+touching the events table. The flock cohorts, open incubation batches and
+egg lots in storage and the sales orders are stored alongside, as is the
+state of the online models. A central farm also keeps the totals merged
+from its satellites here.
+
+All methods block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, timedelta
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    subtype TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    amount REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    kind TEXT NOT NULL,
+    subtype TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    amount REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, subtype)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    subtype TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    amount REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, kind, subtype)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cohorts (
+    hatch_day TEXT PRIMARY KEY,
+    hens INTEGER NOT NULL,
+    roosters INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incubations (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    eggs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS model_state (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lots (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    color TEXT NOT NULL,
+    eggs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    egg_type TEXT NOT NULL,
+    eggs INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    paid REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS open_orders ON orders (customer, id) WHERE paid < amount;
+CREATE TABLE IF NOT EXISTS sites (
+    site TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    counters TEXT NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS site_totals (
+    site TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    subtype TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    amount REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (site, kind, subtype)
+) WITHOUT ROWID;
+"""
+
+SCHEMA_VERSION = 2
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIOD_YEAR = "year"
+PERIODS = [PERIOD_DAY, PERIOD_WEEK, PERIOD_MONTH, PERIOD_YEAR]
+
+# SQL expression returning the first day of the bucket of an event day
+BUCKET_SQL = {
+    PERIOD_DAY: "day",
+    PERIOD_WEEK: "date(day, '-' || ((strftime('%w', day) + 6) % 7) || ' days')",
+    PERIOD_MONTH: "substr(day, 1, 7) || '-01'",
+    PERIOD_YEAR: "substr(day, 1, 4) || '-01-01'",
+}
+
+UPSERT_TOTAL = """
+INSERT INTO totals (kind, subtype, quantity, amount, count) VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (kind, subtype) DO UPDATE SET
+    quantity = quantity + excluded.quantity,
+    amount = amount + excluded.amount,
+    count = count + 1
+"""
+
+UPSERT_SITE_TOTAL = """
+INSERT INTO site_totals (site, kind, subtype, quantity, amount, count)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (site, kind, subtype) DO UPDATE SET
+    quantity = quantity + excluded.quantity,
+    amount = amount + excluded.amount,
+    count = count + excluded.count
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (period, bucket, kind, subtype, quantity, amount, count)
+VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (period, bucket, kind, subtype) DO UPDATE SET
+    quantity = quantity + excluded.quantity,
+    amount = amount + excluded.amount,
+    count = count + 1
+"""
+
+
+def bucket_start(period: str, day: str) -> str:
+    """Return the ISO date of the first day of the bucket containing day."""
+    if period == PERIOD_DAY:
+        return day
+    if period == PERIOD_WEEK:
+        start = date.fromisoformat(day)
+        return (start - timedelta(days=start.weekday())).isoformat()
+    if period == PERIOD_MONTH:
+        return f"{day[:7]}-01"
+    return f"{day[:4]}-01-01"
+
+
+class LedgerEvent(NamedTuple):
+    """A single ledger record."""
+
+    day: str  # ISO date the event belongs to
+    kind: str  # One of the LEDGER_* kinds
+    subtype: str  # Egg color, purchase type, ...
+    quantity: float  # Eggs, birds or kg
+    amount: float = 0.0  # Money
+
+
+class FarmLedger:
+    """Append-only ledger of one farm."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize the ledger."""
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        # (kind, subtype) -> [quantity, amount, count]
+        self._totals: dict[tuple[str, str], list] = {}
+
+    def open(self) -> None:
+        """Open the database and load the running totals."""
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            if version < 2:
+                self.rebuild_rollups()
+            with conn:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._totals = {
+            (kind, subtype): [quantity, amount, count]
+            for kind, subtype, quantity, amount, count in conn.execute(
+                "SELECT kind, subtype, quantity, amount, count FROM totals"
+            )
+        }
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def append(
+        self,
+        events: Iterable[LedgerEvent],
+        update_rollups: bool = True,
+        states: Iterable[tuple[str, str]] = (),
+    ) -> int:
+        """Append events in one transaction and return how many were written.
+
+        Bulk writers may skip the rollups and call rebuild_rollups once done.
+        The (name, state) pairs of models are stored in the same transaction.
+        """
+        events = list(events)
+        states = list(states)
+        if not events and not states:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO model_state (name, state) VALUES (?, ?)",
+                states,
+            )
+            self._insert(events, update_rollups)
+        self._mirror(events)
+        return len(events)
+
+    def _insert(self, events: list[LedgerEvent], update_rollups: bool) -> None:
+        """Write events, totals and rollups inside an open transaction."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO events (ts, day, kind, subtype, quantity, amount)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(now, *event) for event in events],
+        )
+        self._conn.executemany(
+            UPSERT_TOTAL,
+            [
+                (event.kind, event.subtype, event.quantity, event.amount)
+                for event in events
+            ],
+        )
+        if update_rollups:
+            self._conn.executemany(
+                UPSERT_ROLLUP,
+                [
+                    (
+                        period,
+                        bucket_start(period, event.day),
+                        event.kind,
+                        event.subtype,
+                        event.quantity,
+                        event.amount,
+                    )
+                    for event in events
+                    for period in PERIODS
+                ],
+            )
+
+    def _mirror(self, events: list[LedgerEvent]) -> None:
+        """Add events to the totals kept in memory, once they are committed."""
+        for event in events:
+            total = self._totals.setdefault((event.kind, event.subtype), [0.0, 0.0, 0])
+            total[0] += event.quantity
+            total[1] += event.amount
+            total[2] += 1
+
+    def total(self, kind: str, subtype: str | None = None) -> tuple[float, float]:
+        """Return the cumulative (quantity, amount) of a kind or subtype."""
+        if subtype is not None:
+            quantity, amount, _ = self._totals.get((kind, subtype), (0.0, 0.0, 0))
+            return quantity, amount
+        quantity = amount = 0.0
+        for (total_kind, _), (total_quantity, total_amount, _) in self._totals.items():
+            if total_kind == kind:
+                quantity += total_quantity
+                amount += total_amount
+        return quantity, amount
+
+    def subtypes(self, kind: str) -> list[str]:
+        """Return the subtypes of a kind that have events."""
+        return [subtype for total_kind, subtype in self._totals if total_kind == kind]
+
+    def events_since(self, last_id: int, limit: int) -> list[tuple]:
+        """Return at most limit events appended after an event id, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, day, kind, subtype, quantity, amount FROM events"
+                " WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+
+    def snapshot(self) -> tuple[int, list[tuple], str | None, str | None]:
+        """Return the last event id, the totals and the first and last event day.
+
+        They are read together, so the events after the id are exactly the
+        ones the totals do not hold yet. The days come from the day rollups.
+        """
+        with self._lock:
+            (last_id,) = self._conn.execute("SELECT MAX(id) FROM events").fetchone()
+            totals = self._conn.execute(
+                "SELECT kind, subtype, quantity, amount, count FROM totals"
+            ).fetchall()
+            first_day, last_day = self._conn.execute(
+                "SELECT MIN(bucket), MAX(bucket) FROM rollups WHERE period = ?",
+                (PERIOD_DAY,),
+            ).fetchone()
+        return last_id or 0, totals, first_day, last_day
+
+    def events_page(
+        self,
+        after_id: int,
+        limit: int,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[tuple]:
+        """Return at most limit events after an event id, optionally by day."""
+        query = (
+            "SELECT id, day, kind, subtype, quantity, amount FROM events WHERE id > ?"
+        )
+        args: list = [after_id]
+        if start is not None:
+            query += " AND day >= ?"
+            args.append(start)
+        if end is not None:
+            query += " AND day <= ?"
+            args.append(end)
+        args.append(limit)
+        # Keyset paging keeps every query short, so appends are never blocked long
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY id LIMIT ?", args).fetchall()
+
+    def rebuild_rollups(self) -> None:
+        """Recompute every rollup bucket from the events table."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rollups")
+            for period, bucket in BUCKET_SQL.items():
+                self._conn.execute(
+                    "INSERT INTO rollups"
+                    " (period, bucket, kind, subtype, quantity, amount, count)"
+                    f" SELECT ?, {bucket} AS bucket, kind, subtype,"
+                    " SUM(quantity), SUM(amount), COUNT(*)"
+                    " FROM events GROUP BY bucket, kind, subtype",
+                    (period,),
+                )
+
+    def statistics(
+        self, period: str, start: str, end: str, kind: str | None = None
+    ) -> list[dict]:
+        """Return the rollup buckets of a period starting between two dates."""
+        query = (
+            "SELECT bucket, kind, subtype, quantity, amount, count FROM rollups"
+            " WHERE period = ? AND bucket BETWEEN ? AND ?"
+        )
+        args = [period, bucket_start(period, start), end]
+        if kind is not None:
+            query += " AND kind = ?"
+            args.append(kind)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY bucket", args).fetchall()
+        return [
+            {
+                "start": bucket,
+                "kind": kind,
+                "subtype": subtype,
+                "quantity": quantity,
+                "amount": amount,
+                "count": count,
+            }
+            for bucket, kind, subtype, quantity, amount, count in rows
+        ]
+
+    def daily_series(
+        self, kind: str, subtype: str, since: str
+    ) -> list[tuple[str, float, float, float, float]]:
+        """Return the day buckets of a subtype from a date on.
+
+        Each row is (day, quantity, amount, cumulative quantity, cumulative
+        amount). The cumulative values are derived from the totals header by
+        walking back from the newest day, so only the requested days are read.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket, quantity, amount FROM rollups"
+                " WHERE period = ? AND kind = ? AND subtype = ? AND bucket >= ?"
+                " ORDER BY bucket DESC",
+                (PERIOD_DAY, kind, subtype, since),
+            ).fetchall()
+        quantity_sum, amount_sum = self.total(kind, subtype)
+        series = []
+        for day, quantity, amount in rows:
+            series.append((day, quantity, amount, quantity_sum, amount_sum))
+            quantity_sum -= quantity
+            amount_sum -= amount
+        series.reverse()
+        return series
+
+    def load_flock(self) -> tuple[list[tuple], list[tuple]]:
+        """Return the cohorts by hatch day and the open incubation batches."""
+        with self._lock:
+            cohorts = self._conn.execute(
+                "SELECT hatch_day, hens, roosters FROM cohorts ORDER BY hatch_day"
+            ).fetchall()
+            incubations = self._conn.execute(
+                "SELECT day, eggs FROM incubations ORDER BY id"
+            ).fetchall()
+        return cohorts, incubations
+
+    def save_flock(self, cohorts: list[tuple], incubations: list[tuple]) -> None:
+        """Store changed cohorts and replace the open incubation batches."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cohorts (hatch_day, hens, roosters)"
+                " VALUES (?, ?, ?)",
+                cohorts,
+            )
+            self._conn.execute("DELETE FROM incubations")
+            self._conn.executemany(
+                "INSERT INTO incubations (day, eggs) VALUES (?, ?)", incubations
+            )
+
+    def load_lots(self) -> list[tuple]:
+        """Return the egg lots in storage by lay day, with their ids."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, day, color, eggs FROM lots ORDER BY day, id"
+            ).fetchall()
+
+    def save_lots(
+        self, inserts: list[tuple], updates: list[tuple], deletes: list[tuple]
+    ) -> list[int]:
+        """Write the changes to the egg lots in storage in one transaction.
+
+        Inserts are (day, color, eggs), updates (eggs, id) and deletes (id,).
+        Returns the ids of the inserted lots.
+        """
+        with self._lock, self._conn:
+            lot_ids = [
+                self._conn.execute(
+                    "INSERT INTO lots (day, color, eggs) VALUES (?, ?, ?)", lot
+                ).lastrowid
+                for lot in inserts
+            ]
+            self._conn.executemany("UPDATE lots SET eggs = ? WHERE id = ?", updates)
+            self._conn.executemany("DELETE FROM lots WHERE id = ?", deletes)
+        return lot_ids
+
+    def load_sales(self) -> tuple[list[tuple], list[tuple]]:
+        """Return the open orders and the order sums by customer and egg type."""
+        with self._lock:
+            open_orders = self._conn.execute(
+                "SELECT id, day, customer, egg_type, eggs, amount, paid FROM orders"
+                " WHERE paid < amount ORDER BY id"
+            ).fetchall()
+            sums = self._conn.execute(
+                "SELECT customer, egg_type, COUNT(*), SUM(eggs), SUM(amount), SUM(paid)"
+                " FROM orders GROUP BY customer, egg_type"
+            ).fetchall()
+        return open_orders, sums
+
+    def add_order(self, event: LedgerEvent, customer: str) -> int:
+        """Store an order and its sales event in one transaction.
+
+        Returns the id of the order.
+        """
+        with self._lock, self._conn:
+            order_id = self._conn.execute(
+                "INSERT INTO orders (day, customer, egg_type, eggs, amount, paid)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (event.day, customer, event.subtype, int(event.quantity), event.amount),
+            ).lastrowid
+            self._insert([event], True)
+        self._mirror([event])
+        return order_id
+
+    def pay_orders(self, payments: list[tuple[float, int]]) -> None:
+        """Store the paid amounts of orders, as (paid, order id) pairs."""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE orders SET paid = ? WHERE id = ?", payments)
+
+    def load_sites(self) -> tuple[list[tuple], list[tuple]]:
+        """Return the satellites and their merged totals."""
+        with self._lock:
+            sites = self._conn.execute(
+                "SELECT site, name, seq, counters, updated FROM sites"
+            ).fetchall()
+            totals = self._conn.execute(
+                "SELECT site, kind, subtype, quantity, amount, count FROM site_totals"
+            ).fetchall()
+        return sites, totals
+
+    def merge_site(self, site: tuple, totals: list[tuple]) -> None:
+        """Store a satellite and add a delta to its totals in one transaction.
+
+        The site is (site, name, seq, counters, updated), every total is
+        (site, kind, subtype, quantity, amount, count).
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sites (site, name, seq, counters, updated)"
+                " VALUES (?, ?, ?, ?, ?)",
+                site,
+            )
+            self._conn.executemany(UPSERT_SITE_TOTAL, totals)
+
+    def load_state(self, name: str) -> str | None:
+        """Return the stored state of a model."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM model_state WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_state(self, name: str, state: str) -> None:
+        """Store the state of a model."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO model_state (name, state) VALUES (?, ?)",
+                (name, state),
+            )
@@ -0,0 +1,106 @@
+"""Number platform of the Chicken Farm integration."""
+
+from __future__ import annotations
+
+from functools import cache
+
+from homeassistant.components.number import NumberEntityDescription, RestoreNumber
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, NUMBER_FIELDS, ChickenField
+from .entity import CountedWritesEntity
+from .farm import ChickenFarm
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Chicken Farm numbers."""
+    farm: ChickenFarm = hass.data[DOMAIN][config_entry.entry_id]
+    farm.instrumentation.wrap("number_setup", _async_add_numbers)(
+        farm, async_add_entities
+    )
+
+
+@callback
+def _async_add_numbers(
+    farm: ChickenFarm, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Create every number of a farm in one batch."""
+    numbers = [ChickenNumber(farm, field) for field in NUMBER_FIELDS]
+    for number in numbers:
+        farm.numbers[number.key] = number
+    async_add_entities(numbers)
+
+
+@cache
+def _number_description(field: ChickenField) -> NumberEntityDescription:
+    """Return the entity description of a field, built once per field."""
+    return NumberEntityDescription(
+        key=field.key,
+        name=field.name,
+        icon=field.icon,
+        native_min_value=0,
+        native_max_value=field.max_value,
+        native_step=field.step,
+        native_unit_of_measurement=field.unit,
+    )
+
+
+class ChickenNumber(CountedWritesEntity, RestoreNumber):
+    """Representation of a Chicken Farm Number Input."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(self, farm: ChickenFarm, field: ChickenField) -> None:
+        """Initialize the number input."""
+        # Name, icon, range and unit live in a description shared by all farms
+        self.entity_description = _number_description(field)
+        self.field = field
+        self.farm = farm
+        self._instrumentation = farm.instrumentation
+        self._attr_unique_id = f"{farm.entry.entry_id}_{field.key}"  # Stable across restarts
+        self._attr_device_info = farm.device_info
+        self._attr_native_value = 0.0  # Initialize with the minimum value
+
+    @property
+    def key(self) -> str:
+        """Return the key of the field."""
+        return self.field.key
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last value, saved by the farm or by the restore state."""
+        await super().async_added_to_hass()
+        if (value := self.farm.stored_values.get(self.key)) is None:
+            last = await self.async_get_last_number_data()
+            if last is None or last.native_value is None:
+                return
+            value = last.native_value
+        self._attr_native_value = self._clamp(value)
+        self.farm.coordinator.async_set(self.key, self._attr_native_value)
+
+    def _clamp(self, value: float) -> float:
+        """Ensure the value is within the allowed range."""
+        return self.field.clamp(value)
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Set a new value."""
+        # Runs in the event loop; the sync set_native_value would be called
+        # from the executor and may not write state from there.
+        self.async_apply_value(value)
+
+    @callback
+    def async_apply_value(self, value: float) -> bool:
+        """Set a new value and write state once if it changed."""
+        value = self._clamp(value)
+        if value == self._attr_native_value:
+            return False
+        self._attr_native_value = value
+        self.async_write_ha_state()  # Notify Home Assistant of the state change
+        self.farm.coordinator.async_set(self.key, value)
+        return True
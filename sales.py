@@ -0,0 +1,274 @@
+"""Sales order book for the Chicken Farm integration.
+
+Every order names a customer, an egg type and a quantity, and is priced
+from the farm's tiers: a price per egg, per dozen and per tray, per egg
+type with a default for the others. Pricing a quantity is memoized, as a
+farm shop sells the same few quantities over and over.
+
+An order is stored with its sales event in one transaction and takes its
+eggs from the storage lots of its color. Only the open orders are kept in
+memory, indexed by id and by customer. Revenue, payments and eggs are
+summed per customer and per egg type as orders and payments come in, so
+the open orders of a customer, the revenue per customer and the revenue
+per color cost the same after years of orders as after a week.
+
+All methods block and must run in the executor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import date
+from functools import lru_cache
+import threading
+from typing import Any
+
+from .const import PRICE_TIER_UNITS
+from .inventory import EggInventory
+from .ledger import FarmLedger, LedgerEvent
+
+DOZEN_EGGS = 12
+TRAY_EGGS = 30
+CENT = 0.005  # Amounts closer than this are equal
+
+DAY = 0
+CUSTOMER = 1
+EGG_TYPE = 2
+EGGS = 3
+AMOUNT = 4
+PAID = 5
+
+PriceTiers = tuple[float | None, float | None, float | None]  # Egg, dozen, tray
+
+
+def parse_price_tiers(options: Mapping[str, Any]) -> dict[str, PriceTiers]:
+    """Return the (egg, dozen, tray) prices of every egg type in the options."""
+    return {
+        egg_type: tuple(prices.get(unit) for unit in PRICE_TIER_UNITS)
+        for egg_type, prices in options.items()
+    }
+
+
+@lru_cache(maxsize=1024)
+def resolve_price(tiers: PriceTiers, eggs: int) -> tuple[float, int, int, int] | None:
+    """Return the cheapest (amount, trays, dozens, singles) making up a quantity.
+
+    Returns None when the tiers cannot price it, like 13 eggs sold by the
+    dozen only.
+    """
+    egg, dozen, tray = tiers
+    best: tuple[float, int, int, int] | None = None
+    for trays in range(eggs // TRAY_EGGS + 1) if tray is not None else (0,):
+        rest = eggs - trays * TRAY_EGGS
+        # The amount is linear in the dozens, so the cheapest is at either end
+        for dozens in {0, rest // DOZEN_EGGS} if dozen is not None else (0,):
+            singles = rest - dozens * DOZEN_EGGS
+            if singles and egg is None:
+                continue
+            amount = (
+                trays * (tray or 0.0)
+                + dozens * (dozen or 0.0)
+                + singles * (egg or 0.0)
+            )
+            if best is None or amount < best[0]:
+                best = (amount, trays, dozens, singles)
+    if best is None:
+        return None
+    return (round(best[0], 2), *best[1:])
+
+
+def _order_info(order_id: int, order: list) -> dict[str, Any]:
+    """Return an open order as a service response."""
+    return {
+        "order_id": order_id,
+        "date": order[DAY],
+        "customer": order[CUSTOMER],
+        "egg_type": order[EGG_TYPE],
+        "eggs": order[EGGS],
+        "amount": order[AMOUNT],
+        "owed": round(order[AMOUNT] - order[PAID], 2),
+    }
+
+
+class SalesBook:
+    """Open orders and running sales sums of one farm."""
+
+    def __init__(self) -> None:
+        """Initialize an empty order book."""
+        self._lock = threading.Lock()
+        # Order id -> [day, customer, egg type, eggs, amount, paid], open only
+        self._open: dict[int, list] = {}
+        self._open_by_customer: dict[str, dict[int, None]] = {}  # Oldest first
+        self._customers: dict[str, list] = {}  # -> [orders, eggs, revenue, paid]
+        self._types: dict[str, list] = {}  # Egg type -> [orders, eggs, revenue]
+        self.orders = 0
+        self.revenue = 0.0
+        self.paid = 0.0
+
+    def load(self, ledger: FarmLedger) -> None:
+        """Load the open orders and the order sums from the ledger."""
+        open_orders, sums = ledger.load_sales()
+        with self._lock:
+            self._open = {}
+            self._open_by_customer = {}
+            for order_id, *order in open_orders:
+                self._open_order(order_id, order)
+            self._customers = {}
+            self._types = {}
+            self.orders = 0
+            self.revenue = self.paid = 0.0
+            for customer, egg_type, orders, eggs, amount, paid in sums:
+                self._count(customer, egg_type, orders, eggs, amount, paid)
+
+    def _open_order(self, order_id: int, order: list) -> None:
+        """Index an order that is not fully paid."""
+        self._open[order_id] = order
+        self._open_by_customer.setdefault(order[CUSTOMER], {})[order_id] = None
+
+    def _count(
+        self,
+        customer: str,
+        egg_type: str,
+        orders: int,
+        eggs: int,
+        amount: float,
+        paid: float,
+    ) -> None:
+        """Add orders and payments to the running sums."""
+        account = self._customers.setdefault(customer, [0, 0, 0.0, 0.0])
+        account[0] += orders
+        account[1] += eggs
+        account[2] += amount
+        account[3] += paid
+        totals = self._types.setdefault(egg_type, [0, 0, 0.0])
+        totals[0] += orders
+        totals[1] += eggs
+        totals[2] += amount
+        self.orders += orders
+        self.revenue += amount
+        self.paid += paid
+
+    def sell(
+        self,
+        ledger: FarmLedger,
+        inventory: EggInventory,
+        customer: str,
+        event: LedgerEvent,
+        today: date,
+    ) -> int | None:
+        """Record an order and take its eggs from storage.
+
+        Returns the order id, or None if storage holds too few eggs of the
+        order's color.
+        """
+        eggs = int(event.quantity)
+        with self._lock:
+            if inventory.available(event.subtype) < eggs:
+                return None
+            order_id = ledger.add_order(event, customer)
+            inventory.apply([event], today)
+            inventory.save(ledger)
+            self._count(customer, event.subtype, 1, eggs, event.amount, 0.0)
+            if event.amount > 0:
+                self._open_order(
+                    order_id,
+                    [event.day, customer, event.subtype, eggs, event.amount, 0.0],
+                )
+            return order_id
+
+    def pay(
+        self, ledger: FarmLedger, customer: str, amount: float, order_id: int | None
+    ) -> dict[str, Any] | None:
+        """Apply a payment to one open order, or to the oldest open orders.
+
+        Returns the ids of the orders the payment went to and the customer's
+        balance, or None if the payment is more than those orders are owed.
+        """
+        with self._lock:
+            ids = (
+                list(self._open_by_customer.get(customer, ()))
+                if order_id is None
+                else [order_id]
+            )
+            orders = [
+                (open_id, order)
+                for open_id in ids
+                if (order := self._open.get(open_id)) and order[CUSTOMER] == customer
+            ]
+            if amount > sum(order[AMOUNT] - order[PAID] for _, order in orders) + CENT:
+                return None
+            payments = []
+            left = amount
+            for open_id, order in orders:
+                if left <= CENT:
+                    break
+                part = min(left, order[AMOUNT] - order[PAID])
+                paid = round(order[PAID] + part, 2)
+                if order[AMOUNT] - paid <= CENT:
+                    paid = order[AMOUNT]  # Paid in full, closed in the ledger too
+                payments.append((paid, open_id))
+                left -= part
+            ledger.pay_orders(payments)
+            # Only update the indexes once the payments are committed
+            for paid, open_id in payments:
+                order = self._open[open_id]
+                order[PAID] = paid
+                if paid == order[AMOUNT]:
+                    del self._open[open_id]
+                    del self._open_by_customer[customer][open_id]
+            if not self._open_by_customer.get(customer, True):
+                del self._open_by_customer[customer]
+            account = self._customers[customer]
+            account[3] += amount
+            self.paid += amount
+            return {
+                "orders": [open_id for _, open_id in payments],
+                "balance": round(account[2] - account[3], 2),
+            }
+
+    def open_orders(self, customer: str | None = None) -> list[dict[str, Any]]:
+        """Return the open orders of a customer or of everyone, oldest first."""
+        with self._lock:
+            if customer is None:
+                ids = list(self._open)  # Inserted in id order
+            else:
+                ids = list(self._open_by_customer.get(customer, ()))
+            return [_order_info(order_id, self._open[order_id]) for order_id in ids]
+
+    def revenue_per_customer(self) -> dict[str, dict[str, float]]:
+        """Return the orders, eggs, revenue and balance of every customer."""
+        with self._lock:
+            return {
+                customer: {
+                    "orders": orders,
+                    "eggs": eggs,
+                    "revenue": round(revenue, 2),
+                    "balance": round(revenue - paid, 2),
+                    "open_orders": len(self._open_by_customer.get(customer, ())),
+                }
+                for customer, (orders, eggs, revenue, paid) in self._customers.items()
+            }
+
+    def revenue_per_type(self) -> dict[str, dict[str, float]]:
+        """Return the orders, eggs and revenue of every egg type sold."""
+        with self._lock:
+            return {
+                egg_type: {
+                    "orders": orders,
+                    "eggs": eggs,
+                    "revenue": round(revenue, 2),
+                }
+                for egg_type, (orders, eggs, revenue) in self._types.items()
+            }
+
+    def summary(self) -> dict[str, Any]:
+        """Return the order book totals."""
+        with self._lock:
+            return {
+                "orders": self.orders,
+                "open_orders": len(self._open),
+                "customers": len(self._customers),
+                "revenue": round(self.revenue, 2),
+                "outstanding": round(self.revenue - self.paid, 2),
+                "price_cache": resolve_price.cache_info()._asdict(),
+            }
@@ -0,0 +1,281 @@
+"""Sensor platform of the Chicken Farm integration."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    CURRENCY_EURO,
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import (
+    DOMAIN,
+    EGG_TYPES,
+    FORECAST_HORIZONS,
+    INSTRUMENTATION_KEY,
+    SIGNAL_ANALYTICS_UPDATED,
+)
+from .coordinator import DERIVED_BITS, DERIVED_VALUES
+from .entity import CountedWritesEntity
+from .farm import ChickenFarm
+
+# Analytics sensors: (result key, name, icon, unit, state class)
+ANALYTICS_SENSORS = [
+    ("cost_per_kg_pellets", "Pellets Cost per KG", "mdi:cash", f"{CURRENCY_EURO}/kg", SensorStateClass.MEASUREMENT),
+    ("cost_per_kg_scratch_grains", "Scratch Grains Cost per KG", "mdi:cash", f"{CURRENCY_EURO}/kg", SensorStateClass.MEASUREMENT),
+    ("feed_cost_per_egg", "Feed Cost per Egg", "mdi:cash", CURRENCY_EURO, SensorStateClass.MEASUREMENT),
+    ("total_cost", "Total Costs", "mdi:cash-minus", CURRENCY_EURO, SensorStateClass.TOTAL_INCREASING),
+    ("revenue", "Egg Revenue", "mdi:cash-plus", CURRENCY_EURO, SensorStateClass.TOTAL_INCREASING),
+    ("profit", "Profit", "mdi:cash", CURRENCY_EURO, SensorStateClass.TOTAL),
+    ("laying_rate", "Laying Rate", "mdi:egg", "eggs/hen/day", SensorStateClass.MEASUREMENT),
+    ("hatch_rate", "Hatch Rate", "mdi:egg-easter", PERCENTAGE, SensorStateClass.MEASUREMENT),
+    ("eggs_incubating", "Eggs Incubating", "mdi:egg-easter", "eggs", SensorStateClass.MEASUREMENT),
+    ("flock_pullets", "Pullets", "mdi:bird", "hens", SensorStateClass.MEASUREMENT),
+    ("flock_layers", "Laying Hens", "mdi:bird", "hens", SensorStateClass.MEASUREMENT),
+    ("flock_retired", "Retired Hens", "mdi:bird", "hens", SensorStateClass.MEASUREMENT),
+    ("lay_capacity", "Expected Lay Capacity", "mdi:egg", "eggs/day", SensorStateClass.MEASUREMENT),
+    ("oldest_egg_age", "Oldest Egg Age", "mdi:egg-outline", UnitOfTime.DAYS, SensorStateClass.MEASUREMENT),
+    ("eggs_expiring", "Eggs Expiring Soon", "mdi:egg-outline", "eggs", SensorStateClass.MEASUREMENT),
+    ("eggs_expired", "Expired Eggs", "mdi:egg-off-outline", "eggs", SensorStateClass.MEASUREMENT),
+]
+
+# Forecast sensors: (result key, name, icon, unit, state class)
+FORECAST_SENSORS = [
+    ("eggs_7d", "Egg Forecast 7 Days", "mdi:egg", "eggs", SensorStateClass.MEASUREMENT),
+    ("eggs_30d", "Egg Forecast 30 Days", "mdi:egg", "eggs", SensorStateClass.MEASUREMENT),
+    ("pellets_next_purchase", "Pellets Next Purchase", "mdi:calendar", None, None),
+    ("scratch_grains_next_purchase", "Scratch Grains Next Purchase", "mdi:calendar", None, None),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Chicken Farm sensors."""
+    farm: ChickenFarm = hass.data[DOMAIN][config_entry.entry_id]
+    farm.instrumentation.wrap("sensor_setup", _async_add_sensors)(
+        hass, farm, async_add_entities
+    )
+
+
+@callback
+def _async_add_sensors(
+    hass: HomeAssistant, farm: ChickenFarm, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Create every sensor of a farm in one batch."""
+    async_add_entities(
+        [
+            EggsInStorageSensor(hass, farm),
+            *(
+                ChickenAnalyticsSensor(farm, *description)
+                for description in ANALYTICS_SENSORS
+            ),
+            *(
+                ChickenForecastSensor(farm, *description)
+                for description in FORECAST_SENSORS
+            ),
+            # Disabled unless needed
+            ChickenInstrumentationSensor(farm),
+        ]
+    )
+
+
+class EggsInStorageSensor(CountedWritesEntity, SensorEntity):
+    """Sensor to track eggs in storage."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # Write counters change with every update and are of no use in history
+    _unrecorded_attributes = frozenset(
+        {"updates_received", "state_writes", "updates_coalesced"}
+    )
+    _inputs, _ = DERIVED_VALUES["eggs_in_storage"]
+    _bit = DERIVED_BITS["eggs_in_storage"]
+
+    def __init__(self, hass: HomeAssistant, farm: ChickenFarm) -> None:
+        """Initialize the sensor."""
+        self.hass = hass
+        self._farm = farm
+        self._instrumentation = farm.instrumentation
+        self._attr_name = "Eggs in Storage"  # Readable name
+        self._attr_unique_id = f"{farm.entry.entry_id}_eggs_in_storage"
+        self._attr_device_info = farm.device_info
+        self._attr_icon = "mdi:egg"  # Icon for the sensor
+        self._attr_native_unit_of_measurement = "eggs"
+
+        self._updates_received = 0
+        self._state_writes = 0
+
+    @property
+    def native_value(self) -> float:
+        """Return the running total computed by the farm coordinator."""
+        return self._farm.coordinator.get("eggs_in_storage")
+
+    @property
+    def extra_state_attributes(self) -> dict[str, int]:
+        """Return how many tracked changes were coalesced into one write."""
+        return {
+            "updates_received": self._updates_received,
+            "state_writes": self._state_writes,
+            "updates_coalesced": self._updates_received - self._state_writes,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the tracked numbers and the derived total."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._farm.coordinator.async_add_listener(
+                self._async_farm_updated, self._inputs | self._bit
+            )
+        )
+
+    @callback
+    def _async_farm_updated(self, changed: int) -> None:
+        """Write state once per coordinator flush that moved the total."""
+        self._updates_received += (changed & self._inputs).bit_count()
+        if changed & self._bit:
+            self._state_writes += 1
+            self.async_write_ha_state()
+
+
+class ChickenAnalyticsSensor(CountedWritesEntity, SensorEntity):
+    """Sensor showing one figure computed by the farm analytics."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        farm: ChickenFarm,
+        key: str,
+        name: str,
+        icon: str,
+        unit: str | None,
+        state_class: SensorStateClass | None,
+    ) -> None:
+        """Initialize the sensor."""
+        self._farm = farm
+        self._instrumentation = farm.instrumentation
+        self._key = key
+        self._attr_name = name
+        self._attr_unique_id = f"{farm.entry.entry_id}_{key}"
+        self._attr_device_info = farm.device_info
+        self._attr_icon = icon
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._written: Any = None  # Result of the last state write
+
+    def _result(self) -> Any:
+        """Return what the state is built from."""
+        return self._farm.analytics_results.get(self._key)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the latest computed value."""
+        return self._result()
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to analytics updates."""
+        self._written = self._result()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_ANALYTICS_UPDATED.format(entry_id=self._farm.entry.entry_id),
+                self._async_results_updated,
+            )
+        )
+
+    @callback
+    def _async_results_updated(self) -> None:
+        """Write state only if this sensor's result changed."""
+        if (result := self._result()) != self._written:
+            self._written = result
+            self.async_write_ha_state()
+
+
+class ChickenForecastSensor(ChickenAnalyticsSensor):
+    """Sensor showing one forecast, broken down in its attributes."""
+
+    # The breakdown is recomputed daily and is of no use in history
+    _unrecorded_attributes = frozenset(
+        {
+            *EGG_TYPES,
+            "kg_per_day",
+            *(f"kg_next_{horizon}_days" for horizon in FORECAST_HORIZONS),
+        }
+    )
+
+    def __init__(
+        self,
+        farm: ChickenFarm,
+        key: str,
+        name: str,
+        icon: str,
+        unit: str | None,
+        state_class: SensorStateClass | None,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(farm, key, name, icon, unit, state_class)
+        if unit is None:
+            self._attr_device_class = SensorDeviceClass.DATE
+
+    def _result(self) -> tuple[date | float | None, dict[str, Any]]:
+        """Return the forecast and its breakdown."""
+        return self._farm.forecast_results.get(self._key, (None, {}))
+
+    @property
+    def native_value(self) -> date | float | None:
+        """Return the latest forecast."""
+        return self._result()[0]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the forecast per egg type or the feed use."""
+        return self._result()[1]
+
+
+class ChickenInstrumentationSensor(SensorEntity):
+    """Diagnostic sensor showing the hot path timings of the integration."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:timer-outline"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_name = "Event Loop Time"
+    _unrecorded_attributes = frozenset({"hot_paths"})
+
+    def __init__(self, farm: ChickenFarm) -> None:
+        """Initialize the sensor."""
+        self._instrumentation = farm.instrumentation
+        self._attr_unique_id = f"{farm.entry.entry_id}_{INSTRUMENTATION_KEY}"
+        self._attr_device_info = farm.device_info
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the total time the hot paths held the event loop."""
+        if not self._instrumentation.enabled:
+            return None
+        paths = self._instrumentation.snapshot()["hot_paths"]
+        return round(sum(path["loop_blocked_ms"] for path in paths.values()), 3)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the counters per hot path."""
+        return {"hot_paths": self._instrumentation.snapshot()["hot_paths"]}
@@ -1,123 +1,671 @@
-from homeassistant.core import ServiceCall
+"""Services of the Chicken Farm integration."""
 
-from homeassistant.helpers.service import async_register_admin_service
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import cache
+import os
+from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
 
-from .const import DOMAIN, PURCHASE_TYPES, EGG_TYPES
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import (
+    ServiceValidationError,
+    Unauthorized,
+    UnknownUser,
+)
+from homeassistant.helpers import entity_registry as er
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    ATTR_ENTRY_ID,
+    ATTR_IDEMPOTENCY_KEY,
+    DATASET_EVENTS,
+    DOMAIN,
+    EGG_TYPES,
+    EXPORT_EXTENSIONS,
+    EXPORT_FORMATS,
+    FEDERATION_CENTRAL,
+    FEDERATION_SATELLITE,
+    FORMAT_CSV,
+    FORMAT_JSONL,
+    GROUP_EGGS,
+    GROUP_FLOCK,
+    GROUP_HATCHERY,
+    GROUP_INPUT,
+    GROUP_STORAGE,
+    IMPORT_FORMATS,
+    INSTRUMENTATION_KEY,
+    LEDGER_KINDS,
+    LEDGER_PURCHASE,
+    NUMBER_FIELDS,
+    PURCHASE_TYPES,
+    fields_in_group,
+    purchase_fields,
+)
+from .flock import RETIREMENT_DAYS
+from .instrumentation import async_get_instrumentation
+from .ledger import PERIOD_DAY, PERIODS, LedgerEvent
+
+if TYPE_CHECKING:
+    from .farm import ChickenFarm
+
+# Schemas for services
+FARM_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTRY_ID): cv.string})
+# Services changing a farm accept a key that makes their retries no-ops
+MUTATION_SCHEMA = FARM_SCHEMA.extend(
+    {vol.Optional(ATTR_IDEMPOTENCY_KEY): cv.string}
+)
+
+
+@cache
+def _fields_schema(group: str) -> vol.Schema:
+    """Return the service schema saving the fields of a group.
+
+    Fields left out keep their value, so a call may save just one of them.
+    """
+    return MUTATION_SCHEMA.extend(
+        {
+            vol.Optional(field.data_key): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=field.max_value)
+            )
+            for field in fields_in_group(group)
+        }
+    )
+
+
+SAVE_PURCHASE_SCHEMA = MUTATION_SCHEMA.extend(
+    {
+        vol.Required("purchase_type"): vol.In(PURCHASE_TYPES),
+        vol.Required("purchase_weight", default=0): vol.Coerce(float),
+        vol.Required("purchase_cost"): vol.Coerce(float),
+        vol.Required("purchase_date"): str,
+    }
+)
+
+SAVE_EGG_COLLECTION_SCHEMA = _fields_schema(GROUP_EGGS)
+SAVE_STORAGE_SCHEMA = _fields_schema(GROUP_STORAGE)
+SAVE_CHICKEN_SCHEMA = _fields_schema(GROUP_FLOCK)
+SAVE_HATCHERY_SCHEMA = _fields_schema(GROUP_HATCHERY)
+
+GET_STATISTICS_SCHEMA = FARM_SCHEMA.extend(
+    {
+        vol.Optional("period", default=PERIOD_DAY): vol.In(PERIODS),
+        vol.Required("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("kind"): vol.In(LEDGER_KINDS),
+    }
+)
+
+
+IMPORT_HISTORY_SCHEMA = MUTATION_SCHEMA.extend(
+    {
+        vol.Required("path"): cv.string,
+        vol.Optional("format"): vol.In(IMPORT_FORMATS),
+    }
+)
+
+EXPORT_HISTORY_SCHEMA = FARM_SCHEMA.extend(
+    {
+        vol.Optional("format", default=FORMAT_CSV): vol.In(EXPORT_FORMATS),
+        vol.Optional("dataset", default=DATASET_EVENTS): vol.In(
+            [DATASET_EVENTS, *PERIODS]
+        ),
+        vol.Optional("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("incremental", default=False): cv.boolean,
+        vol.Optional("filename"): cv.string,
+    }
+)
+
+EXPORT_DIR = "chicken_exports"  # Relative to the config directory
+
+ADD_COHORT_SCHEMA = MUTATION_SCHEMA.extend(
+    {
+        vol.Required("hatch_date"): cv.date,
+        vol.Optional("hens", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("roosters", default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+    }
+)
+
+GET_FLOCK_SCHEMA = FARM_SCHEMA.extend(
+    {
+        vol.Optional("older_than_days", default=RETIREMENT_DAYS): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+    }
+)
+
+SELL_EGGS_SCHEMA = MUTATION_SCHEMA.extend(
+    {
+        vol.Required("customer"): cv.string,
+        vol.Required("egg_type"): vol.In(EGG_TYPES),
+        vol.Required("eggs"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        # Total price of the order, instead of the price tiers
+        vol.Optional("price"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional("date"): cv.string,
+    }
+)
+
+RECORD_PAYMENT_SCHEMA = MUTATION_SCHEMA.extend(
+    {
+        vol.Required("customer"): cv.string,
+        vol.Required("amount"): vol.All(vol.Coerce(float), vol.Range(min=0.01)),
+        vol.Optional("order_id"): vol.Coerce(int),
+    }
+)
+
+GET_SALES_SCHEMA = FARM_SCHEMA.extend({vol.Optional("customer"): cv.string})
+
+# History purged by purge_history: scratchpads and timing only, or every number
+PURGE_TRANSIENT = "transient"
+PURGE_NUMBERS = "numbers"
+
+PURGE_HISTORY_SCHEMA = FARM_SCHEMA.extend(
+    {
+        vol.Optional("scope", default=PURGE_TRANSIENT): vol.In(
+            [PURGE_TRANSIENT, PURGE_NUMBERS]
+        ),
+        vol.Optional("keep_days", default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+    }
+)
+
+
+# External helpers that keep the last purchase date, if the user created them
+PURCHASE_DATE_ENTITIES = {
+    "Pellets": "input_datetime.pellets_purchase_date",
+    "Scratch Grains": "input_datetime.scratch_grain_purchase_date",
+    "Bedding": "input_datetime.bedding_purchase_date",
+}
+
+
+@callback
+def _async_get_farms(hass: HomeAssistant, call: ServiceCall) -> list[ChickenFarm]:
+    """Return the farm selected by a service call, or every loaded farm."""
+    farms: dict[str, ChickenFarm] = hass.data.get(DOMAIN, {})
+    if (entry_id := call.data.get(ATTR_ENTRY_ID)) is None:
+        return list(farms.values())
+    if (farm := farms.get(entry_id)) is None:
+        raise ServiceValidationError(f"Chicken farm {entry_id} is not loaded")
+    return [farm]
+
+
+@callback
+def _async_get_farm(hass: HomeAssistant, call: ServiceCall) -> ChickenFarm:
+    """Return the single farm a service call writes to."""
+    farms = _async_get_farms(hass, call)
+    if len(farms) != 1:
+        raise ServiceValidationError(
+            f"{len(farms)} chicken farms are loaded, select one with {ATTR_ENTRY_ID}"
+        )
+    return farms[0]
+
+
+async def _async_mutate(
+    hass: HomeAssistant, call: ServiceCall, mutation: Callable[[ChickenFarm], Any]
+) -> Any:
+    """Run a mutation of the call's farm alone, once per idempotency key."""
+    farm = _async_get_farm(hass, call)
+    return await farm.async_mutate(_idempotency_key(call), lambda: mutation(farm))
+
+
+def _idempotency_key(call: ServiceCall) -> str | None:
+    """Return the idempotency key of a call, scoped to its service."""
+    if (key := call.data.get(ATTR_IDEMPOTENCY_KEY)) is None:
+        return None
+    return f"{call.service}:{key}"  # The same key may be reused per service
+
+
+async def _async_require_admin(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Refuse a call made by a user who is not an admin.
+
+    Admin services cannot return a response, so services that do check the
+    caller here, like async_register_admin_service would.
+    """
+    if (user_id := call.context.user_id) is None:
+        return
+    if (user := await hass.auth.async_get_user(user_id)) is None:
+        raise UnknownUser(context=call.context, user_id=user_id)
+    if not user.is_admin:
+        raise Unauthorized(context=call.context)
+
+
+@callback
+def _redundant_entity_ids(
+    hass: HomeAssistant, farm: ChickenFarm, scope: str
+) -> list[str]:
+    """Return the registered entities of a farm whose history is redundant."""
+    # Saved values live in the ledger and the store, so number history adds nothing
+    keys = [
+        field.key
+        for field in NUMBER_FIELDS
+        if scope == PURGE_NUMBERS or field.transient
+    ]
+    unique_ids = [("number", f"{farm.entry.entry_id}_{key}") for key in keys]
+    unique_ids.append(("sensor", f"{farm.entry.entry_id}_{INSTRUMENTATION_KEY}"))
+    registry = er.async_get(hass)
+    return [
+        entity_id
+        for domain, unique_id in unique_ids
+        if (entity_id := registry.async_get_entity_id(domain, DOMAIN, unique_id))
+    ]
 
-# Schema for save_purchase service
 
-SAVE_PURCHASE_SCHEMA = vol.Schema({
-    vol.Required("purchase_type"): vol.In(PURCHASE_TYPES),
-    vol.Required("purchase_weight"): vol.Coerce(float),
-    vol.Required("purchase_cost"): vol.Coerce(float),
-})
+def _event_day(value: str | None = None) -> str:
+    """Return the ISO date of an event, defaulting to today."""
+    if value:
+        if (parsed := dt_util.parse_datetime(value)) is not None:
+            return dt_util.as_local(parsed).date().isoformat()
+        if (day := dt_util.parse_date(value)) is not None:
+            return day.isoformat()
+    return dt_util.now().date().isoformat()
 
-# Schema for save_egg_collection service
 
-SAVE_EGG_COLLECTION_SCHEMA = vol.Schema({
-    vol.Required("white_eggs"): vol.Coerce(float),
-    vol.Required("beige_eggs"): vol.Coerce(float),
-    vol.Required("mint_eggs"): vol.Coerce(float),
-    vol.Required("olive_eggs"): vol.Coerce(float),
-    vol.Required("brown_eggs"): vol.Coerce(float),
-    vol.Required("chocolate_eggs"): vol.Coerce(float),
-})
+def _group_values(group: str, data: dict) -> dict[str, float]:
+    """Return the number values of a group found in the service data."""
+    return {
+        field.key: data[field.data_key]
+        for field in fields_in_group(group)
+        if field.data_key in data
+    }
 
-async def async_setup_scripts(hass):
-    """Set up Chicken Farm scripts."""
+
+async def _async_save_group(hass: HomeAssistant, call: ServiceCall, group: str) -> None:
+    """Set the fields of a group and book what they added to the ledger."""
+    values = _group_values(group, call.data)
+    day = _event_day()
+    await _async_mutate(hass, call, lambda farm: farm.async_save(values, day=day))
+
+
+async def async_setup_services(hass: HomeAssistant):
+    """Set up Chicken Farm services."""
 
     async def save_purchase(call: ServiceCall):
         """Save purchase data."""
-        purchase_type = call.data.get("purchase_type")
-        purchase_weight = call.data.get("purchase_weight")
-        purchase_cost = call.data.get("purchase_cost")
-
-        # Map purchase types to their corresponding entities
-        purchase_entities = {
-            "Pellets": ("input_number.pellets_kg", "input_number.pellets_cost"),
-            "Scratch Grains": ("input_number.scratch_grains_kg", "input_number.scratch_grains_cost"),
-            "Bedding": (None, "input_number.bedding_cost"),
-            "Misc": (None, "input_number.misc_cost"),
+        purchase_type = call.data["purchase_type"]
+        weight_key, cost_key = purchase_fields(purchase_type)
+
+        values = {cost_key: call.data["purchase_cost"]}
+        if weight_key:
+            values[weight_key] = call.data["purchase_weight"]
+        event = LedgerEvent(
+            _event_day(call.data["purchase_date"]),
+            LEDGER_PURCHASE,
+            purchase_type,
+            call.data["purchase_weight"],
+            call.data["purchase_cost"],
+        )
+
+        async def _save(farm: ChickenFarm) -> None:
+            await farm.async_save(values, [event])
+            date_entity = PURCHASE_DATE_ENTITIES.get(purchase_type)
+            if date_entity and hass.states.get(date_entity) is not None:
+                await hass.services.async_call(
+                    "input_datetime",
+                    "set_datetime",
+                    {"entity_id": date_entity, "datetime": call.data["purchase_date"]},
+                )
+
+        await _async_mutate(hass, call, _save)
+
+    async def save_daily_eggs(call: ServiceCall):
+        """Save daily egg collection data."""
+        # Written in one batch; the reset that used to follow in the same
+        # call zeroed the counters that had just been saved.
+        await _async_save_group(hass, call, GROUP_EGGS)
+
+    async def reset_daily_eggs(call: ServiceCall):
+        """Reset daily egg counts."""
+        values = {field.key: 0 for field in fields_in_group(GROUP_EGGS)}
+
+        async def _reset(farm: ChickenFarm) -> None:
+            # Counts not saved yet are dropped, the next save starts from zero
+            await farm.async_append((), booked=values)
+            farm.async_apply_batch(values)
+
+        await _async_mutate(hass, call, _reset)
+
+    async def save_storage_data(call: ServiceCall):
+        """Save storage data."""
+        await _async_save_group(hass, call, GROUP_STORAGE)
+
+    async def save_chicken_data(call: ServiceCall):
+        """Save chicken population data."""
+        await _async_save_group(hass, call, GROUP_FLOCK)
+
+    async def save_hatchery_data(call: ServiceCall):
+        """Save hatchery data."""
+        await _async_save_group(hass, call, GROUP_HATCHERY)
+
+    async def reset_purchase_inputs(call: ServiceCall):
+        """Reset purchase input fields."""
+        values = {field.key: 0 for field in fields_in_group(GROUP_INPUT)}
+        await _async_mutate(hass, call, lambda farm: farm.async_apply_batch(values))
+
+    async def get_statistics(call: ServiceCall) -> ServiceResponse:
+        """Return rollup buckets of a period between two dates."""
+        start = call.data["start"].isoformat()
+        end = call.data.get("end", dt_util.now().date()).isoformat()
+        return {
+            farm.entry.entry_id: {
+                "name": farm.entry.title,
+                "buckets": await farm.async_statistics(
+                    call.data["period"], start, end, call.data.get("kind")
+                ),
+            }
+            for farm in _async_get_farms(hass, call)
         }
 
-        weight_entity, cost_entity = purchase_entities.get(purchase_type, (None, None))
+    async def import_history(call: ServiceCall) -> ServiceResponse:
+        """Import a CSV or JSON Lines history file into a farm's ledger."""
+        await _async_require_admin(hass, call)
+        path = call.data["path"]
+        if not os.path.isabs(path):
+            path = hass.config.path(path)
+        if not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"Access to {path} is not allowed")
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            raise ServiceValidationError(f"{path} does not exist")
+        file_format = call.data.get("format") or (
+            FORMAT_CSV if path.lower().endswith(".csv") else FORMAT_JSONL
+        )
+        return await _async_mutate(
+            hass,
+            call,
+            lambda farm: farm.async_import_history(
+                path, file_format, SAVE_EGG_COLLECTION_SCHEMA, SAVE_PURCHASE_SCHEMA
+            ),
+        )
 
-        if weight_entity:
-            await hass.services.async_call(
-                "input_number",
-                "set_value",
-                {"entity_id": weight_entity, "value": purchase_weight},
-            )
+    async def export_history(call: ServiceCall) -> ServiceResponse:
+        """Export a farm's ledger events or rollups to the config directory."""
+        await _async_require_admin(hass, call)
+        farm = _async_get_farm(hass, call)
+        file_format = call.data["format"]
+        dataset = call.data["dataset"]
+        filename = call.data.get("filename") or (
+            f"{slugify(farm.entry.title)}_{dataset}.{EXPORT_EXTENSIONS[file_format]}"
+        )
+        if os.path.basename(filename) != filename:
+            raise ServiceValidationError(f"{filename} is not a plain file name")
+        start, end = call.data.get("start"), call.data.get("end")
+        return await farm.async_export_history(
+            hass.config.path(EXPORT_DIR, filename),
+            file_format,
+            dataset,
+            start.isoformat() if start else None,
+            end.isoformat() if end else None,
+            call.data["incremental"],
+        )
 
-        if cost_entity:
-            await hass.services.async_call(
-                "input_number",
-                "set_value",
-                {"entity_id": cost_entity, "value": purchase_cost},
+    async def add_cohort(call: ServiceCall):
+        """Add bought or existing birds of a known hatch date to the flock."""
+        await _async_mutate(
+            hass,
+            call,
+            lambda farm: farm.async_add_cohort(
+                call.data["hatch_date"].isoformat(),
+                call.data["hens"],
+                call.data["roosters"],
+            ),
+        )
+
+    async def get_flock(call: ServiceCall) -> ServiceResponse:
+        """Return the flock stages and the birds older than a number of days."""
+        return {
+            farm.entry.entry_id: {
+                "name": farm.entry.title,
+                **await farm.async_flock_report(call.data["older_than_days"]),
+            }
+            for farm in _async_get_farms(hass, call)
+        }
+
+    async def sell_eggs(call: ServiceCall) -> ServiceResponse:
+        """Record an order of a customer and take its eggs from storage."""
+        await _async_require_admin(hass, call)
+        customer = call.data["customer"]
+        egg_type = call.data["egg_type"]
+        eggs = call.data["eggs"]
+
+        async def _sell(farm: ChickenFarm) -> dict[str, Any]:
+            response: dict[str, int] = {}  # How the tiers priced the order
+            if (amount := call.data.get("price")) is None:
+                if (price := farm.price(egg_type, eggs)) is None:
+                    raise ServiceValidationError(
+                        f"The price tiers cannot price {eggs} {egg_type} eggs"
+                    )
+                amount, *split = price
+                response = dict(zip(("trays", "dozens", "singles"), split))
+            amount = round(amount, 2)
+            order_id = await farm.async_sell(
+                customer, egg_type, eggs, amount, _event_day(call.data.get("date"))
             )
+            if order_id is None:
+                raise ServiceValidationError(
+                    f"Fewer than {eggs} {egg_type} eggs are in storage"
+                )
+            return {"order_id": order_id, "amount": amount, **response}
 
-        # Reset input fields
-        await reset_purchase_inputs(hass)
+        return await _async_mutate(hass, call, _sell)
 
-    async def save_egg_collection(call: ServiceCall):
-        """Save daily egg collection data."""
-        egg_data = {
-            "white_eggs": call.data.get("white_eggs"),
-            "beige_eggs": call.data.get("beige_eggs"),
-            "mint_eggs": call.data.get("mint_eggs"),
-            "olive_eggs": call.data.get("olive_eggs"),
-            "brown_eggs": call.data.get("brown_eggs"),
-            "chocolate_eggs": call.data.get("chocolate_eggs"),
-        }
+    async def record_payment(call: ServiceCall) -> ServiceResponse:
+        """Apply a customer's payment to an order or to the oldest open orders."""
+        await _async_require_admin(hass, call)
+        customer = call.data["customer"]
 
-        for egg_type, value in egg_data.items():
-            await hass.services.async_call(
-                "input_number",
-                "set_value",
-                {"entity_id": f"input_number.{egg_type}_daily", "value": value},
+        async def _pay(farm: ChickenFarm) -> dict[str, Any]:
+            result = await farm.async_pay(
+                customer, call.data["amount"], call.data.get("order_id")
             )
+            if result is None:
+                raise ServiceValidationError(
+                    f"The payment is more than {customer} owes on the open orders"
+                )
+            return result
 
-        # Reset input fields
-        await reset_egg_collection_inputs(hass)
+        return await _async_mutate(hass, call, _pay)
 
-    async def reset_purchase_inputs(hass):
-        """Reset purchase input fields."""
-        await hass.services.async_call(
-            "input_number",
-            "set_value",
-            {"entity_id": "input_number.purchase_weight", "value": 0},
-        )
+    async def get_sales(call: ServiceCall) -> ServiceResponse:
+        """Return the open orders and the revenue per customer and egg type."""
+        return {
+            farm.entry.entry_id: {
+                "name": farm.entry.title,
+                **await farm.async_sales_report(call.data.get("customer")),
+            }
+            for farm in _async_get_farms(hass, call)
+        }
+
+    async def push_federation(call: ServiceCall):
+        """Send a satellite's unsent events to its central instance now."""
+        for farm in _async_get_farms(hass, call):
+            if farm.federation.role != FEDERATION_SATELLITE:
+                raise ServiceValidationError(f"{farm.entry.title} is not a satellite")
+            await farm.federation.async_push()
+
+    async def get_federation(call: ServiceCall) -> ServiceResponse:
+        """Return the link counters, and the merged totals of a central farm."""
+        response = {}
+        for farm in _async_get_farms(hass, call):
+            federation = farm.federation
+            report = {"name": farm.entry.title, **federation.stats()}
+            if federation.role == FEDERATION_CENTRAL:
+                report.update(
+                    await hass.async_add_executor_job(federation.aggregates.report)
+                )
+            response[farm.entry.entry_id] = report
+        return response
 
-        await hass.services.async_call(
-            "input_number",
-            "set_value",
-            {"entity_id": "input_number.purchase_cost", "value": 0},
+    async def close_day(call: ServiceCall):
+        """Book the daily egg and storage counters and zero them."""
+        await _async_get_farm(hass, call).day_close.async_close(
+            dt_util.now(), idempotency_key=_idempotency_key(call)
         )
 
-    async def reset_egg_collection_inputs(hass):
-        """Reset egg collection input fields."""
-        for egg_type in EGG_TYPES:
+    async def purge_history(call: ServiceCall):
+        """Drop the recorded history of entities whose history is redundant."""
+        if "recorder" not in hass.config.components:
+            raise ServiceValidationError("The recorder is not loaded")
+        entity_ids = [
+            entity_id
+            for farm in _async_get_farms(hass, call)
+            for entity_id in _redundant_entity_ids(hass, farm, call.data["scope"])
+        ]
+        if entity_ids:
             await hass.services.async_call(
-                "input_number",
-                "set_value",
-                {"entity_id": f"input_number.{egg_type}_eggs_daily", "value": 0},
+                "recorder",
+                "purge_entities",
+                {"entity_id": entity_ids, "keep_days": call.data["keep_days"]},
+                blocking=True,
             )
 
+    # Handlers are timed while instrumentation is enabled
+    timed = async_get_instrumentation(hass).wrap
+
     # Register services
     async_register_admin_service(
         hass,
         DOMAIN,
         "save_purchase",
-        save_purchase,
+        timed("save_purchase", save_purchase),
         schema=SAVE_PURCHASE_SCHEMA,
     )
-
     async_register_admin_service(
         hass,
         DOMAIN,
-        "save_egg_collection",
-        save_egg_collection,
+        "save_daily_eggs",
+        timed("save_daily_eggs", save_daily_eggs),
         schema=SAVE_EGG_COLLECTION_SCHEMA,
     )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "reset_daily_eggs",
+        timed("reset_daily_eggs", reset_daily_eggs),
+        schema=MUTATION_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "close_day",
+        timed("close_day", close_day),
+        schema=MUTATION_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "save_storage_data",
+        timed("save_storage_data", save_storage_data),
+        schema=SAVE_STORAGE_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "save_chicken_data",
+        timed("save_chicken_data", save_chicken_data),
+        schema=SAVE_CHICKEN_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "save_hatchery_data",
+        timed("save_hatchery_data", save_hatchery_data),
+        schema=SAVE_HATCHERY_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "reset_purchase",
+        timed("reset_purchase", reset_purchase_inputs),
+        schema=MUTATION_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "add_cohort",
+        timed("add_cohort", add_cohort),
+        schema=ADD_COHORT_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "purge_history",
+        timed("purge_history", purge_history),
+        schema=PURGE_HISTORY_SCHEMA,
+    )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        "push_federation",
+        timed("push_federation", push_federation),
+        schema=FARM_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_federation",
+        timed("get_federation", get_federation),
+        schema=FARM_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_flock",
+        timed("get_flock", get_flock),
+        schema=GET_FLOCK_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "sell_eggs",
+        timed("sell_eggs", sell_eggs),
+        schema=SELL_EGGS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "record_payment",
+        timed("record_payment", record_payment),
+        schema=RECORD_PAYMENT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_sales",
+        timed("get_sales", get_sales),
+        schema=GET_SALES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "import_history",
+        timed("import_history", import_history),
+        schema=IMPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "export_history",
+        timed("export_history", export_history),
+        schema=EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "get_statistics",
+        timed("get_statistics", get_statistics),
+        schema=GET_STATISTICS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
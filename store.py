@@ -0,0 +1,122 @@
+"""Write-behind persistence of a farm's number values.
+
+Numbers change far more often than they need to reach the disk. Changes
+only mark their fields dirty in memory. The first dirty field schedules a
+single write of the whole document after SAVE_DELAY seconds, and every
+change until then rides along with it. The Store writes atomically by
+replacing the file, and it flushes a pending write when Home Assistant
+stops. Unloading the farm flushes right away.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, NUMBER_FIELDS
+
+STORAGE_KEY = f"{DOMAIN}.{{entry_id}}.values"
+STORAGE_VERSION = 1
+STORAGE_MINOR_VERSION = 1
+SAVE_DELAY = 30  # Seconds a change may wait before it is written
+
+
+class _ValuesStore(Store[dict[str, Any]]):
+    """Store refusing documents of a newer major version."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict
+    ) -> dict[str, Any]:
+        """Return an older document as it is, its fields have not changed."""
+        if old_major_version > STORAGE_VERSION:
+            raise HomeAssistantError(
+                f"{self.key} was written by a newer version of the integration"
+                f" (storage version {old_major_version}, supported up to"
+                f" {STORAGE_VERSION}); restore a backup or update the integration"
+            )
+        return old_data
+
+
+class FarmValuesStore:
+    """Dirty field tracking and delayed saves of one farm's values."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store = _ValuesStore(
+            hass,
+            STORAGE_VERSION,
+            STORAGE_KEY.format(entry_id=entry_id),
+            atomic_writes=True,
+            minor_version=STORAGE_MINOR_VERSION,
+        )
+        self._value_of: Callable[[str], float] | None = None
+        self._saved: dict[str, float] = {}  # Values as last written
+        self._dirty: set[str] = set()
+        self.changes = 0  # Field changes marked dirty
+        self.writes = 0  # Documents written
+
+    async def async_load(self) -> dict[str, float]:
+        """Load the saved values of the fields that still exist."""
+        data = await self._store.async_load() or {}
+        keys = {field.key for field in NUMBER_FIELDS}
+        self._saved = {
+            key: value
+            for key, value in data.get("values", {}).items()
+            if key in keys
+        }
+        return dict(self._saved)
+
+    @callback
+    def async_bind(self, value_of: Callable[[str], float]) -> None:
+        """Set the function returning the current value of a field."""
+        self._value_of = value_of
+
+    @callback
+    def async_mark_dirty(self, keys: Iterable[str]) -> None:
+        """Schedule a write of fields whose value moved away from the disk."""
+        assert self._value_of is not None
+        for key in keys:
+            if self._saved.get(key, 0.0) == self._value_of(key):
+                self._dirty.discard(key)  # Moved back to the saved value
+                continue
+            self.changes += 1
+            if not self._dirty:
+                # Changes until the write ride along with this one
+                self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            self._dirty.add(key)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the document to write and mark every field clean."""
+        assert self._value_of is not None
+        # Zero is the default of every field, so it is left out
+        self._saved = {
+            field.key: value
+            for field in NUMBER_FIELDS
+            if (value := self._value_of(field.key))
+        }
+        self._dirty.clear()
+        self.writes += 1
+        return {"values": self._saved}
+
+    async def async_flush(self) -> None:
+        """Write pending changes now."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self) -> None:
+        """Delete the saved values."""
+        await self._store.async_remove()
+
+    def stats(self) -> dict[str, int]:
+        """Return how many field changes did not cost a write of their own."""
+        return {
+            "changes": self.changes,
+            "writes": self.writes,
+            "writes_saved": max(self.changes - self.writes, 0),
+            "dirty_fields": len(self._dirty),
+        }
@@ -0,0 +1,85 @@
+"""Helpers of the Chicken Farm tests.
+
+The tests run the integration on the stand-in core of the benchmarks, so
+they need Home Assistant installed but no running instance.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import importlib
+import os
+import sys
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from stub_hass import StubHass, load_integration, make_entry  # noqa: E402
+
+PACKAGE = load_integration()
+
+
+def module(name: str) -> ModuleType:
+    """Return a module of the loaded integration, importing it if need be."""
+    return importlib.import_module(f"{PACKAGE.__name__}.{name}")
+
+
+async def async_setup_farm(
+    options: dict | None = None,
+    index: int = 1,
+    config_dir: str | None = None,
+    hass: StubHass | None = None,
+) -> tuple[StubHass, Any]:
+    """Set up a farm, with the integration unless a core is given.
+
+    Returns the core and the farm.
+    """
+    if hass is None:
+        hass = StubHass(PACKAGE, config_dir)
+        await PACKAGE.async_setup(hass, {})
+    entry = make_entry(index, options)
+    await PACKAGE.async_setup_entry(hass, entry)
+    await hass.async_block_till_done()
+    return hass, hass.data["chicken"][entry.entry_id]
+
+
+@asynccontextmanager
+async def async_farm(
+    options: dict | None = None,
+    index: int = 1,
+    config_dir: str | None = None,
+    hass: StubHass | None = None,
+) -> AsyncIterator[tuple[StubHass, Any]]:
+    """Set up a farm like async_setup_farm and unload it when done."""
+    hass, farm = await async_setup_farm(options, index, config_dir, hass)
+    try:
+        yield hass, farm
+    finally:
+        await farm.async_unload()
+
+
+async def async_call(hass: StubHass, service: str, data: dict | None = None) -> Any:
+    """Call a service of the integration and wait for what it started."""
+    result = await hass.services.async_call("chicken", service, data or {})
+    await hass.async_block_till_done()
+    return result
+
+
+def storage(farm: Any) -> float:
+    """Return the eggs in storage shown by a farm."""
+    farm.coordinator.async_flush()
+    return farm.coordinator.get("eggs_in_storage")
+
+
+def stub_users(hass: StubHass, **users: bool) -> None:
+    """Give the core users by id, with whether each is an admin."""
+
+    async def _async_get_user(user_id: str) -> SimpleNamespace | None:
+        if user_id not in users:
+            return None
+        return SimpleNamespace(id=user_id, is_admin=users[user_id])
+
+    hass.auth = SimpleNamespace(async_get_user=_async_get_user)
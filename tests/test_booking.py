@@ -0,0 +1,56 @@
+"""Tests of booking the saved counters into the ledger."""
+
+from __future__ import annotations
+
+import pytest
+import voluptuous as vol
+
+from common import async_call, async_farm, storage
+
+
+async def test_saving_twice_books_once() -> None:
+    """A save books the difference to what is already in the ledger."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 5})
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 5})
+        assert farm.ledger.total("eggs", "white") == (5.0, 0.0)
+
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 7})
+        assert farm.ledger.total("eggs", "white") == (7.0, 0.0)
+        assert farm.inventory.total == 7
+
+
+async def test_partial_save_keeps_other_counters() -> None:
+    """Counters left out of a call are neither reset nor booked."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 20})
+        await async_call(hass, "save_storage_data", {"broken_eggs": 3})
+        await async_call(hass, "save_storage_data", {"eggs_used": 2})
+        assert farm.coordinator.get("broken_eggs") == 3
+        assert farm.ledger.total("storage", "broken") == (3.0, 0.0)
+        assert farm.ledger.total("storage", "used") == (2.0, 0.0)
+        assert farm.inventory.total == 15
+        assert storage(farm) == 15
+
+        # The value of the sold eggs alone books against the sold count
+        await async_call(hass, "save_storage_data", {"eggs_sold_amount": 4})
+        await async_call(hass, "save_storage_data", {"eggs_sold_value": 2.5})
+        assert farm.ledger.total("storage", "sold") == (4.0, 2.5)
+
+
+@pytest.mark.parametrize("eggs", [-5, 150])
+async def test_out_of_range_counts_are_refused(eggs: int) -> None:
+    """Counts outside the range of their number are not saved."""
+    async with async_farm() as (hass, farm):
+        with pytest.raises(vol.Invalid):
+            await async_call(hass, "save_daily_eggs", {"white_eggs": eggs})
+        assert farm.ledger.total("eggs", "white") == (0.0, 0.0)
+        assert farm.inventory.total == 0
+
+
+async def test_booked_values_are_the_stored_ones() -> None:
+    """Values beyond a number's range are booked as the number stores them."""
+    async with async_farm() as (_, farm):
+        events, booked = farm.unbooked({"white_eggs_daily": 150}, "2024-01-01")
+        assert booked == {"white_eggs_daily": 100}
+        assert [event.quantity for event in events] == [100]
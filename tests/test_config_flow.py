@@ -0,0 +1,42 @@
+"""Tests of the config and options flows."""
+
+from __future__ import annotations
+
+import pytest
+
+from homeassistant.data_entry_flow import FlowResultType
+
+from common import async_farm, module
+
+config_flow = module("config_flow")
+
+OPTIONS_STEPS = [
+    "settings",
+    "nest_boxes",
+    "day_close",
+    "price_tiers",
+    "federation",
+    "import_history",
+]
+
+
+async def test_options_menu_lists_the_steps() -> None:
+    """The options open on a menu of every step."""
+    async with async_farm() as (hass, farm):
+        flow = config_flow.ChickenOptionsFlow(farm.entry)
+        flow.hass = hass
+        result = await flow.async_step_init()
+        assert result["type"] == FlowResultType.MENU
+        assert result["menu_options"] == OPTIONS_STEPS
+
+
+@pytest.mark.parametrize("step", OPTIONS_STEPS)
+async def test_options_step_opens(step: str) -> None:
+    """Each options step shows its form."""
+    async with async_farm() as (hass, farm):
+        flow = config_flow.ChickenOptionsFlow(farm.entry)
+        flow.hass = hass
+        result = await getattr(flow, f"async_step_{step}")()
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == step
+        assert not result["errors"]
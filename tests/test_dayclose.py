@@ -0,0 +1,76 @@
+"""Tests of the day close."""
+
+from __future__ import annotations
+
+from common import async_call, async_farm, storage
+
+
+async def test_close_books_saved_eggs_once() -> None:
+    """Eggs saved before the close are not booked again by it."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 5})
+        assert farm.ledger.total("eggs", "white") == (5.0, 0.0)
+        assert farm.inventory.total == 5
+
+        await async_call(hass, "close_day")
+        assert farm.ledger.total("eggs", "white") == (5.0, 0.0)
+        assert farm.inventory.total == 5
+        assert farm.coordinator.get("white_eggs_daily") == 0
+
+        # The next day starts from zero
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 3})
+        assert farm.ledger.total("eggs", "white") == (8.0, 0.0)
+
+
+async def test_close_books_unsaved_counts() -> None:
+    """Counts added after the last save, like nest box lays, are booked."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 5})
+        farm.async_apply_batch({"white_eggs_daily": 8, "brown_eggs_daily": 2})
+
+        await async_call(hass, "close_day")
+        assert farm.ledger.total("eggs", "white") == (8.0, 0.0)
+        assert farm.ledger.total("eggs", "brown") == (2.0, 0.0)
+        assert farm.inventory.total == 10
+
+
+async def test_storage_after_close_is_the_lots() -> None:
+    """The close zeroes the outflows too and storage shows the eggs left."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 25})
+        await async_call(
+            hass,
+            "save_storage_data",
+            {"broken_eggs": 2, "eggs_sold_amount": 3, "eggs_sold_value": 1.5},
+        )
+        assert farm.inventory.total == 20
+        assert storage(farm) == 20
+
+        await async_call(hass, "close_day")
+        for key in ("broken_eggs", "eggs_sold_amount", "eggs_sold_value"):
+            assert farm.coordinator.get(key) == 0
+        assert farm.ledger.total("storage", "broken") == (2.0, 0.0)
+        assert farm.ledger.total("storage", "sold") == (3.0, 1.5)
+        assert farm.inventory.total == 20
+        assert storage(farm) == 20
+
+        # Counts of the new day move storage until they are booked
+        farm.async_apply_batch({"broken_eggs": 1})
+        assert storage(farm) == 19
+        await async_call(hass, "close_day")
+        assert farm.inventory.total == 19
+        assert storage(farm) == 19
+
+
+async def test_storage_survives_a_restart(tmp_path) -> None:
+    """Booked values are committed with the events and restored."""
+    async with async_farm(config_dir=str(tmp_path)) as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 6})
+        await async_call(hass, "save_storage_data", {"eggs_used": 2})
+
+    async with async_farm(config_dir=str(tmp_path)) as (hass, farm):
+        assert farm.coordinator.get("white_eggs_daily") == 6
+        assert storage(farm) == 4
+        # Saving the same figures again books nothing
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 6})
+        assert farm.ledger.total("eggs", "white") == (6.0, 0.0)
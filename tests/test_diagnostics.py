@@ -0,0 +1,25 @@
+"""Tests of the diagnostics."""
+
+from __future__ import annotations
+
+from common import async_farm, module
+
+diagnostics = module("diagnostics")
+
+SECRETS = {
+    "webhook_id": "lays-secret",
+    "federation_url": "https://central.example/api/webhook/batch-secret",
+    "federation_webhook_id": "batch-secret",
+}
+
+
+async def test_diagnostics_redact_the_webhooks() -> None:
+    """Webhook ids and the central's URL are not in the diagnostics."""
+    async with async_farm(SECRETS) as (hass, farm):
+        result = await diagnostics.async_get_config_entry_diagnostics(
+            hass, farm.entry
+        )
+        assert result["entry"]["options"] == {
+            key: "**REDACTED**" for key in SECRETS
+        }
+        assert "secret" not in repr(result)
@@ -0,0 +1,120 @@
+"""Tests of the federation of satellite farms."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import patch
+import zlib
+
+from aiohttp import ClientResponseError
+import pytest
+
+from common import async_call, async_farm, module
+
+federation = module("federation")
+ledger = module("ledger")
+
+
+def _batch(after: int, events: list[tuple], sent: float = 1.0) -> bytes:
+    """Return the payload of a batch of egg events from site "s1"."""
+    return federation.encode_batch(
+        {
+            "v": federation.BATCH_VERSION,
+            "site": "s1",
+            "name": "Satellite",
+            "after": after,
+            "last": events[-1][0] if events else after,
+            "sent": sent,
+            "counters": {"white_eggs_daily": 2.0},
+            "events": events,
+        }
+    )
+
+
+def _event(event_id: int, eggs: float) -> tuple:
+    """Return a ledger row of white eggs."""
+    return (event_id, "2024-01-01", "eggs", "white", eggs, 0.0)
+
+
+def _white_eggs(aggregates) -> tuple[float, int]:
+    """Return the white eggs and events merged from site "s1"."""
+    total = aggregates.report()["sites"]["s1"]["totals"]["eggs"]["white"]
+    return total["quantity"], total["count"]
+
+
+def test_merge_is_idempotent(tmp_path) -> None:
+    """Resent and overlapping batches add every event once."""
+    farm_ledger = ledger.FarmLedger(str(tmp_path / "central.db"))
+    farm_ledger.open()
+    aggregates = federation.SiteAggregates()
+
+    first = _batch(0, [_event(1, 3), _event(2, 4)])
+    assert aggregates.merge(farm_ledger, first) == 2
+    assert aggregates.merge(farm_ledger, first) == 2
+    assert _white_eggs(aggregates) == (7.0, 2)
+    assert aggregates.duplicates == 2
+
+    # Overlaps the merged events, only event 3 is new
+    assert aggregates.merge(farm_ledger, _batch(1, [_event(2, 4), _event(3, 5)])) == 3
+    assert _white_eggs(aggregates) == (12.0, 3)
+
+    # Starts past the merged events, refused until the gap is resent
+    assert aggregates.merge(farm_ledger, _batch(5, [_event(6, 1)])) == 3
+    assert aggregates.refused == 1
+    assert _white_eggs(aggregates) == (12.0, 3)
+
+    # The merged totals are the ones on disk
+    reloaded = federation.SiteAggregates()
+    reloaded.load(farm_ledger)
+    assert _white_eggs(reloaded) == (12.0, 3)
+    farm_ledger.close()
+
+
+async def test_resent_backlog_is_merged_once() -> None:
+    """A satellite that lost its acknowledgement resends without doubling."""
+    async with async_farm(index=1) as (hass, satellite), async_farm(
+        index=2, hass=hass
+    ) as (_, central):
+        central.federation.role = "central"
+        satellite.federation.transport = federation.LocalTransport(
+            central.federation
+        )
+        for eggs in (5, 8):
+            await async_call(
+                hass, "save_daily_eggs", {"entry_id": "farm0001", "white_eggs": eggs}
+            )
+        assert await satellite.federation.async_push() == 2
+
+        satellite.federation._acked = 0  # The acknowledgement got lost
+        assert await satellite.federation.async_push() == 2
+        sites = central.federation.aggregates.report()["sites"]
+        site = sites[satellite.federation.site]
+        assert site["totals"]["eggs"]["white"]["quantity"] == 8.0
+        assert central.federation.aggregates.duplicates == 2
+
+
+def test_decompression_is_bounded() -> None:
+    """A payload inflating past MAX_BATCH_BYTES is refused."""
+    bomb = zlib.compress(b" " * (federation.MAX_BATCH_BYTES + 1), 9)
+    assert len(bomb) < 2048
+    with pytest.raises(ValueError, match="larger than"):
+        federation.decode_batch(bomb)
+    with pytest.raises(ValueError, match="Truncated"):
+        federation.decode_batch(_batch(0, [_event(1, 1)])[:-4])
+
+
+async def test_failures_do_not_name_the_url() -> None:
+    """A failed push is reported without the central's URL."""
+    url = "https://central.example/api/webhook/batch-secret"
+
+    def _post(*args, **kwargs):
+        raise ClientResponseError(
+            SimpleNamespace(real_url=url), (), status=404, message="Not Found"
+        )
+
+    session = SimpleNamespace(post=_post)
+    transport = federation.HttpTransport(None, url)
+    with patch.object(federation, "async_get_clientsession", lambda _: session):
+        with pytest.raises(federation.FederationError) as failure:
+            await transport.async_send(b"")
+    assert str(failure.value) == "The central answered 404: Not Found"
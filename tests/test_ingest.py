@@ -0,0 +1,50 @@
+"""Tests of the nest box ingestion."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from common import async_farm
+
+BOXES = {"nest_boxes": {"box1": "white"}, "ingest_debounce": 0}
+
+
+def _request(data: object) -> SimpleNamespace:
+    """Return a webhook request posting data."""
+
+    async def _json() -> object:
+        return data
+
+    return SimpleNamespace(json=_json)
+
+
+async def test_webhook_refuses_invalid_reports() -> None:
+    """Reports without a box or with no positive egg count are not counted."""
+    async with async_farm(BOXES) as (hass, farm):
+        ingest = farm.ingest
+        reports = [
+            {"box": "box1", "eggs": 0},
+            {"box": "box1", "eggs": -3},
+            {"box": "box1", "eggs": "many"},
+            {"eggs": 2},
+            "box1",
+            {"box": "box1", "eggs": 2, "id": 7},
+            {"box": "box1"},
+        ]
+        await ingest._async_handle_webhook(hass, "lays", _request(reports))
+        await ingest.async_flush()
+        assert farm.coordinator.get("white_eggs_daily") == 3
+        assert ingest.stats()["invalid"] == 5
+        assert ingest.stats()["counted"] == 3
+
+
+async def test_lays_past_the_daily_number_are_counted() -> None:
+    """Lays the daily number cannot hold show in the capped counter."""
+    async with async_farm(BOXES) as (hass, farm):
+        ingest = farm.ingest
+        ingest.async_report("box1", None, None, 60)
+        await ingest.async_flush()
+        ingest.async_report("box1", None, None, 70)
+        await ingest.async_flush()
+        assert farm.coordinator.get("white_eggs_daily") == 100
+        assert ingest.stats()["capped"] == 30
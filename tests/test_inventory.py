@@ -0,0 +1,106 @@
+"""Tests of the egg inventory."""
+
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+import voluptuous as vol
+
+from homeassistant.exceptions import ServiceValidationError
+
+from common import async_call, async_farm, module, storage
+
+inventory = module("inventory")
+ledger = module("ledger")
+
+TODAY = date(2024, 3, 1)
+
+
+def _eggs(day: str, color: str, eggs: float) -> object:
+    """Return an event of collected eggs."""
+    return ledger.LedgerEvent(day, "eggs", color, eggs)
+
+
+def test_outflows_take_the_oldest_eggs() -> None:
+    """Outflows empty the oldest lots first, sales only of their color."""
+    lots = inventory.EggInventory()
+    lots.apply(
+        [
+            _eggs("2024-02-01", "white", 4),
+            _eggs("2024-02-10", "brown", 3),
+            _eggs("2024-02-20", "white", 5),
+        ],
+        TODAY,
+    )
+    lots.apply([ledger.LedgerEvent("2024-03-01", "sales", "white", 6)], TODAY)
+    assert lots.available("white") == 3
+    assert lots.available("brown") == 3
+
+    lots.apply([ledger.LedgerEvent("2024-03-01", "storage", "used", 4)], TODAY)
+    assert lots.available("brown") == 0
+    assert lots.available("white") == 2
+    assert lots.summary(TODAY)["oldest_egg_age"] == 10
+
+
+def test_lowered_outflow_returns_its_eggs() -> None:
+    """Eggs an outflow no longer counts go back to the oldest lot."""
+    lots = inventory.EggInventory()
+    lots.apply(
+        [_eggs("2024-02-01", "white", 4), _eggs("2024-02-20", "brown", 5)], TODAY
+    )
+    lots.apply([ledger.LedgerEvent("2024-03-01", "storage", "broken", 6)], TODAY)
+    assert lots.total == 3
+    lots.apply([ledger.LedgerEvent("2024-03-01", "storage", "broken", -2)], TODAY)
+    assert lots.total == 5
+    assert lots.available("brown") == 5
+
+    # With storage empty they come back as eggs of the color last taken
+    lots.apply([ledger.LedgerEvent("2024-03-01", "storage", "used", 5)], TODAY)
+    lots.apply([ledger.LedgerEvent("2024-03-01", "storage", "used", -1)], TODAY)
+    assert lots.available("brown") == 1
+    assert lots.summary(TODAY)["oldest_egg_age"] == 0
+
+
+async def test_lowered_counters_move_storage_back(tmp_path) -> None:
+    """Lowering a saved count corrects the lots and Eggs in Storage."""
+    async with async_farm(config_dir=str(tmp_path)) as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 20})
+        await async_call(hass, "save_storage_data", {"broken_eggs": 5})
+        assert farm.inventory.total == 15
+
+        await async_call(hass, "save_storage_data", {"broken_eggs": 3})
+        assert farm.ledger.total("storage", "broken") == (3.0, 0.0)
+        assert farm.inventory.total == 17
+        assert storage(farm) == 17
+
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 12})
+        assert farm.inventory.total == 9
+        assert storage(farm) == 9
+
+    async with async_farm(config_dir=str(tmp_path)) as (hass, farm):
+        assert farm.inventory.total == 9
+        assert storage(farm) == 9
+
+
+async def test_partial_and_out_of_range_saves_keep_the_lots() -> None:
+    """Counters left out or refused do not move the lots."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 10, "brown_eggs": 4})
+        await async_call(hass, "save_daily_eggs", {"brown_eggs": 6})
+        assert farm.inventory.available("white") == 10
+        assert farm.inventory.available("brown") == 6
+
+        with pytest.raises(vol.Invalid):
+            await async_call(hass, "save_storage_data", {"eggs_used": -3})
+        assert farm.inventory.total == 16
+        assert storage(farm) == 16
+
+
+async def test_lowered_flock_counters_are_refused() -> None:
+    """Birds and incubated eggs already booked cannot be taken back."""
+    async with async_farm() as (hass, farm):
+        await async_call(hass, "save_hatchery_data", {"eggs_in_hatchery": 10})
+        with pytest.raises(ServiceValidationError):
+            await async_call(hass, "save_hatchery_data", {"eggs_in_hatchery": 4})
+        assert farm.ledger.total("hatchery", "incubated") == (10.0, 0.0)
@@ -0,0 +1,71 @@
+"""Tests of the sales order book."""
+
+from __future__ import annotations
+
+import pytest
+
+from homeassistant.core import Context
+from homeassistant.exceptions import ServiceValidationError, Unauthorized
+
+from common import async_call, async_farm, storage, stub_users
+
+PRICES = {"price_tiers": {"default": {"egg": 0.4, "dozen": 4.0}}}
+
+
+async def test_sale_takes_eggs_from_storage() -> None:
+    """A sale draws down the lots and Eggs in Storage together."""
+    async with async_farm(PRICES) as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 18})
+        assert storage(farm) == 18
+
+        result = await async_call(
+            hass, "sell_eggs", {"customer": "Ann", "egg_type": "white", "eggs": 13}
+        )
+        assert result["amount"] == 4.4
+        assert farm.inventory.total == 5
+        assert storage(farm) == 5
+
+        # Storage holds too few eggs for another dozen
+        with pytest.raises(ServiceValidationError):
+            await async_call(
+                hass, "sell_eggs", {"customer": "Ann", "egg_type": "white", "eggs": 12}
+            )
+        assert storage(farm) == 5
+
+
+async def test_sale_and_close_book_storage_once() -> None:
+    """Eggs sold are not taken from storage again by the day close."""
+    async with async_farm(PRICES) as (hass, farm):
+        await async_call(hass, "save_daily_eggs", {"brown_eggs": 12})
+        await async_call(
+            hass, "sell_eggs", {"customer": "Bo", "egg_type": "brown", "eggs": 12}
+        )
+        await async_call(hass, "close_day")
+        assert farm.ledger.total("eggs", "brown") == (12.0, 0.0)
+        assert farm.inventory.total == 0
+        assert storage(farm) == 0
+
+
+@pytest.mark.parametrize(
+    ("service", "data"),
+    [
+        ("sell_eggs", {"customer": "Ann", "egg_type": "white", "eggs": 1}),
+        ("record_payment", {"customer": "Ann", "amount": 1}),
+    ],
+)
+async def test_sales_services_need_an_admin(service: str, data: dict) -> None:
+    """Users who are not admins cannot sell or record payments."""
+    async with async_farm(PRICES) as (hass, farm):
+        stub_users(hass, admin=True, user=False)
+        await async_call(hass, "save_daily_eggs", {"white_eggs": 5})
+        with pytest.raises(Unauthorized):
+            await hass.services.async_call(
+                "chicken", service, data, context=Context(user_id="user")
+            )
+        assert farm.sales.summary()["orders"] == 0
+
+        if service == "sell_eggs":
+            await hass.services.async_call(
+                "chicken", service, data, context=Context(user_id="admin")
+            )
+            assert farm.sales.summary()["orders"] == 1
@@ -0,0 +1,230 @@
+"""WebSocket API of the Chicken Farm integration.
+
+chicken/subscribe answers with one compact snapshot of a farm: its number
+values, derived values, analytics and forecasts as flat key -> value maps.
+After that the changed keys are collected and sent as one delta, at most
+once per interval however often they change, so a dashboard needs neither
+the full state objects nor a subscription per entity. chicken/history
+answers from the ledger rollups in columns.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_ENTRY_ID,
+    DOMAIN,
+    LEDGER_KINDS,
+    SIGNAL_ANALYTICS_UPDATED,
+)
+from .coordinator import DERIVED_BITS, FIELD_BITS
+from .ledger import PERIOD_DAY, PERIODS
+
+if TYPE_CHECKING:
+    from .farm import ChickenFarm
+
+DEFAULT_INTERVAL = 1.0  # Seconds between two deltas at most
+HISTORY_COLUMNS = ["start", "kind", "subtype", "quantity", "amount", "count"]
+ALL_BITS = sum(FIELD_BITS.values()) | sum(DERIVED_BITS.values())
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the WebSocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+    websocket_api.async_register_command(hass, websocket_history)
+
+
+def _get_farm(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> ChickenFarm | None:
+    """Return the farm of a message, or send an error and return None."""
+    farms: dict[str, ChickenFarm] = hass.data.get(DOMAIN, {})
+    if (entry_id := msg.get(ATTR_ENTRY_ID)) is None and len(farms) == 1:
+        entry_id = next(iter(farms))
+    if (farm := farms.get(entry_id)) is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Chicken farm not found"
+        )
+    return farm
+
+
+def _forecast_values(farm: ChickenFarm) -> dict[str, Any]:
+    """Return the forecasts without their breakdowns, dates as ISO strings."""
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, (value, _) in farm.forecast_results.items()
+    }
+
+
+def _snapshot(farm: ChickenFarm) -> dict[str, dict[str, Any]]:
+    """Return every value a farm dashboard shows."""
+    coordinator = farm.coordinator
+    return {
+        "numbers": {key: coordinator.get(key) for key in FIELD_BITS},
+        "derived": dict(coordinator.derived),
+        "analytics": dict(farm.analytics_results),
+        "forecast": _forecast_values(farm),
+    }
+
+
+class _Subscription:
+    """Coalesced deltas of one farm for one connection."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        connection: websocket_api.ActiveConnection,
+        msg_id: int,
+        farm: ChickenFarm,
+        interval: float,
+    ) -> None:
+        """Initialize the subscription with the snapshot that was sent."""
+        self.hass = hass
+        self._connection = connection
+        self._msg_id = msg_id
+        self._farm = farm
+        self._interval = interval
+        self.snapshot = _snapshot(farm)
+        self._changed = 0  # Bits of the numbers and derived values
+        self._results_changed = False
+        self._last_sent = monotonic()
+        self._cancel_send: CALLBACK_TYPE | None = None
+        self._unsubscribe = [
+            farm.coordinator.async_add_listener(self._async_values_changed, ALL_BITS),
+            async_dispatcher_connect(
+                hass,
+                SIGNAL_ANALYTICS_UPDATED.format(entry_id=farm.entry.entry_id),
+                self._async_results_changed,
+            ),
+        ]
+
+    @callback
+    def async_unsubscribe(self) -> None:
+        """Stop sending deltas."""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe.clear()
+        if self._cancel_send is not None:
+            self._cancel_send()
+            self._cancel_send = None
+
+    @callback
+    def _async_values_changed(self, changed: int) -> None:
+        """Collect the bits of changed numbers and derived values."""
+        self._changed |= changed
+        self._async_schedule()
+
+    @callback
+    def _async_results_changed(self) -> None:
+        """Note that analytics and forecasts were recomputed."""
+        self._results_changed = True
+        self._async_schedule()
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Send the delta once the interval since the last one has passed."""
+        if self._cancel_send is None:
+            delay = max(self._last_sent + self._interval - monotonic(), 0)
+            self._cancel_send = async_call_later(self.hass, delay, self._async_send)
+
+    @callback
+    def _async_send(self, _now: Any = None) -> None:
+        """Send the keys whose values differ from what the client has."""
+        self._cancel_send = None
+        changed, self._changed = self._changed, 0
+        coordinator = self._farm.coordinator
+        current: dict[str, dict[str, Any]] = {
+            "numbers": {
+                key: coordinator.get(key)
+                for key, bit in FIELD_BITS.items()
+                if changed & bit
+            },
+            "derived": {
+                key: coordinator.get(key)
+                for key, bit in DERIVED_BITS.items()
+                if changed & bit
+            },
+        }
+        if self._results_changed:
+            self._results_changed = False
+            current["analytics"] = self._farm.analytics_results
+            current["forecast"] = _forecast_values(self._farm)
+        delta = {}
+        for section, values in current.items():
+            sent = self.snapshot[section]
+            if changes := {
+                key: value for key, value in values.items() if sent.get(key) != value
+            }:
+                sent.update(changes)
+                delta[section] = changes
+        if delta:
+            self._last_sent = monotonic()
+            self._connection.send_message(
+                websocket_api.event_message(self._msg_id, delta)
+            )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe",
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional("interval", default=DEFAULT_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=3600)
+        ),
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Send a snapshot of a farm, then its changes as coalesced deltas."""
+    if (farm := _get_farm(hass, connection, msg)) is None:
+        return
+    subscription = _Subscription(hass, connection, msg["id"], farm, msg["interval"])
+    connection.subscriptions[msg["id"]] = subscription.async_unsubscribe
+    connection.send_result(msg["id"], subscription.snapshot)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/history",
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional("period", default=PERIOD_DAY): vol.In(PERIODS),
+        vol.Required("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("kind"): vol.In(LEDGER_KINDS),
+    }
+)
+@websocket_api.async_response
+async def websocket_history(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Send the rollup buckets of a period as columns and rows."""
+    if (farm := _get_farm(hass, connection, msg)) is None:
+        return
+    end = msg.get("end", dt_util.now().date())
+    buckets = await farm.async_statistics(
+        msg["period"], msg["start"].isoformat(), end.isoformat(), msg.get("kind")
+    )
+    connection.send_result(
+        msg["id"],
+        {
+            "columns": HISTORY_COLUMNS,
+            "rows": [
+                [bucket[column] for column in HISTORY_COLUMNS] for bucket in buckets
+            ],
+        },
+    )